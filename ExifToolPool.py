@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+##############################################################################################################
+# ExifToolPool.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This module keeps one or more exiftool processes running in "-stay_open True -@ -" mode, so files can be
+# handed to exiftool without starting a new exiftool process for every request. Starting exiftool (a perl
+# script) takes a lot longer than extracting the data from a single FLIR Jpeg file.
+#
+# Create an ExifToolPool object, optionally passing:
+# - NumberOfWorkers, the number of exiftool processes to keep running, requests are spread over them.
+# - ExifToolPath, the exiftool executable to start.
+# - BatchSize, the maximum number of files passed to one exiftool process in one request.
+#
+# The main functions are:
+# - Execute(Arguments), sends one command line to a free exiftool process and returns its output as bytes.
+# - ExtractFiles(FileNames), returns per file a dictionary with 'MetaData', 'RawThermalImage' and
+#   'EmbeddedImage' in the same format as FlirFileParser.ParseFlirFile() does. Files are batched, the meta data
+#   and the binary blobs of a whole batch are requested in one go.
+# When an exiftool process dies, it is restarted and the request is retried once.
+#
+# GetSharedPool() returns a pool that is shared by all FLIRImage objects in a process, it is closed on exit.
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import os
+import json
+import base64
+import queue
+import atexit
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+##############################################################################################################
+# Class Definitions
+##############################################################################################################
+class ExifToolError(RuntimeError):
+   pass
+
+class ExifToolProcess:
+   def __init__(self, ExifToolPath="exiftool"):
+      self.ExifToolPath = ExifToolPath
+      self.Process = None
+      self.ExecuteCounter = 0
+      # The output read from exiftool that belongs to the next responses
+      self.ReadBuffer = bytearray()
+      self.Start()
+
+   def Start(self):
+      self.Process = subprocess.Popen([self.ExifToolPath, "-stay_open", "True", "-@", "-", "-common_args", "-charset", "filename=utf8"],
+                                      stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+      self.ReadBuffer = bytearray()
+
+   def IsRunning(self):
+      return(self.Process is not None and self.Process.poll() is None)
+
+   def Restart(self):
+      self.Stop()
+      self.Start()
+
+   def Stop(self):
+      if self.Process is None:
+         return
+      if self.IsRunning():
+         try:
+            self.Process.stdin.write(b"-stay_open\nFalse\n")
+            self.Process.stdin.flush()
+            self.Process.wait(timeout=5)
+         except (OSError, subprocess.TimeoutExpired):
+            self.Process.kill()
+            self.Process.wait()
+      self.Process.stdin.close()
+      self.Process.stdout.close()
+      self.Process = None
+
+   def SendRequest(self, Arguments):
+      # Writes one request to exiftool and returns the ready marker to wait for, this allows writing several
+      # requests before reading the first answer.
+      self.ExecuteCounter += 1
+      Request = "\n".join(Arguments) + "\n-execute" + self.ExecuteCounter.__str__() + "\n"
+      self.Process.stdin.write(Request.encode('utf-8'))
+      self.Process.stdin.flush()
+      return(("{ready" + self.ExecuteCounter.__str__() + "}").encode())
+
+   def ReadResponse(self, ReadyMarker):
+      # With several requests pipelined one read can hold the end of this response and the start of the next
+      # ones, everything after the ready marker is kept in the read buffer for the next response.
+      Handle = self.Process.stdout.fileno()
+      SearchStart = 0
+      while True:
+         MarkerIndex = self.ReadBuffer.find(ReadyMarker, SearchStart)
+         if MarkerIndex >= 0:
+            Output = bytes(self.ReadBuffer[:MarkerIndex])
+            Remainder = self.ReadBuffer[MarkerIndex+len(ReadyMarker):]
+            self.ReadBuffer = bytearray(Remainder.lstrip(b"\r\n"))
+            return(Output)
+         SearchStart = max(0, len(self.ReadBuffer)-len(ReadyMarker)+1)
+         Data = os.read(Handle, 65536)
+         if not Data:
+            raise ExifToolError("exiftool process stopped unexpectedly")
+         self.ReadBuffer += Data
+
+   def ExecuteMany(self, ArgumentsList):
+      # Pipelines all requests to the process first and then collects the answers in the same order.
+      if not self.IsRunning():
+         self.Restart()
+      ReadyMarkers = [self.SendRequest(Arguments) for Arguments in ArgumentsList]
+      return([self.ReadResponse(ReadyMarker) for ReadyMarker in ReadyMarkers])
+
+class ExifToolPool:
+   def __init__(self, NumberOfWorkers=1, ExifToolPath="exiftool", BatchSize=64):
+      self.ExifToolPath = ExifToolPath
+      self.BatchSize = BatchSize
+      self.NumberOfWorkers = NumberOfWorkers
+      self.IdleProcesses = queue.Queue()
+      for Worker in range(NumberOfWorkers):
+         self.IdleProcesses.put(ExifToolProcess(ExifToolPath))
+      self.Executor = ThreadPoolExecutor(max_workers=NumberOfWorkers)
+
+   def __enter__(self):
+      return(self)
+
+   def __exit__(self, *args):
+      self.Close()
+
+   def Close(self):
+      self.Executor.shutdown(wait=True)
+      while not self.IdleProcesses.empty():
+         self.IdleProcesses.get().Stop()
+
+   def ExecuteMany(self, ArgumentsList):
+      Process = self.IdleProcesses.get()
+      try:
+         try:
+            return(Process.ExecuteMany(ArgumentsList))
+         except (OSError, ExifToolError):
+            # The process crashed or its pipes broke, start a fresh one and retry once.
+            Process.Restart()
+            return(Process.ExecuteMany(ArgumentsList))
+      finally:
+         self.IdleProcesses.put(Process)
+
+   def Execute(self, Arguments):
+      return(self.ExecuteMany([Arguments])[0])
+
+   def ExtractBatch(self, FileNames):
+      MetaDataOutput, BinaryOutput = self.ExecuteMany([["-j"] + FileNames, ["-j", "-b", "-RawThermalImage", "-EmbeddedImage"] + FileNames])
+      MetaDataList = json.loads(MetaDataOutput.decode()) if MetaDataOutput.strip() else []
+      BinaryList = json.loads(BinaryOutput.decode()) if BinaryOutput.strip() else []
+      MetaDataBySource = dict((MetaData['SourceFile'], MetaData) for MetaData in MetaDataList)
+      BinaryBySource = dict((Binary['SourceFile'], Binary) for Binary in BinaryList)
+      Results = []
+      for FileName in FileNames:
+         if FileName not in MetaDataBySource:
+            Results.append(None)
+            continue
+         FlirFileDict = dict()
+         FlirFileDict['MetaData'] = MetaDataBySource[FileName]
+         Binary = BinaryBySource.get(FileName, dict())
+         for Name in ('RawThermalImage', 'EmbeddedImage'):
+            FlirFileDict[Name] = DecodeBinaryValue(Binary.get(Name))
+         Results.append(FlirFileDict)
+      return(Results)
+
+   def ExtractFiles(self, FileNames):
+      # Returns a list with per file the FlirFileParser style dictionary, or None for files exiftool could not read.
+      FileNames = [FileName.__str__() for FileName in FileNames]
+      Batches = [FileNames[Index:Index+self.BatchSize] for Index in range(0, len(FileNames), self.BatchSize)]
+      Results = []
+      for BatchResults in self.Executor.map(self.ExtractBatch, Batches):
+         Results.extend(BatchResults)
+      return(Results)
+
+   def ExtractFile(self, FileName):
+      FlirFileDict = self.ExtractFiles([FileName])[0]
+      if FlirFileDict is None:
+         raise ExifToolError("exiftool could not read "+FileName.__str__())
+      return(FlirFileDict)
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+def DecodeBinaryValue(Value):
+   # With -j -b exiftool returns binary values as "base64:..." strings
+   if Value is None:
+      return(None)
+   if isinstance(Value, str) and Value.startswith("base64:"):
+      return(base64.b64decode(Value[7:]))
+   return(Value.__str__().encode('latin-1'))
+
+SharedPools = dict()
+SharedPoolsLock = threading.Lock()
+
+def GetSharedPool(ExifToolPath="exiftool"):
+   with SharedPoolsLock:
+      if ExifToolPath not in SharedPools:
+         SharedPools[ExifToolPath] = ExifToolPool(1, ExifToolPath)
+      return(SharedPools[ExifToolPath])
+
+def CloseSharedPools():
+   with SharedPoolsLock:
+      for Pool in SharedPools.values():
+         Pool.Close()
+      SharedPools.clear()
+
+atexit.register(CloseSharedPools)
@@ -0,0 +1,441 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirAnalysisService.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This Script is a small HTTP service that analyses FLIR Jpeg files for other programs, so they can ask for
+# temperatures without starting this script for every file. It only uses the python standard library (asyncio),
+# one process handles many clients at the same time, the decoding and converting is done on a pool of worker
+# processes.
+#
+# Requests (the file is either uploaded as the body of a POST, or given as path=<file> on a GET):
+# - /analyse returns JSON with the minimum and maximum temperature and their locations, and the meta data.
+#   Add point=X,Y for the temperature of a pixel, box=X1,Y1,X2,Y2 for the average temperature of a box and
+#   thresholdbox=X1,Y1,X2,Y2 (with threshold=<temperature>) for the thresholded average, all can be repeated.
+#   Coordinates are in pixels of the (upscaled) image, like in the window. metadata=0 leaves the meta data out.
+# - /render returns a png image, kind=thermal (default, min=<temperature> and max=<temperature> set the range of
+#   the colors), kind=normal for the embedded picture or kind=processed for the processed image, with the boxes
+#   passed with box=... drawn as average temperature boxes.
+# - /status returns the number of requests, the cache and the worker pool as JSON.
+# Errors are returned as JSON with an Error attribute and the HTTP status code.
+#
+# The results are cached by the hash of the file and the request, so asking the same twice (or asking for the same
+# file at the same time from several clients) only does the work once. With --cache the decoded data is also kept
+# on disk (See FlirDataCache.py). Paths are only accepted below the --root directories (default the current
+# directory), the service listens on localhost unless --host is given. The workers are started with forkserver (or
+# spawn), so they do not inherit the sockets of the service.
+#
+# Example:
+#   python FlirAnalysisService.py --port 8322 --root /data/Inspections --workers 4
+#   curl --data-binary @FLIR0356.jpg "http://localhost:8322/analyse?point=320,240&box=100,100,200,200"
+#   curl "http://localhost:8322/render?path=/data/Inspections/FLIR0356.jpg&kind=processed" -o Processed.png
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import functools
+import collections
+import multiprocessing
+from io import BytesIO
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import FlirBatchProcessor
+
+##############################################################################################################
+# Constants
+##############################################################################################################
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8322
+DEFAULT_CACHE_SIZE = 256*1024*1024
+DEFAULT_MAXIMUM_UPLOAD_SIZE = 64*1024*1024
+MAXIMUM_HEADER_LINES = 100
+WORKER_IMAGE_CACHE_SIZE = 8
+RENDER_KINDS = ('thermal', 'normal', 'processed')
+
+##############################################################################################################
+# Class Definitions
+##############################################################################################################
+class ServiceError(Exception):
+   # An error that is returned to the client with this HTTP status code
+   def __init__(self, Status, Message):
+      Exception.__init__(self, Message)
+      self.Status = Status
+
+class ResponseCache:
+   # The responses (content type and body) by key, the least recently used are dropped above MaximumSize bytes
+   def __init__(self, MaximumSize=DEFAULT_CACHE_SIZE):
+      self.MaximumSize = MaximumSize
+      self.Size = 0
+      self.Entries = collections.OrderedDict()
+      self.Hits = 0
+      self.Misses = 0
+
+   def Get(self, Key):
+      Response = self.Entries.get(Key)
+      if Response is None:
+         self.Misses += 1
+         return (None)
+      self.Entries.move_to_end(Key)
+      self.Hits += 1
+      return (Response)
+
+   def Put(self, Key, Response):
+      if len(Response[1]) > self.MaximumSize:
+         return
+      if Key in self.Entries:
+         self.Size -= len(self.Entries.pop(Key)[1])
+      self.Entries[Key] = Response
+      self.Size += len(Response[1])
+      while self.Size > self.MaximumSize:
+         OldKey, OldResponse = self.Entries.popitem(last=False)
+         self.Size -= len(OldResponse[1])
+
+class FlirAnalysisService:
+   def __init__(self, Roots=None, NumberOfWorkers=None, CacheDirectory=None, CacheSize=DEFAULT_CACHE_SIZE, MaximumUploadSize=DEFAULT_MAXIMUM_UPLOAD_SIZE):
+      self.Roots = [os.path.realpath(Root) for Root in (Roots or [os.getcwd()])]
+      self.NumberOfWorkers = NumberOfWorkers or os.cpu_count()
+      self.CacheDirectory = CacheDirectory
+      self.MaximumUploadSize = MaximumUploadSize
+      self.Cache = ResponseCache(CacheSize)
+      # Requests that are being calculated, by cache key, so the same request at the same time is calculated once
+      self.Running = dict()
+      self.Counters = collections.Counter()
+      self.StartTime = time.time()
+      self.Executor = self.MakeExecutor()
+      self.Server = None
+
+   def MakeExecutor(self):
+      # The workers are not forked from this process, a forked worker would inherit the listening socket and the
+      # client connections open at that moment (clients waiting for the connection to close would wait forever) and
+      # the locks of the running executor threads. Forkserver where there is one, else spawn.
+      StartMethod = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+      return (ProcessPoolExecutor(max_workers=self.NumberOfWorkers, mp_context=multiprocessing.get_context(StartMethod)))
+
+   async def Start(self, Host=DEFAULT_HOST, Port=DEFAULT_PORT):
+      self.Server = await asyncio.start_server(self.HandleConnection, Host, Port)
+      return (self.Server)
+
+   async def Close(self):
+      if self.Server is not None:
+         self.Server.close()
+         await self.Server.wait_closed()
+      self.Executor.shutdown()
+
+   async def HandleConnection(self, Reader, Writer):
+      # One connection can carry several requests (HTTP/1.1 keep alive)
+      try:
+         while True:
+            try:
+               Request = await ReadRequest(Reader, self.MaximumUploadSize)
+            except ServiceError as Error:
+               await WriteResponse(Writer, Error.Status, *GetErrorResponse(Error), KeepAlive=False)
+               break
+            if Request is None:
+               break
+            Method, Target, Version, Headers, Body = Request
+            KeepAlive = GetKeepAlive(Version, Headers)
+            Status, ContentType, ResponseBody = await self.HandleRequest(Method, Target, Body)
+            await WriteResponse(Writer, Status, ContentType, ResponseBody, KeepAlive)
+            if not KeepAlive:
+               break
+      except (ConnectionError, asyncio.IncompleteReadError):
+         pass
+      finally:
+         Writer.close()
+
+   async def HandleRequest(self, Method, Target, Body):
+      # Returns the status code, content type and body of the response
+      self.Counters['Requests'] += 1
+      try:
+         Url = urlsplit(Target)
+         Query = parse_qs(Url.query)
+         if Url.path == "/status":
+            return (HTTPStatus.OK, "application/json", json.dumps(self.GetStatus(), indent=2).encode())
+         if Url.path not in ("/analyse", "/render"):
+            raise ServiceError(HTTPStatus.NOT_FOUND, "Unknown request "+Url.path)
+         if Method not in ("GET", "POST"):
+            raise ServiceError(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET with path=<file> or POST the file")
+         Settings = GetRequestSettings(Url.path, Query)
+         FileName, FileData, FileHash = await self.GetFileData(Method, Query, Body)
+         Key = (Url.path, FileHash, json.dumps(Settings, sort_keys=True))
+         Response = self.Cache.Get(Key)
+         if Response is None:
+            Response = await self.Calculate(Key, Url.path, FileName, FileData, FileHash, Settings)
+         return ((HTTPStatus.OK,) + Response)
+      except ServiceError as Error:
+         self.Counters['Errors'] += 1
+         return ((Error.Status,) + GetErrorResponse(Error))
+      except Exception as Error:
+         self.Counters['Errors'] += 1
+         return ((HTTPStatus.INTERNAL_SERVER_ERROR,) + GetErrorResponse(ServiceError(HTTPStatus.INTERNAL_SERVER_ERROR, type(Error).__name__+": "+Error.__str__())))
+
+   async def GetFileData(self, Method, Query, Body):
+      # Returns the name, content and hash of the uploaded file, or of the file of the path=... argument
+      Loop = asyncio.get_running_loop()
+      if Method == "POST":
+         if not Body:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "No file in the body of the request")
+         FileName = GetQueryValue(Query, 'name', "Upload.jpg")
+         FileHash = await Loop.run_in_executor(None, HashData, Body)
+         return (FileName, Body, FileHash)
+      FileName = self.CheckPath(GetQueryValue(Query, 'path'))
+      try:
+         FileData = await Loop.run_in_executor(None, ReadFile, FileName)
+      except OSError as Error:
+         raise ServiceError(HTTPStatus.NOT_FOUND, Error.__str__())
+      FileHash = await Loop.run_in_executor(None, HashData, FileData)
+      return (FileName, FileData, FileHash)
+
+   def CheckPath(self, Path):
+      if Path is None:
+         raise ServiceError(HTTPStatus.BAD_REQUEST, "Pass path=<file> or POST the file")
+      RealPath = os.path.realpath(os.path.join(self.Roots[0], Path))
+      for Root in self.Roots:
+         if os.path.commonpath([Root, RealPath]) == Root:
+            return (RealPath)
+      raise ServiceError(HTTPStatus.FORBIDDEN, "Only files below "+", ".join(self.Roots)+" can be read")
+
+   async def Calculate(self, Key, Request, FileName, FileData, FileHash, Settings):
+      # Runs the request on a worker process, a request that is running already is waited for i.s.o. started again
+      if Key in self.Running:
+         self.Counters['Joined'] += 1
+         return (await asyncio.shield(self.Running[Key]))
+      Future = asyncio.get_running_loop().create_future()
+      self.Running[Key] = Future
+      try:
+         Response = await self.RunOnWorker(Request, FileName, FileData, FileHash, Settings)
+         self.Cache.Put(Key, Response)
+         Future.set_result(Response)
+         return (Response)
+      except Exception as Error:
+         Future.set_exception(Error)
+         # Nobody else may be waiting, the exception is retrieved so asyncio does not report it
+         Future.exception()
+         raise
+      except BaseException:
+         Future.cancel()
+         raise
+      finally:
+         del self.Running[Key]
+
+   async def RunOnWorker(self, Request, FileName, FileData, FileHash, Settings):
+      Loop = asyncio.get_running_loop()
+      if Request == "/analyse":
+         Function = functools.partial(AnalyseFlirData, FileName, FileData, FileHash, Settings, self.CacheDirectory)
+      else:
+         Function = functools.partial(RenderFlirData, FileName, FileData, FileHash, Settings, self.CacheDirectory)
+      self.Counters['Calculated'] += 1
+      try:
+         return (await Loop.run_in_executor(self.Executor, Function))
+      except BrokenProcessPool:
+         # A worker process died (killed, out of memory), a new pool is started for the next requests
+         self.Executor.shutdown(wait=False)
+         self.Executor = self.MakeExecutor()
+         raise ServiceError(HTTPStatus.SERVICE_UNAVAILABLE, "The worker processing the file stopped, try again")
+      except Exception as Error:
+         raise ServiceError(HTTPStatus.UNPROCESSABLE_ENTITY, type(Error).__name__+": "+Error.__str__())
+
+   def GetStatus(self):
+      return (dict(Uptime=round(time.time()-self.StartTime, 1), Workers=self.NumberOfWorkers, Requests=self.Counters['Requests'],
+                   Errors=self.Counters['Errors'], Calculated=self.Counters['Calculated'], Joined=self.Counters['Joined'],
+                   Running=len(self.Running), CacheHits=self.Cache.Hits, CacheMisses=self.Cache.Misses,
+                   CacheEntries=len(self.Cache.Entries), CacheSize=self.Cache.Size, Roots=self.Roots))
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+async def ReadRequest(Reader, MaximumUploadSize):
+   # Returns (Method, Target, Version, Headers, Body), or None when the client closed the connection
+   RequestLine = await Reader.readline()
+   if not RequestLine.strip():
+      return (None)
+   try:
+      Method, Target, Version = RequestLine.decode('latin-1').split()
+   except ValueError:
+      raise ServiceError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+   Headers = dict()
+   for LineNumber in range(MAXIMUM_HEADER_LINES):
+      Line = await Reader.readline()
+      if Line in (b"\r\n", b"\n", b""):
+         break
+      Name, Separator, Value = Line.decode('latin-1').partition(":")
+      Headers[Name.strip().lower()] = Value.strip()
+   else:
+      raise ServiceError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many header lines")
+   if 'transfer-encoding' in Headers:
+      raise ServiceError(HTTPStatus.LENGTH_REQUIRED, "Send the file with a Content-Length")
+   try:
+      Length = int(Headers.get('content-length', 0))
+   except ValueError:
+      raise ServiceError(HTTPStatus.BAD_REQUEST, "Malformed Content-Length")
+   if Length > MaximumUploadSize:
+      raise ServiceError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Files larger than "+MaximumUploadSize.__str__()+" bytes are not accepted")
+   Body = await Reader.readexactly(Length) if Length > 0 else b""
+   return ((Method, Target, Version, Headers, Body))
+
+def GetKeepAlive(Version, Headers):
+   Connection = Headers.get('connection', "").lower()
+   if Version == "HTTP/1.0":
+      return (Connection == "keep-alive")
+   return (Connection != "close")
+
+async def WriteResponse(Writer, Status, ContentType, Body, KeepAlive):
+   Status = HTTPStatus(Status)
+   Header = "HTTP/1.1 %d %s\r\nContent-Type: %s\r\nContent-Length: %d\r\nConnection: %s\r\n\r\n" % (Status.value, Status.phrase, ContentType, len(Body), "keep-alive" if KeepAlive else "close")
+   Writer.write(Header.encode('latin-1') + Body)
+   await Writer.drain()
+
+def GetErrorResponse(Error):
+   return (("application/json", json.dumps(dict(Error=Error.__str__())).encode()))
+
+def GetQueryValue(Query, Name, Default=None):
+   return (Query[Name][-1] if Name in Query else Default)
+
+def ParseQueryValues(Query, Name, Parse):
+   try:
+      return ([Parse(Value) for Value in Query.get(Name, [])])
+   except ValueError:
+      raise ServiceError(HTTPStatus.BAD_REQUEST, "Malformed "+Name+" argument")
+
+def GetRequestSettings(Request, Query):
+   # The settings of the request in the form FlirBatchProcessor.GetImageResults() uses
+   Settings = dict()
+   Settings['Points'] = ParseQueryValues(Query, 'point', FlirBatchProcessor.ParsePoint)
+   Settings['Boxes'] = ParseQueryValues(Query, 'box', FlirBatchProcessor.ParseBox)
+   Settings['ThresholdedBoxes'] = ParseQueryValues(Query, 'thresholdbox', FlirBatchProcessor.ParseBox)
+   Thresholds = ParseQueryValues(Query, 'threshold', float)
+   Settings['ThresholdTemperature'] = Thresholds[-1] if Thresholds else 20.0
+   if Request == "/analyse":
+      Settings['MetaData'] = GetQueryValue(Query, 'metadata', "1") not in ("0", "false", "no")
+   else:
+      Settings['Kind'] = GetQueryValue(Query, 'kind', "thermal")
+      if Settings['Kind'] not in RENDER_KINDS:
+         raise ServiceError(HTTPStatus.BAD_REQUEST, "kind must be one of "+", ".join(RENDER_KINDS))
+      MinTemperatures = ParseQueryValues(Query, 'min', float)
+      MaxTemperatures = ParseQueryValues(Query, 'max', float)
+      Settings['MinTemperature'] = MinTemperatures[-1] if MinTemperatures else None
+      Settings['MaxTemperature'] = MaxTemperatures[-1] if MaxTemperatures else None
+   return (Settings)
+
+def HashData(Data):
+   return (hashlib.sha256(Data).hexdigest())
+
+def ReadFile(FileName):
+   with open(FileName, 'rb') as FileHandle:
+      return (FileHandle.read())
+
+# The images opened last in this worker process, so an /analyse followed by a /render of the same file (or other
+# boxes in the same file) does not decode the file again. They are kept in the CompactMode of FLIRImage, so only the
+# raw thermal data and the file data stay in memory per image.
+WorkerImages = collections.OrderedDict()
+
+def GetWorkerImage(FileName, FileData, FileHash, CacheDirectory):
+   # Runs in a worker process, the FLIRImage class is imported here so the service process does not need it
+   import FlirFileParser
+   from FlirImageProcessor import FLIRImage
+   if FileHash in WorkerImages:
+      WorkerImages.move_to_end(FileHash)
+      return (WorkerImages[FileHash])
+   MyFlirImage = FLIRImage(FileName, SaveNormalImage=False, SaveThermalImage=False, CacheDirectory=CacheDirectory, CompactMode=True)
+   MyFlirImage.FileHash = FileHash
+   try:
+      MyFlirImage.FlirFile = FlirFileParser.ParseFlirData(FileData, FileName)
+   except FlirFileParser.FlirFileParserError:
+      # Not a layout the native parser knows, exiftool needs a file to read
+      with tempfile.NamedTemporaryFile(suffix=os.path.splitext(FileName)[1] or ".jpg", delete=False) as TemporaryFile:
+         TemporaryFile.write(FileData)
+      try:
+         MyFlirImage.ImageName = TemporaryFile.name
+         MyFlirImage.FlirFile
+         # Everything is read in one go, so the file can be removed
+         MyFlirImage.FlirObject['MetaData']
+         MyFlirImage.FlirObject['RawThermalData']
+         MyFlirImage.FlirObject['PictureData']
+      finally:
+         MyFlirImage.ImageName = FileName
+         os.remove(TemporaryFile.name)
+   WorkerImages[FileHash] = MyFlirImage
+   while len(WorkerImages) > WORKER_IMAGE_CACHE_SIZE:
+      WorkerImages.popitem(last=False)
+   return (MyFlirImage)
+
+def AnalyseFlirData(FileName, FileData, FileHash, Settings, CacheDirectory=None):
+   # Runs in a worker process, returns the JSON response
+   StartTime = time.time()
+   MyFlirImage = GetWorkerImage(FileName, FileData, FileHash, CacheDirectory)
+   Result = dict(File=FileName, Hash=FileHash)
+   Result.update(FlirBatchProcessor.GetImageResults(MyFlirImage, Settings))
+   if Settings['MetaData']:
+      Result['MetaData'] = MyFlirImage.FlirObject['MetaData']
+   Result['ProcessingTime'] = round(time.time()-StartTime, 3)
+   return (("application/json", json.dumps(Result).encode()))
+
+def RenderFlirData(FileName, FileData, FileHash, Settings, CacheDirectory=None):
+   # Runs in a worker process, returns the png response
+   import FlirThermalRenderer
+   from PIL import Image
+   MyFlirImage = GetWorkerImage(FileName, FileData, FileHash, CacheDirectory)
+   if Settings['Kind'] == 'thermal':
+      return (("image/png", FlirThermalRenderer.EncodeThermalImage(MyFlirImage.NewThermalImage, Settings['MinTemperature'], Settings['MaxTemperature'], Format="png")))
+   if Settings['Kind'] == 'normal':
+      ImageData = MyFlirImage.ScaledRGBImage
+   else:
+      # The boxes of this request only, the image object is shared with other requests
+      MyFlirImage.AverageMeasurementBoxes = Settings['Boxes']
+      try:
+         ImageData = MyFlirImage.RenderFlattenedImage()
+      finally:
+         MyFlirImage.AverageMeasurementBoxes = []
+   Stream = BytesIO()
+   Image.fromarray(ImageData).save(Stream, "png")
+   return (("image/png", Stream.getvalue()))
+
+async def RunService(Service, Host, Port):
+   Server = await Service.Start(Host, Port)
+   sys.stderr.write("Listening on http://%s:%d\n" % (Host, Port))
+   try:
+      async with Server:
+         await Server.serve_forever()
+   finally:
+      await Service.Close()
+
+def ParseArguments(Arguments=None):
+   Parser = argparse.ArgumentParser(description="HTTP service analysing FLIR Jpeg files.")
+   Parser.add_argument('--host', default=DEFAULT_HOST, help="Address to listen on (default: %s)." % DEFAULT_HOST)
+   Parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port to listen on (default: %d)." % DEFAULT_PORT)
+   Parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of worker processes (default: number of cpu's).")
+   Parser.add_argument('--root', action='append', default=[], metavar='DIRECTORY', help="Directory of which the files can be read with path=..., can be repeated (default: the current directory).")
+   Parser.add_argument('--cache', default=None, metavar='DIRECTORY', help="Keep the decoded thermal data in this directory (See FlirDataCache.py).")
+   Parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE//(1024*1024), metavar='MB', help="Size of the in memory cache of responses (default: %d)." % (DEFAULT_CACHE_SIZE//(1024*1024)))
+   Parser.add_argument('--max-upload', type=int, default=DEFAULT_MAXIMUM_UPLOAD_SIZE//(1024*1024), metavar='MB', help="Largest file accepted (default: %d)." % (DEFAULT_MAXIMUM_UPLOAD_SIZE//(1024*1024)))
+   return(Parser.parse_args(Arguments))
+
+def Main(Arguments=None):
+   Options = ParseArguments(Arguments)
+   Service = FlirAnalysisService(Options.root, Options.workers, Options.cache, Options.cache_size*1024*1024, Options.max_upload*1024*1024)
+   try:
+      asyncio.run(RunService(Service, Options.host, Options.port))
+   except KeyboardInterrupt:
+      pass
+   return(0)
+
+##############################################################################################################
+# Main Application
+##############################################################################################################
+if __name__ == "__main__":
+   sys.exit(Main())
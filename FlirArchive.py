@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirArchive.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This Script exports the data of (many thousands of) FLIR files into an archive directory that analytics tools
+# can read back selectively, without decoding the original Jpeg files again:
+# - The thermal frames are stored in chunks, a compressed numpy .npz file per chunk of frames holding
+#   'RawThermalData' (frames x height x width, uint16 camera counts, already byte swapped) and optionally
+#   'ThermalData' (the temperatures as float32). Reading a frame only decompresses the chunk it is in.
+# - Per chunk a columnar table (.json) with one column per attribute and one row per frame: the file name and hash,
+#   the calibration values (Calibration.PlanckR1 ... Calibration.ReflectedApparentTemperature), the flattened meta
+#   data (MetaData.<name>), the min/max temperatures, point temperatures and (thresholded) box statistics asked for
+#   (the same results as FlirBatchProcessor.py, flattened like Boxes.0.AverageTemperature), and the position of
+#   the frame in its chunk.
+# Every writer writes its own chunks, named after the writer, to temporary files that are renamed when complete,
+# and the table is written last, so a chunk only becomes part of the archive when it is complete. Several
+# processes (or machines on a shared disk) can therefore add to the same archive at the same time, and exporting
+# more files later simply adds chunks.
+#
+# Writing, with a FlirArchiveWriter object (Directory, ChunkSize, StoreTemperatures):
+#   Writer.AddFlirImage(MyFlirImage, Settings) or Writer.Add(RawThermalData, Calibration, MetaData, Results)
+#   Writer.Close()
+# ArchiveStage(Frames, Writer) adds the frames of a FlirFrameStream.py pipeline (sequence files).
+# Reading, with a FlirArchive object (Directory):
+#   Table = Archive.ReadTable(['File', 'MaxTemperature'])     # dict of numpy arrays, only these columns
+#   Rows = numpy.nonzero(Table['MaxTemperature'] > 80.0)[0]
+#   Frames = Archive.ReadFrames(Rows)                          # raw frames, only the chunks holding these rows
+#   Temperatures = Archive.ReadTemperatures(Rows)              # converted with the stored calibration values
+#
+# As script it exports FLIR Jpeg files (directories and / or glob patterns, like FlirBatchProcessor.py) on a number
+# of worker processes, each worker writes its own chunks. Files that are in the archive already (same content)
+# are skipped, so a re-run after adding files only exports the new ones. --csv writes the whole table as csv.
+#
+# Example:
+#   python FlirArchive.py /data/FlirArchive /data/Inspections/2021 --workers 8 --box 100,100,200,200
+#   python FlirArchive.py /data/FlirArchive "/data/Inspections/*/FLIR*.jpg" --temperatures --csv Inspections.csv
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import os
+import sys
+import csv
+import json
+import time
+import uuid
+import socket
+import argparse
+import tempfile
+import numpy
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import FlirDataCache
+import FlirFrameStream
+import FlirBatchProcessor
+import FlirTemperatureConversion
+
+##############################################################################################################
+# Constants
+##############################################################################################################
+DEFAULT_CHUNK_SIZE = 256
+CALIBRATION_NAMES = ('PlanckR1', 'PlanckR2', 'PlanckB', 'PlanckF', 'PlanckO', 'Emissivity', 'ReflectedApparentTemperature')
+
+##############################################################################################################
+# Class Definitions
+##############################################################################################################
+class FlirArchiveWriter:
+   def __init__(self, Directory, ChunkSize=DEFAULT_CHUNK_SIZE, StoreTemperatures=False, WriterName=None):
+      self.Directory = Directory
+      self.ChunkSize = ChunkSize
+      self.StoreTemperatures = StoreTemperatures
+      # Unique per writer, so writers never write the same chunk file
+      self.WriterName = WriterName or "%s-%d-%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+      self.NumberOfChunks = 0
+      # The frames waiting to be written, per frame size, as lists of (raw data, temperatures, row)
+      self.Pending = dict()
+      os.makedirs(Directory, exist_ok=True)
+
+   def Add(self, RawThermalData, Calibration, MetaData, Results=None, ThermalData=None):
+      # RawThermalData are the camera counts (byte swapped when needed), Calibration a dictionary with the values
+      # of CALIBRATION_NAMES and Results a dictionary of other attributes (nested lists and dictionaries are
+      # flattened into columns). The temperatures are only needed when they are stored.
+      Row = dict()
+      FlattenInto(Row, 'Calibration', dict((Name, Calibration[Name]) for Name in CALIBRATION_NAMES))
+      FlattenInto(Row, 'MetaData', MetaData)
+      for Name, Value in (Results or dict()).items():
+         FlattenInto(Row, Name, Value)
+      if self.StoreTemperatures and ThermalData is None:
+         ThermalData = ConvertRawThermalData(RawThermalData, Row)
+      Frames = self.Pending.setdefault(numpy.shape(RawThermalData), [])
+      Frames.append((numpy.asarray(RawThermalData, dtype=numpy.uint16), ThermalData, Row))
+      if len(Frames) >= self.ChunkSize:
+         self.WriteChunk(numpy.shape(RawThermalData))
+
+   def AddFlirImage(self, MyFlirImage, Settings=None):
+      # The raw frame, calibration values, meta data and the results of FlirBatchProcessor.GetImageResults() of a
+      # FLIRImage (Settings as made by FlirBatchProcessor.GetSettings(), without Settings only the min/max)
+      PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, SwapBytes = MyFlirImage.GetCalibrationValues()
+      Calibration = dict(zip(CALIBRATION_NAMES, (PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT)))
+      RawThermalData = MyFlirImage.FlirObject['RawThermalData']
+      if SwapBytes:
+         RawThermalData = RawThermalData.byteswap()
+      Results = dict(File=MyFlirImage.ImageName, Hash=MyFlirImage.FileHash)
+      Results.update(FlirBatchProcessor.GetImageResults(MyFlirImage, Settings or dict(Boxes=[], ThresholdedBoxes=[])))
+      ThermalData = MyFlirImage.FlirObject['ThermalData'] if self.StoreTemperatures else None
+      self.Add(RawThermalData, Calibration, MyFlirImage.FlirObject['MetaData'], Results, ThermalData)
+
+   def WriteChunk(self, Shape):
+      Frames = self.Pending.pop(Shape, [])
+      if not Frames:
+         return
+      ChunkName = "%s-%06d" % (self.WriterName, self.NumberOfChunks)
+      self.NumberOfChunks += 1
+      Arrays = dict(RawThermalData=numpy.stack([RawThermalData for RawThermalData, ThermalData, Row in Frames]))
+      if self.StoreTemperatures:
+         Arrays['ThermalData'] = numpy.stack([ThermalData for RawThermalData, ThermalData, Row in Frames]).astype(numpy.float32)
+      # Columns from the rows, a row without an attribute gets None
+      Rows = [Row for RawThermalData, ThermalData, Row in Frames]
+      for Position, Row in enumerate(Rows):
+         Row['Position'] = Position
+      Names = dict()
+      for Row in Rows:
+         Names.update(dict.fromkeys(Row))
+      Table = dict((Name, [Row.get(Name) for Row in Rows]) for Name in Names)
+      # The frames first, the table marks the chunk as complete
+      self.WriteFile(ChunkName+".npz", lambda FileHandle: numpy.savez_compressed(FileHandle, **Arrays))
+      self.WriteFile(ChunkName+".json", lambda FileHandle: FileHandle.write(json.dumps(FlirFrameStream.ToJson(Table)).encode()))
+
+   def WriteFile(self, Name, WriteFunction):
+      # Written to a temporary file first and then renamed, so readers never see a half written file
+      FileDescriptor, TemporaryName = tempfile.mkstemp(dir=self.Directory, suffix=".tmp")
+      try:
+         with os.fdopen(FileDescriptor, 'wb') as FileHandle:
+            WriteFunction(FileHandle)
+         os.replace(TemporaryName, os.path.join(self.Directory, Name))
+      except BaseException:
+         if os.path.exists(TemporaryName):
+            os.remove(TemporaryName)
+         raise
+
+   def Close(self):
+      # Writes the frames that did not fill a chunk yet
+      for Shape in list(self.Pending):
+         self.WriteChunk(Shape)
+
+class FlirArchive:
+   def __init__(self, Directory):
+      self.Directory = Directory
+      self.Tables = dict()
+
+   def GetChunkNames(self):
+      # The complete chunks (the ones with a table), in a fixed order
+      if not os.path.isdir(self.Directory):
+         return ([])
+      return (sorted(os.path.splitext(Name)[0] for Name in os.listdir(self.Directory) if Name.endswith(".json")))
+
+   def GetTable(self, ChunkName):
+      # The table of a chunk, chunks never change once written so they are read only once
+      if ChunkName not in self.Tables:
+         with open(os.path.join(self.Directory, ChunkName+".json"), 'r') as TableFile:
+            self.Tables[ChunkName] = json.load(TableFile)
+      return (self.Tables[ChunkName])
+
+   def GetColumnNames(self):
+      Names = dict()
+      for ChunkName in self.GetChunkNames():
+         Names.update(dict.fromkeys(self.GetTable(ChunkName)))
+      return (list(Names))
+
+   def ReadTable(self, Columns=None):
+      # Returns a dictionary with a numpy array per column (all columns when None is passed) and the 'Chunk' column.
+      # Columns of numbers are float arrays (nan for missing values) or int arrays, other columns object arrays.
+      ChunkNames = self.GetChunkNames()
+      Columns = self.GetColumnNames() if Columns is None else list(Columns)
+      Values = dict((Name, []) for Name in Columns)
+      ChunkColumn = []
+      for ChunkName in ChunkNames:
+         Table = self.GetTable(ChunkName)
+         NumberOfRows = len(Table['Position'])
+         ChunkColumn.extend([ChunkName]*NumberOfRows)
+         for Name in Columns:
+            Values[Name].extend(Table.get(Name, [None]*NumberOfRows))
+      Result = dict((Name, ToColumn(ColumnValues)) for Name, ColumnValues in Values.items())
+      Result['Chunk'] = numpy.array(ChunkColumn, dtype=object)
+      return (Result)
+
+   def ReadFrames(self, Rows=None, Name='RawThermalData'):
+      # The frames of rows of the table (all when None is passed) as list of arrays, every chunk holding one of the
+      # rows is decompressed once. Name='ThermalData' gives the stored temperatures.
+      Table = self.ReadTable(['Position'])
+      Rows = numpy.arange(len(Table['Chunk'])) if Rows is None else numpy.asarray(Rows, dtype=numpy.int64).reshape(-1)
+      Frames = [None]*len(Rows)
+      for ChunkName in sorted(set(Table['Chunk'][Rows])):
+         InChunk = numpy.nonzero(Table['Chunk'][Rows] == ChunkName)[0]
+         with numpy.load(os.path.join(self.Directory, ChunkName+".npz")) as ChunkFile:
+            ChunkFrames = ChunkFile[Name]
+         for Index in InChunk:
+            Frames[Index] = ChunkFrames[Table['Position'][Rows[Index]]]
+      return (Frames)
+
+   def ReadTemperatures(self, Rows=None):
+      # The temperatures of rows of the table, converted from the raw frames with the stored calibration values
+      Table = self.ReadTable(['Calibration.'+Name for Name in CALIBRATION_NAMES])
+      Rows = numpy.arange(len(Table['Chunk'])) if Rows is None else numpy.asarray(Rows, dtype=numpy.int64).reshape(-1)
+      Temperatures = []
+      for Row, RawThermalData in zip(Rows, self.ReadFrames(Rows)):
+         Calibration = dict((Name, Column[Row]) for Name, Column in Table.items())
+         Temperatures.append(ConvertRawThermalData(RawThermalData, Calibration))
+      return (Temperatures)
+
+   def GetHashes(self):
+      return (set(Hash for Hash in self.ReadTable(['Hash'])['Hash'] if Hash is not None))
+
+   def WriteCsv(self, FileName, Columns=None):
+      Table = self.ReadTable(Columns)
+      Names = list(Table)
+      with open(FileName, 'w', newline='') as CsvFile:
+         Writer = csv.writer(CsvFile)
+         Writer.writerow(Names)
+         for Row in range(len(Table['Chunk'])):
+            Writer.writerow([Table[Name][Row] for Name in Names])
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+def FlattenInto(Row, Name, Value):
+   # Nested dictionaries and lists become columns named <Name>.<Key> and <Name>.<Index>
+   if isinstance(Value, dict):
+      for Key, Item in Value.items():
+         FlattenInto(Row, Name+"."+Key.__str__(), Item)
+   elif isinstance(Value, (list, tuple)):
+      for Index, Item in enumerate(Value):
+         FlattenInto(Row, Name+"."+Index.__str__(), Item)
+   else:
+      Row[Name] = FlirFrameStream.ToJson(Value)
+
+def ToColumn(Values):
+   if all(isinstance(Value, int) and not isinstance(Value, bool) for Value in Values):
+      return (numpy.array(Values, dtype=numpy.int64))
+   if all(Value is None or (isinstance(Value, (int, float)) and not isinstance(Value, bool)) for Value in Values):
+      return (numpy.array([numpy.nan if Value is None else Value for Value in Values], dtype=numpy.float64))
+   return (numpy.array(Values, dtype=object))
+
+def ConvertRawThermalData(RawThermalData, Row):
+   # The raw frames in the archive are byte swapped already
+   Calibration = [Row['Calibration.'+Name] for Name in CALIBRATION_NAMES]
+   return (FlirTemperatureConversion.ConvertRawToTemperature(RawThermalData, *Calibration, SwapBytes=False, DataType=numpy.float32))
+
+def ArchiveStage(Frames, Writer):
+   # FlirFrameStream.py stage that adds every frame to the archive, with the frame entries that are not arrays
+   for Frame in Frames:
+      MetaData = Frame['MetaData']
+      Calibration = dict((Name, MetaData[Name]) for Name in CALIBRATION_NAMES[:-1])
+      Calibration['ReflectedApparentTemperature'] = float(MetaData['ReflectedApparentTemperature'].split(" ")[0])
+      RawThermalData = Frame['RawThermalData']
+      # The same byte swap rule as FLIRImage and FlirFrameStream.ConvertFrames()
+      if FlirTemperatureConversion.IsRawDataByteSwapped(MetaData):
+         RawThermalData = RawThermalData.byteswap()
+      Results = dict((Key, Value) for Key, Value in Frame.items() if Key not in ('MetaData', 'RawThermalData', 'ThermalData'))
+      Writer.Add(RawThermalData, Calibration, MetaData, Results, Frame.get('ThermalData'))
+      yield (Frame)
+
+def ExportFlirFiles(Directory, FileNames, Settings, ChunkSize, StoreTemperatures):
+   # Runs in a worker process, exports a group of files as chunk(s) of its own writer and returns the errors
+   from FlirImageProcessor import FLIRImage
+   Writer = FlirArchiveWriter(Directory, ChunkSize, StoreTemperatures)
+   Errors = []
+   for FileName in FileNames:
+      try:
+         Writer.AddFlirImage(FLIRImage(FileName, SaveNormalImage=False, SaveThermalImage=False, CacheDirectory=Settings['CacheDirectory'], CompactMode=True), Settings)
+      except Exception as Error:
+         Errors.append(dict(File=FileName, Error=type(Error).__name__+": "+Error.__str__()))
+   Writer.Close()
+   return (Errors)
+
+def ExportToArchive(Directory, FileNames, Settings, ChunkSize=DEFAULT_CHUNK_SIZE, StoreTemperatures=False, NumberOfWorkers=None):
+   # Returns the list of files that failed. A worker gets a chunk of files at a time, but smaller groups when there
+   # are not enough files to give every worker a full chunk, so all workers are used.
+   NumberOfWorkers = NumberOfWorkers or os.cpu_count()
+   GroupSize = max(1, min(ChunkSize, -(-len(FileNames)//NumberOfWorkers)))
+   Errors = []
+   StartTime = time.time()
+   with ProcessPoolExecutor(max_workers=NumberOfWorkers) as Executor:
+      Futures = dict()
+      for Start in range(0, len(FileNames), GroupSize):
+         Group = FileNames[Start:Start+GroupSize]
+         Futures[Executor.submit(ExportFlirFiles, Directory, Group, Settings, ChunkSize, StoreTemperatures)] = len(Group)
+      Done = 0
+      for Future in as_completed(Futures):
+         Errors.extend(Future.result())
+         Done += Futures[Future]
+         FlirBatchProcessor.ShowProgress(Done, len(FileNames), len(Errors), StartTime)
+   sys.stderr.write("\n")
+   return (Errors)
+
+def ParseArguments(Arguments=None):
+   Parser = argparse.ArgumentParser(description="Export FLIR Jpeg files into a chunked archive of frames and tables.")
+   Parser.add_argument('Archive', help="Archive directory, created when it does not exist, exported files are added.")
+   Parser.add_argument('Inputs', nargs='*', help="Directories (searched recursively) and/or glob patterns of FLIR Jpeg files.")
+   Parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of worker processes (default: number of cpu's).")
+   Parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Number of frames per chunk (default: %d)." % DEFAULT_CHUNK_SIZE)
+   Parser.add_argument('--temperatures', action='store_true', help="Store the temperatures (float32) next to the raw frames.")
+   Parser.add_argument('--csv', default=None, metavar='FILE', help="Write the table of the whole archive to this csv file.")
+   Parser.add_argument('--point', action='append', default=[], type=FlirBatchProcessor.ParsePoint, metavar='X,Y', help="Pixel to store the temperature of, can be repeated.")
+   Parser.add_argument('--box', action='append', default=[], type=FlirBatchProcessor.ParseBox, metavar='X1,Y1,X2,Y2', help="Box to store the average temperature of, can be repeated.")
+   Parser.add_argument('--thresholdbox', action='append', default=[], type=FlirBatchProcessor.ParseBox, metavar='X1,Y1,X2,Y2', help="Box to store the thresholded average temperature of, can be repeated.")
+   Parser.add_argument('--threshold', type=float, default=20.0, help="Threshold temperature for the --thresholdbox boxes (default: 20.0).")
+   Parser.add_argument('--cache', default=None, metavar='DIRECTORY', help="Use the decoded data in this directory (See FlirDataCache.py).")
+   return(Parser.parse_args(Arguments))
+
+def Main(Arguments=None):
+   Options = ParseArguments(Arguments)
+   Settings = dict(Points=Options.point, Boxes=Options.box, ThresholdedBoxes=Options.thresholdbox, ThresholdTemperature=Options.threshold, CacheDirectory=Options.cache)
+   Archive = FlirArchive(Options.Archive)
+   KnownHashes = Archive.GetHashes()
+   FoundFileNames = FlirBatchProcessor.FindFlirFiles(Options.Inputs)
+   FileNames = [FileName for FileName in FoundFileNames if FlirDataCache.HashFile(FileName) not in KnownHashes]
+   Errors = []
+   if FileNames:
+      Errors = ExportToArchive(Options.Archive, FileNames, Settings, Options.chunk_size, Options.temperatures, Options.workers)
+   for Error in Errors:
+      sys.stderr.write(Error['File']+": "+Error['Error']+"\n")
+   sys.stderr.write("Exported %d files, %d failed, %d files were in the archive already\n" % (len(FileNames)-len(Errors), len(Errors), len(FoundFileNames)-len(FileNames)))
+   if Options.csv is not None:
+      Archive.WriteCsv(Options.csv)
+   return(0 if not Errors else 2)
+
+##############################################################################################################
+# Main Application
+##############################################################################################################
+if __name__ == "__main__":
+   sys.exit(Main())
@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirBatchProcessor.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This Script processes a whole directory (or a glob pattern) of FLIR Jpeg files without opening a window.
+# The files are spread over a number of worker processes, for every file:
+# - The Thermal and Normal jpg files are saved next to the FLIR file (like the FLIRImage class does).
+# - The minimum and maximum temperature and their locations are determined, and the temperature of every pixel
+#   passed with --point.
+# - The average temperature of every box passed with --box is calculated, and the thresholded average
+#   temperature of every box passed with --thresholdbox (only temperatures above --threshold are used).
+# - With --hotspots K the K hottest regions above --hotspot-threshold (a temperature, ambient+<degrees> for
+#   degrees above the AtmosphericTemperature, default --threshold) of at least --hotspot-area thermal pixels,
+#   with their area, average, maximum, centroid and bounding box (See FlirHotspots.py).
+# - One line of JSON with these results and the meta data of the file is written to the output file.
+# With --compact the images are opened in the CompactMode of FLIRImage, the temperatures are converted in 32 bit
+# and only for the parts that are used, which takes less memory per worker.
+# A file that can not be processed is reported in the output file with an Error attribute, processing continues
+# with the next file. When a worker process dies (killed, out of memory) a new pool of workers is started, the files
+# that were being processed at that moment are tried again one at a time, so only a file that stops a worker on its
+# own (MAXIMUM_ATTEMPTS times) is reported as failed. The progress is shown on stderr.
+# With --profile the wall time, cpu time and peak memory of every processing stage of every file are written to
+# a JSON file and a Chrome trace file per FLIR file (See FlirInstrumentation.py).
+#
+# Box coordinates are given as X1,Y1,X2,Y2 in pixels of the (upscaled) image, like the boxes drawn in the window.
+#
+# Example:
+#   python FlirBatchProcessor.py /data/Inspections/2021 --workers 8 --output Results.jsonl --box 100,100,200,200
+#   python FlirBatchProcessor.py "/data/Inspections/*/FLIR*.jpg" --no-normal --no-thermal --cache /data/FlirCache
+#   python FlirBatchProcessor.py /data/Inspections/2021 --profile /tmp/FlirProfiles
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import collections
+import numpy
+import FlirInstrumentation
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+##############################################################################################################
+# Constants
+##############################################################################################################
+MAXIMUM_ATTEMPTS = 3
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+def FindFlirFiles(Inputs):
+   FileNames = []
+   for Input in Inputs:
+      if os.path.isdir(Input):
+         for Root, Directories, Files in os.walk(Input):
+            Directories.sort()
+            for FileName in sorted(Files):
+               BaseName, Extension = os.path.splitext(FileName)
+               # Skip the Thermal and Normal jpg files that were written by an earlier run
+               if Extension.lower() in ('.jpg', '.jpeg') and not BaseName.endswith(('Thermal', 'Normal')):
+                  FileNames.append(os.path.join(Root, FileName))
+      else:
+         FileNames.extend(sorted(glob.glob(Input)))
+   return(FileNames)
+
+def ParsePoint(PointString):
+   X, Y = [float(Value) for Value in PointString.split(',')]
+   return((X, Y))
+
+def ParseBox(BoxString):
+   X1, Y1, X2, Y2 = [float(Value) for Value in BoxString.split(',')]
+   return(dict(X1=X1, Y1=Y1, X2=X2, Y2=Y2))
+
+def ParseHotspotThreshold(ThresholdString):
+   # Returns (Temperature, AboveAmbient), "60" is an absolute temperature, "ambient+15" 15 degrees above ambient
+   if ThresholdString.lower().startswith('ambient'):
+      return((None, float(ThresholdString[len('ambient'):] or 0.0)))
+   return((float(ThresholdString), None))
+
+def ToFloat(Value):
+   # JSON has no nan, boxes without measurements get null
+   if Value is None or numpy.isnan(Value):
+      return(None)
+   return(round(float(Value), 3))
+
+def ProcessFlirFile(FileName, Settings):
+   # Runs in a worker process, the FLIRImage class is imported here so the main process does not need it.
+   from FlirImageProcessor import FLIRImage
+   if Settings.get('ProfileDirectory') is None:
+      return(AnalyseFlirFile(FLIRImage, FileName, Settings))
+   # The stages of this file are recorded and written to the profile directory, also when the file fails
+   FlirInstrumentation.Enable(TraceMemory=True)
+   try:
+      return(AnalyseFlirFile(FLIRImage, FileName, Settings))
+   finally:
+      ProfileName = os.path.join(Settings['ProfileDirectory'], GetProfileName(FileName))
+      FlirInstrumentation.DumpJson(ProfileName+".json", FileName)
+      FlirInstrumentation.DumpChromeTrace(ProfileName+".trace.json", FileName)
+      FlirInstrumentation.ClearRecords(FileName)
+
+def GetProfileName(FileName):
+   # The path of the file with the separators replaced, so files with the same name in different directories
+   # get their own profile.
+   Name = os.path.splitext(os.path.normpath(FileName))[0].lstrip(os.sep)
+   return(Name.replace(os.sep, "_").replace(":", "_"))
+
+def AnalyseFlirFile(FLIRImage, FileName, Settings):
+   StartTime = time.time()
+   MyFlirImage = FLIRImage(FileName, SaveNormalImage=Settings['SaveNormalImage'], SaveThermalImage=Settings['SaveThermalImage'], CacheDirectory=Settings['CacheDirectory'], CompactMode=Settings.get('CompactMode', False))
+   Result = dict()
+   Result['File'] = FileName
+   Result.update(GetImageResults(MyFlirImage, Settings))
+   if Settings['SaveThermalImage']:
+      Result['ThermalImage'] = MyFlirImage.ThermalImageFileName
+   if Settings['SaveNormalImage']:
+      Result['NormalImage'] = MyFlirImage.NormalImageFileName
+   Result['MetaData'] = MyFlirImage.FlirObject['MetaData']
+   Result['ProcessingTime'] = round(time.time()-StartTime, 3)
+   return(Result)
+
+def GetImageResults(MyFlirImage, Settings):
+   # The temperatures asked for in the Settings, also used by FlirAnalysisService.py
+   MinTemperature, MaxTemperature, MinLocation, MaxLocation = MyFlirImage.GetMinMaxTemperatureAndLocation()
+   Result = dict()
+   Result['MinTemperature'] = ToFloat(MinTemperature)
+   Result['MinLocation'] = [int(MinLocation[0]), int(MinLocation[1])]
+   Result['MaxTemperature'] = ToFloat(MaxTemperature)
+   Result['MaxLocation'] = [int(MaxLocation[0]), int(MaxLocation[1])]
+   if Settings.get('Points'):
+      Result['Points'] = [dict(Point=[X, Y], Temperature=ToFloat(MyFlirImage.GetPointTemperature(X, Y))) for X, Y in Settings['Points']]
+   # The statistics of all boxes are calculated in one go
+   Result['Boxes'] = []
+   if Settings['Boxes']:
+      Statistics = MyFlirImage.GetBoxesStatistics(Settings['Boxes'])
+      for Index, Box in enumerate(Settings['Boxes']):
+         Result['Boxes'].append(dict(Box=[Box['X1'], Box['Y1'], Box['X2'], Box['Y2']], AverageTemperature=ToFloat(Statistics['Mean'][Index]), StandardDeviation=ToFloat(Statistics['Std'][Index]), NumberOfMeasurements=int(Statistics['Count'][Index])))
+   Result['ThresholdedBoxes'] = []
+   if Settings['ThresholdedBoxes']:
+      Statistics = MyFlirImage.GetBoxesStatistics(Settings['ThresholdedBoxes'], Settings['ThresholdTemperature'])
+      for Index, Box in enumerate(Settings['ThresholdedBoxes']):
+         Result['ThresholdedBoxes'].append(dict(Box=[Box['X1'], Box['Y1'], Box['X2'], Box['Y2']], ThresholdTemperature=Settings['ThresholdTemperature'], AverageTemperature=ToFloat(Statistics['Mean'][Index]), StandardDeviation=ToFloat(Statistics['Std'][Index]), NumberOfMeasurements=int(Statistics['Count'][Index])))
+   if Settings.get('Hotspots'):
+      Temperature, AboveAmbient = Settings['Hotspots']['Threshold']
+      Hotspots = MyFlirImage.GetHotspots(Temperature, AboveAmbient, Settings['Hotspots']['MinimumArea'], Settings['Hotspots']['TopK'])
+      Result['Hotspots'] = []
+      for Hotspot in Hotspots:
+         Box = Hotspot['Box']
+         Result['Hotspots'].append(dict(Box=[int(Box['X1']), int(Box['Y1']), int(Box['X2']), int(Box['Y2'])], Area=int(Hotspot['Area']), AverageTemperature=ToFloat(Hotspot['AverageTemperature']), StandardDeviation=ToFloat(Hotspot['StandardDeviation']), MaxTemperature=ToFloat(Hotspot['MaxTemperature']),
+                                        MaxLocation=[int(Value) for Value in Hotspot['MaxLocation']], Centroid=[ToFloat(Value) for Value in Hotspot['Centroid']]))
+   return(Result)
+
+def SafeProcessFlirFile(FileName, Settings):
+   try:
+      return(ProcessFlirFile(FileName, Settings))
+   except Exception as Error:
+      return(dict(File=FileName, Error=type(Error).__name__+": "+Error.__str__()))
+
+def ShowProgress(Done, Total, Failed, StartTime):
+   Elapsed = time.time()-StartTime
+   Rate = Done/Elapsed if Elapsed > 0 else 0.0
+   sys.stderr.write("\rProcessed %d/%d files, %d failed, %.1f files/s" % (Done, Total, Failed, Rate))
+   sys.stderr.flush()
+
+def ProcessFlirFiles(FileNames, Settings, OutputFile, NumberOfWorkers=None):
+   # Returns the number of files that failed. At most 2 files per worker are given to the pool at a time, so a worker
+   # that dies only affects those files, and Suspects (files that were running when a worker died) are given to the
+   # pool alone, so a crash can be put on the right file.
+   NumberOfWorkers = NumberOfWorkers or os.cpu_count()
+   Failed = 0
+   Done = 0
+   StartTime = time.time()
+   Waiting = collections.deque(FileNames)
+   Suspects = collections.deque()
+   Attempts = collections.Counter()
+   # The file name per future, and whether it was running alone
+   InFlight = dict()
+   Executor = ProcessPoolExecutor(max_workers=NumberOfWorkers)
+   try:
+      while Waiting or Suspects or InFlight:
+         if Suspects:
+            if not InFlight:
+               FileName = Suspects.popleft()
+               InFlight[Executor.submit(SafeProcessFlirFile, FileName, Settings)] = (FileName, True)
+         else:
+            while Waiting and len(InFlight) < 2*NumberOfWorkers:
+               FileName = Waiting.popleft()
+               InFlight[Executor.submit(SafeProcessFlirFile, FileName, Settings)] = (FileName, False)
+         Finished, Running = wait(list(InFlight), return_when=FIRST_COMPLETED)
+         BrokenWorkers = False
+         for Future in Finished:
+            FileName, Alone = InFlight.pop(Future)
+            try:
+               Result = Future.result()
+            except BrokenProcessPool as Error:
+               BrokenWorkers = True
+               if Alone:
+                  Attempts[FileName] += 1
+               if Attempts[FileName] < MAXIMUM_ATTEMPTS:
+                  Suspects.append(FileName)
+                  continue
+               Result = dict(File=FileName, Error=type(Error).__name__+": "+Error.__str__())
+            Done += 1
+            if 'Error' in Result:
+               Failed += 1
+            OutputFile.write(json.dumps(Result)+"\n")
+            OutputFile.flush()
+            ShowProgress(Done, len(FileNames), Failed, StartTime)
+         if BrokenWorkers:
+            # The whole pool is broken, the other files it was running are suspects as well
+            for Future in InFlight:
+               Suspects.append(InFlight[Future][0])
+            InFlight.clear()
+            Executor.shutdown(wait=False)
+            Executor = ProcessPoolExecutor(max_workers=NumberOfWorkers)
+   finally:
+      Executor.shutdown()
+   sys.stderr.write("\n")
+   return(Failed)
+
+def AddProcessingArguments(Parser):
+   # The options of what is done with every file, shared with FlirWatchFolder.py
+   Parser.add_argument('--point', action='append', default=[], type=ParsePoint, metavar='X,Y', help="Pixel to report the temperature of, can be repeated.")
+   Parser.add_argument('--box', action='append', default=[], type=ParseBox, metavar='X1,Y1,X2,Y2', help="Box to calculate the average temperature of, can be repeated.")
+   Parser.add_argument('--thresholdbox', action='append', default=[], type=ParseBox, metavar='X1,Y1,X2,Y2', help="Box to calculate the thresholded average temperature of, can be repeated.")
+   Parser.add_argument('--threshold', type=float, default=20.0, help="Threshold temperature for the --thresholdbox boxes (default: 20.0).")
+   Parser.add_argument('--hotspots', type=int, default=None, metavar='K', help="Report the K hottest regions above --hotspot-threshold.")
+   Parser.add_argument('--hotspot-threshold', type=ParseHotspotThreshold, default=(None, None), metavar='TEMPERATURE', help="Temperature, or ambient+DEGREES above the AtmosphericTemperature (default: --threshold).")
+   Parser.add_argument('--hotspot-area', type=int, default=1, metavar='PIXELS', help="Minimum area of a hotspot in thermal pixels (default: 1).")
+   Parser.add_argument('--no-normal', action='store_true', help="Do not save the Normal jpg files.")
+   Parser.add_argument('--no-thermal', action='store_true', help="Do not save the Thermal jpg files.")
+   Parser.add_argument('--cache', default=None, metavar='DIRECTORY', help="Keep the decoded thermal data in this directory, re-runs skip the decoding.")
+   Parser.add_argument('--compact', action='store_true', help="Keep only the raw thermal data of an image and convert the temperatures when needed (less memory per worker).")
+   Parser.add_argument('--profile', default=None, metavar='DIRECTORY', help="Write the time and memory used per processing stage of every file to this directory (JSON and Chrome trace).")
+
+def GetSettings(Options):
+   Settings = dict()
+   Settings['SaveNormalImage'] = not Options.no_normal
+   Settings['SaveThermalImage'] = not Options.no_thermal
+   Settings['Points'] = Options.point
+   Settings['Boxes'] = Options.box
+   Settings['ThresholdedBoxes'] = Options.thresholdbox
+   Settings['ThresholdTemperature'] = Options.threshold
+   Settings['Hotspots'] = None
+   if Options.hotspots is not None:
+      # Without a hotspot threshold the --threshold temperature is used
+      Temperature, AboveAmbient = Options.hotspot_threshold
+      if Temperature is None and AboveAmbient is None:
+         Temperature = Options.threshold
+      Settings['Hotspots'] = dict(TopK=Options.hotspots, Threshold=(Temperature, AboveAmbient), MinimumArea=Options.hotspot_area)
+   Settings['CacheDirectory'] = Options.cache
+   Settings['CompactMode'] = Options.compact
+   Settings['ProfileDirectory'] = Options.profile
+   if Options.profile is not None:
+      os.makedirs(Options.profile, exist_ok=True)
+   return(Settings)
+
+def ParseArguments(Arguments=None):
+   Parser = argparse.ArgumentParser(description="Process FLIR Jpeg files without user interaction.")
+   Parser.add_argument('Inputs', nargs='+', help="Directories (searched recursively) and/or glob patterns of FLIR Jpeg files.")
+   Parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of worker processes (default: number of cpu's).")
+   Parser.add_argument('--output', default="FlirResults.jsonl", help="JSON lines file to write the results to, - for stdout.")
+   AddProcessingArguments(Parser)
+   return(Parser.parse_args(Arguments))
+
+def Main(Arguments=None):
+   Options = ParseArguments(Arguments)
+   FileNames = FindFlirFiles(Options.Inputs)
+   if not FileNames:
+      sys.stderr.write("No FLIR files found.\n")
+      return(1)
+   Settings = GetSettings(Options)
+   if Options.output == "-":
+      Failed = ProcessFlirFiles(FileNames, Settings, sys.stdout, Options.workers)
+   else:
+      with open(Options.output, 'w') as OutputFile:
+         Failed = ProcessFlirFiles(FileNames, Settings, OutputFile, Options.workers)
+   return(0 if Failed == 0 else 2)
+
+##############################################################################################################
+# Main Application
+##############################################################################################################
+if __name__ == "__main__":
+   sys.exit(Main())
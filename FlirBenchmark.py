@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirBenchmark.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This Script measures how long the processing stages of a FLIR image take, so the effect of a change on the
+# speed can be measured and regressions are noticed.
+# The images are synthetic FLIR Jpeg files made by FlirSyntheticImage.py, in one or more thermal resolutions
+# (--resolution, the embedded image is 4 times the thermal resolution like the C5), byte order and raw format.
+#
+# The stages measured per resolution are:
+# - MetaData, parsing the Jpeg segments and the FFF records (FlirFileParser.ParseFlirData).
+# - ThermalDecode, decoding the raw thermal png and swapping the bytes.
+# - PlanckFormula, the Planck formula calculated for every pixel.
+# - PlanckLookupTable / PlanckLookupTableBuild, the conversion with a cached lookup table and building the table.
+# - Upscale, scaling the thermal data up to the embedded image size (FLIRImage.NewThermalImage).
+# - RGBResize and RGBCropEnhance, FLIRImage.ScaledRGBImage and FLIRImage.NewRGBImage (cut, scaled and enhanced in one go).
+# - CameraRegistration, registering the picture with the thermal image (FlirCameraProfiles.RegisterCamera).
+# - ThermalImageExport, RescaleImageColorMap() and SaveThermalImage().
+# - BoxStatistics / ThresholdedBoxStatistics, building the summed area tables and 1000 box queries.
+# - ProcessedImage, composing the processed image with 10 average boxes (FLIRImage.RenderFlattenedImage).
+# - PlotImages, drawing the figure (Agg backend, no window is opened, FLIRImageViewer.PlotImages).
+# - CoreImport, starting python and importing FlirImageProcessor like a batch worker does (once, not per resolution).
+# and the batch path (FlirBatchProcessor.ProcessFlirFiles) for every number of files passed with --batch-sizes.
+#
+# Every stage is run once to warm up and then --repeat times, the Min, Median and Mean time in seconds are stored.
+# The results are written as JSON (--output), when a baseline file written by an earlier run is passed with
+# --baseline, the Min times are compared with it and stages that got slower than the tolerance are reported, the
+# exit code is then 1.
+#
+# Example:
+#   python FlirBenchmark.py --output Baseline.json
+#   python FlirBenchmark.py --baseline Baseline.json --output Current.json
+#   python FlirBenchmark.py --resolution 160x120 --resolution 640x480 --batch-sizes 1,10,100,1000,10000
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import contextlib
+import subprocess
+from io import BytesIO
+import numpy
+import matplotlib
+# No window is opened, PlotImages draws on the Agg canvas
+matplotlib.use("Agg")
+import matplotlib.pyplot as plot
+import PIL
+from PIL import Image
+import FlirFileParser
+import FlirTemperatureConversion
+import FlirSyntheticImage
+import FlirBatchProcessor
+import FlirCameraProfiles
+from FlirImageProcessor import FLIRImage
+from FlirImageViewer import FLIRImageViewer
+
+##############################################################################################################
+# Constants
+##############################################################################################################
+BENCHMARK_FORMAT_VERSION = 1
+NUMBER_OF_BOXES = 1000
+NUMBER_OF_BATCH_IMAGES = 16
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+def TimeFunction(Function, Repeats):
+   # One run to warm up (caches, imports), then Repeats measured runs
+   Function()
+   Times = []
+   for Repeat in range(Repeats):
+      StartTime = time.perf_counter()
+      Function()
+      Times.append(time.perf_counter()-StartTime)
+   return (dict(Min=min(Times), Median=float(numpy.median(Times)), Mean=float(numpy.mean(Times)), Repeats=Repeats))
+
+def MakePreparedImage(FileName):
+   # A FLIRImage with its data already read, used as starting point for the stages that come after the decoding
+   PreparedImage = FLIRImage(FileName, SaveNormalImage=False, SaveThermalImage=False)
+   PreparedImage.FlirObject['MetaData']
+   PreparedImage.FlirObject['ThermalData']
+   PreparedImage.FlirObject['PictureData']
+   # The synthetic images of all resolutions have the same camera, so no profile is made or saved for it
+   MetaData = PreparedImage.FlirObject['MetaData']
+   PreparedImage.CameraProfile = FlirCameraProfiles.MakePiPProfile(MetaData, PreparedImage.FlirObject['PictureData'], MetaData['EmbeddedImageWidth'], MetaData['EmbeddedImageHeight'])
+   return (PreparedImage)
+
+def MakeStageImage(PreparedImage, ImageClass=FLIRImage, **Attributes):
+   # A new FLIRImage (or FLIRImageViewer) sharing the decoded data of the prepared one, so only the stage itself is
+   # calculated
+   StageImage = ImageClass(PreparedImage.ImageName, SaveNormalImage=False, SaveThermalImage=False)
+   StageImage.FlirObject = PreparedImage.FlirObject
+   StageImage.CameraProfile = PreparedImage.CameraProfile
+   for Name, Value in Attributes.items():
+      setattr(StageImage, Name, Value)
+   return (StageImage)
+
+def MakeRandomBoxes(Width, Height, NumberOfBoxes, Seed=0):
+   # Boxes in pixels of the upscaled image (4 times the thermal data), like the boxes drawn in the window
+   Random = numpy.random.RandomState(Seed)
+   X = numpy.sort(Random.randint(4, 4*Width, size=(NumberOfBoxes, 2)), axis=1)
+   Y = numpy.sort(Random.randint(4, 4*Height, size=(NumberOfBoxes, 2)), axis=1)
+   return ([dict(X1=float(X1), Y1=float(Y1), X2=float(X2), Y2=float(Y2)) for (X1, X2), (Y1, Y2) in zip(X, Y)])
+
+def GetImageStages(FileName, Width, Height, WorkDirectory):
+   # Returns a list of (stage name, function to time) for one synthetic image
+   with open(FileName, 'rb') as FlirFile:
+      FileData = FlirFile.read()
+   FlirFileDict = FlirFileParser.ParseFlirData(FileData, FileName)
+   PreparedImage = MakePreparedImage(FileName)
+   PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, SwapBytes = PreparedImage.GetCalibrationValues()
+   RawThermalData = DecodeRawThermalImage(FlirFileDict['RawThermalImage'])
+   SwappedRawData = RawThermalData.byteswap() if SwapBytes else RawThermalData
+   ThermalData = PreparedImage.FlirObject['ThermalData']
+   NewThermalImage = PreparedImage.NewThermalImage
+   Boxes = MakeRandomBoxes(Width, Height, NUMBER_OF_BOXES)
+   ThresholdTemperature = float(numpy.nanmedian(ThermalData))
+   ThermalImageFileName = os.path.join(WorkDirectory, "BenchmarkThermal.jpg")
+
+   def ThermalDecode():
+      Decoded = DecodeRawThermalImage(FlirFileDict['RawThermalImage'])
+      if SwapBytes:
+         Decoded.byteswap()
+
+   def PlanckLookupTableBuild():
+      FlirTemperatureConversion.GetTemperatureLookupTable.cache_clear()
+      FlirTemperatureConversion.GetTemperatureLookupTable(PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, SwapBytes)
+
+   def ThermalImageExport():
+      StageImage = MakeStageImage(PreparedImage)
+      StageImage.SaveThermalImage(StageImage.RescaleImageColorMap(NewThermalImage), ThermalImageFileName)
+
+   def BoxStatistics(ThresholdTemperature):
+      StageImage = MakeStageImage(PreparedImage)
+      StageImage.GetBoxesStatistics(Boxes, ThresholdTemperature)
+
+   Stages = []
+   Stages.append(("MetaData", lambda: FlirFileParser.ParseFlirData(FileData, FileName)))
+   Stages.append(("ThermalDecode", ThermalDecode))
+   Stages.append(("PlanckFormula", lambda: FlirTemperatureConversion.RawToTemperature(SwappedRawData, PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT)))
+   Stages.append(("PlanckLookupTable", lambda: FlirTemperatureConversion.ConvertRawToTemperature(RawThermalData, PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, SwapBytes)))
+   Stages.append(("PlanckLookupTableBuild", PlanckLookupTableBuild))
+   Stages.append(("Upscale", lambda: MakeStageImage(PreparedImage).NewThermalImage))
+   Stages.append(("RGBResize", lambda: MakeStageImage(PreparedImage).ScaledRGBImage))
+   Stages.append(("RGBCropEnhance", lambda: MakeStageImage(PreparedImage).NewRGBImage))
+   Stages.append(("CameraRegistration", lambda: FlirCameraProfiles.RegisterCamera(PreparedImage.FlirObject['MetaData'], NewThermalImage, PreparedImage.FlirObject['PictureData'])))
+   Stages.append(("ThermalImageExport", ThermalImageExport))
+   Stages.append(("BoxStatistics", lambda: BoxStatistics(None)))
+   Stages.append(("ThresholdedBoxStatistics", lambda: BoxStatistics(ThresholdTemperature)))
+   Stages.append(("ProcessedImage", lambda: MakeStageImage(PreparedImage, NewRGBImage=PreparedImage.NewRGBImage, NewThermalImage=NewThermalImage, AverageMeasurementBoxes=Boxes[:10]).RenderFlattenedImage()))
+   return (Stages)
+
+def DecodeRawThermalImage(RawThermalImage):
+   return (numpy.array(Image.open(BytesIO(RawThermalImage))))
+
+def RunPlotImagesStage(FileName, Repeats):
+   # The figure is created once, PlotImages() redraws the image axes on every call
+   PlotImage = MakeStageImage(MakePreparedImage(FileName), FLIRImageViewer)
+   PlotImage.CreateFigure()
+   try:
+      return (TimeFunction(PlotImage.PlotImages, Repeats))
+   finally:
+      plot.close(PlotImage.Figure)
+
+def ImportCore():
+   # A new python process importing the FLIRImage module, every batch worker pays this on start up
+   subprocess.check_call([sys.executable, "-c", "import FlirImageProcessor"], cwd=os.path.dirname(os.path.abspath(__file__)))
+
+def RunBatchStage(BatchSize, SourceFileNames, WorkDirectory, NumberOfWorkers, Repeats):
+   # Copies of the synthetic files are processed like FlirBatchProcessor does, the progress output is suppressed
+   BatchDirectory = os.path.join(WorkDirectory, "Batch%d" % BatchSize)
+   os.makedirs(BatchDirectory, exist_ok=True)
+   FileNames = []
+   for FileNumber in range(BatchSize):
+      FileName = os.path.join(BatchDirectory, "FLIR%06d.jpg" % FileNumber)
+      shutil.copyfile(SourceFileNames[FileNumber % len(SourceFileNames)], FileName)
+      FileNames.append(FileName)
+   Settings = dict(SaveNormalImage=True, SaveThermalImage=True, Boxes=[dict(X1=100.0, Y1=100.0, X2=200.0, Y2=200.0)],
+                   ThresholdedBoxes=[dict(X1=100.0, Y1=100.0, X2=200.0, Y2=200.0)], ThresholdTemperature=20.0, CacheDirectory=None)
+
+   def ProcessBatch():
+      with open(os.devnull, 'w') as NullFile, contextlib.redirect_stderr(NullFile):
+         Failed = FlirBatchProcessor.ProcessFlirFiles(FileNames, Settings, NullFile, NumberOfWorkers)
+      if Failed:
+         raise RuntimeError(Failed.__str__()+" files of the batch failed")
+
+   # Large batches take long enough to be measured once
+   Result = TimeFunction(ProcessBatch, Repeats if BatchSize <= 100 else 1)
+   Result['FilesPerSecond'] = BatchSize / Result['Min']
+   shutil.rmtree(BatchDirectory, ignore_errors=True)
+   return (Result)
+
+def GetEnvironment():
+   return (dict(Python=platform.python_version(), Platform=platform.platform(), Processor=platform.processor(),
+                NumberOfCpus=os.cpu_count(), Numpy=numpy.__version__, Pillow=PIL.__version__, Matplotlib=matplotlib.__version__))
+
+def SelectStage(Name, Stages):
+   return (not Stages or any(Stage.lower() in Name.lower() for Stage in Stages))
+
+def RunBenchmarks(Options):
+   Results = dict()
+   WorkDirectory = tempfile.mkdtemp(prefix="FlirBenchmark")
+   try:
+      SourceFileNames = []
+      for Width, Height in Options.resolution:
+         Resolution = "%dx%d" % (Width, Height)
+         FileName = os.path.join(WorkDirectory, "FLIR%s.jpg" % Resolution)
+         FlirSyntheticImage.MakeSyntheticFlirFile(FileName, Width=Width, Height=Height, EmbeddedWidth=4*Width, EmbeddedHeight=4*Height,
+                                                  ByteOrder=Options.byteorder, RawFormat=Options.rawformat)
+         Stages = GetImageStages(FileName, Width, Height, WorkDirectory)
+         Stages.append(("PlotImages", None))
+         for StageName, Function in Stages:
+            Name = StageName+"@"+Resolution
+            if not SelectStage(Name, Options.stages):
+               continue
+            sys.stderr.write("Running "+Name+"\n")
+            if Function is None:
+               Results[Name] = RunPlotImagesStage(FileName, Options.repeat)
+            else:
+               Results[Name] = TimeFunction(Function, Options.repeat)
+      if SelectStage("CoreImport", Options.stages):
+         sys.stderr.write("Running CoreImport\n")
+         Results["CoreImport"] = TimeFunction(ImportCore, Options.repeat)
+      # The batch path uses the first resolution, with a few different images
+      Width, Height = Options.resolution[0]
+      for Seed in range(NUMBER_OF_BATCH_IMAGES):
+         FileName = os.path.join(WorkDirectory, "FLIRSource%02d.jpg" % Seed)
+         SourceFileNames.append(FlirSyntheticImage.MakeSyntheticFlirFile(FileName, Width=Width, Height=Height, EmbeddedWidth=4*Width, EmbeddedHeight=4*Height,
+                                                                          ByteOrder=Options.byteorder, RawFormat=Options.rawformat, Seed=Seed))
+      for BatchSize in Options.batch_sizes:
+         Name = "Batch%d@%dx%d" % (BatchSize, Width, Height)
+         if not SelectStage(Name, Options.stages):
+            continue
+         sys.stderr.write("Running "+Name+"\n")
+         Results[Name] = RunBatchStage(BatchSize, SourceFileNames, WorkDirectory, Options.workers, Options.repeat)
+   finally:
+      shutil.rmtree(WorkDirectory, ignore_errors=True)
+   return (Results)
+
+def CompareWithBaseline(Results, Baseline, Tolerance):
+   # Prints a comparison of the Min times and returns the names of the stages that got slower than the tolerance
+   Regressions = []
+   print("%-40s %12s %12s %8s" % ("Stage", "Baseline [s]", "Current [s]", "Ratio"))
+   for Name, Result in Results.items():
+      if Name not in Baseline['Results']:
+         print("%-40s %12s %12.6f %8s" % (Name, "-", Result['Min'], "new"))
+         continue
+      BaselineTime = Baseline['Results'][Name]['Min']
+      Ratio = Result['Min'] / BaselineTime if BaselineTime > 0 else float('inf')
+      Status = ""
+      if Ratio > 1.0 + Tolerance:
+         Status = " SLOWER"
+         Regressions.append(Name)
+      elif Ratio < 1.0 / (1.0 + Tolerance):
+         Status = " faster"
+      print("%-40s %12.6f %12.6f %8.2f%s" % (Name, BaselineTime, Result['Min'], Ratio, Status))
+   return (Regressions)
+
+def ParseResolution(ResolutionString):
+   Width, Height = [int(Value) for Value in ResolutionString.lower().split('x')]
+   return ((Width, Height))
+
+def ParseBatchSizes(BatchSizesString):
+   if not BatchSizesString:
+      return ([])
+   return ([int(Value) for Value in BatchSizesString.split(',')])
+
+def ParseArguments(Arguments=None):
+   Parser = argparse.ArgumentParser(description="Measure the processing stages of FLIR images on synthetic files.")
+   Parser.add_argument('--resolution', action='append', type=ParseResolution, metavar='WIDTHxHEIGHT', help="Thermal resolution, can be repeated (default: 160x120).")
+   Parser.add_argument('--byteorder', choices=['<', '>'], default='<', help="Byte order of the synthetic files, < little endian, > big endian (default: <).")
+   Parser.add_argument('--rawformat', choices=['PNG', 'RAW'], default='PNG', help="Format of the raw thermal data (default: PNG).")
+   Parser.add_argument('--repeat', type=int, default=5, help="Number of measured runs per stage (default: 5).")
+   Parser.add_argument('--stages', action='append', default=[], metavar='NAME', help="Only run the stages of which the name contains NAME, can be repeated.")
+   Parser.add_argument('--batch-sizes', type=ParseBatchSizes, default=[1, 10, 100], metavar='N,N,...', help="Numbers of files for the batch benchmark, empty to skip (default: 1,10,100).")
+   Parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of worker processes for the batch benchmark (default: number of cpu's).")
+   Parser.add_argument('--output', default=None, help="JSON file to write the results to (default: stdout).")
+   Parser.add_argument('--baseline', default=None, help="JSON file of an earlier run to compare the results with.")
+   Parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slow down compared to the baseline (default: 0.25 is 25%%).")
+   Options = Parser.parse_args(Arguments)
+   if not Options.resolution:
+      Options.resolution = [(160, 120)]
+   return (Options)
+
+def Main(Arguments=None):
+   Options = ParseArguments(Arguments)
+   Report = dict(Version=BENCHMARK_FORMAT_VERSION, Environment=GetEnvironment(),
+                 Settings=dict(Resolutions=["%dx%d" % Resolution for Resolution in Options.resolution], ByteOrder=Options.byteorder,
+                               RawFormat=Options.rawformat, Repeats=Options.repeat, Workers=Options.workers),
+                 Results=RunBenchmarks(Options))
+   if Options.output is None:
+      print(json.dumps(Report, indent=2))
+   else:
+      with open(Options.output, 'w') as OutputFile:
+         json.dump(Report, OutputFile, indent=2)
+   if Options.baseline is not None:
+      with open(Options.baseline, 'r') as BaselineFile:
+         Baseline = json.load(BaselineFile)
+      if CompareWithBaseline(Report['Results'], Baseline, Options.tolerance):
+         return (1)
+   return (0)
+
+##############################################################################################################
+# Main Application
+##############################################################################################################
+if __name__ == "__main__":
+   sys.exit(Main())
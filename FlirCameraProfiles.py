@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirCameraProfiles.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This module keeps per camera how the embedded (visual) picture lines up with the thermal image, so the greyscale
+# picture under the thermal image is cut from the right place for every camera, not only for the Flir C5 the
+# offsets were once found by hand for.
+#
+# A profile is a dictionary with the 'Model' and 'SerialNumber' of the camera (CameraModel and CameraSerialNumber
+# of the meta data), the 'Scale' of the picture (the Real2IR of the camera when the profile was made), 'XShift'
+# and 'YShift', the top left corner of the thermal image in the scaled picture, the 'Source' of the values and
+# the 'Score' of the registration. The profiles are kept in a JSON file (DEFAULT_PROFILE_FILE unless another one
+# is passed), written to a temporary file first and then renamed, so several processes can use the same file.
+#
+# GetCameraProfile() returns the profile of the camera of an image:
+# - The profile of that camera (model and serial number) from the file when there is one.
+# - Else the profile of the model in MODEL_PROFILES, the Flir C5 values found by hand.
+# - Else the camera is registered with the image and the profile is saved to the file. When the registration fails
+#   (a picture with too little structure) the offsets of the meta data are used for that image only and are not
+#   saved, so the camera is registered again with its next images until one of them gives a clear match.
+# Registration (RegisterImages()) compares the edges of the thermal image with the edges of the scaled picture by
+# FFT phase correlation, at half resolution, where the JPEG noise of the picture does not count. Only offsets
+# within SEARCH_RADIUS pixels of the picture in picture offsets of the meta data (OffsetX, OffsetY) are accepted,
+# and when the correlation peak does not stand out (Score below MINIMUM_REGISTRATION_SCORE) those offsets are used.
+#
+# MakeVisualLayer() cuts, scales, greys and contrasts the picture part under the thermal image in one resize of
+# only that part, with the same result as scaling the whole picture, cropping it and using ImageEnhance.Color(0.0)
+# and ImageEnhance.Contrast(3.0) on it.
+#
+# As script it registers the cameras of the given FLIR Jpeg files (again) and saves their profiles, or lists them:
+#   python FlirCameraProfiles.py FLIR0356.jpg
+#   python FlirCameraProfiles.py --list
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import os
+import sys
+import json
+import argparse
+import tempfile
+import threading
+import numpy
+from PIL import Image
+
+##############################################################################################################
+# Constants
+##############################################################################################################
+DEFAULT_PROFILE_FILE = os.path.join(os.path.expanduser("~"), ".FlirCameraProfiles.json")
+# The offsets found by hand for the Flir C5 (the X offset of the meta data is off by 10 pixels and Y by 4)
+MODEL_PROFILES = {'FLIR C5': dict(XShift=178, YShift=101, Scale=None, Source='Manual', Score=None)}
+REGISTRATION_DOWNSCALE = 2
+SEARCH_RADIUS = 48
+MINIMUM_REGISTRATION_SCORE = 6.0
+PICTURE_CONTRAST = 3.0
+
+##############################################################################################################
+# Class Definitions
+##############################################################################################################
+class CameraProfiles:
+   # The profiles of one profile file, read again when the file was changed by another process
+   def __init__(self, FileName):
+      self.FileName = FileName
+      self.Lock = threading.Lock()
+      self.Profiles = dict()
+      self.FileSignature = None
+
+   def Load(self):
+      try:
+         FileStat = os.stat(self.FileName)
+      except OSError:
+         return (self.Profiles)
+      if (FileStat.st_size, FileStat.st_mtime_ns) != self.FileSignature:
+         try:
+            with open(self.FileName, 'r') as ProfileFile:
+               self.Profiles.update(json.load(ProfileFile))
+         except (OSError, ValueError):
+            return (self.Profiles)
+         self.FileSignature = (FileStat.st_size, FileStat.st_mtime_ns)
+      return (self.Profiles)
+
+   def Get(self, Key):
+      with self.Lock:
+         return (self.Load().get(Key))
+
+   def Save(self, Key, Profile):
+      # Merged with the profiles other processes saved in the mean time. When the file can not be written the
+      # profile is only kept for this process.
+      with self.Lock:
+         Profiles = self.Load()
+         Profiles[Key] = Profile
+         try:
+            ProfileDirectory = os.path.dirname(os.path.abspath(self.FileName))
+            FileDescriptor, TemporaryName = tempfile.mkstemp(dir=ProfileDirectory, suffix=".tmp")
+            with os.fdopen(FileDescriptor, 'w') as TemporaryFile:
+               json.dump(Profiles, TemporaryFile, indent=2, sort_keys=True)
+            os.replace(TemporaryName, self.FileName)
+         except OSError:
+            pass
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+SharedProfiles = dict()
+
+def GetProfiles(FileName=None):
+   # One CameraProfiles object per profile file in this process
+   FileName = os.path.abspath(FileName or DEFAULT_PROFILE_FILE)
+   if FileName not in SharedProfiles:
+      SharedProfiles[FileName] = CameraProfiles(FileName)
+   return (SharedProfiles[FileName])
+
+def GetCameraKey(MetaData):
+   Model = (MetaData.get('CameraModel') or MetaData.get('Model') or "Unknown").__str__().strip()
+   SerialNumber = (MetaData.get('CameraSerialNumber') or "").__str__().strip()
+   return (Model, SerialNumber)
+
+def GetScaledSize(Picture, Scale):
+   # The size the whole picture had when it was scaled, like FLIRImage.ScaledRGBImage
+   return (int(Picture.width*Scale), int(Picture.height*Scale))
+
+def GetPiPOffset(MetaData, PictureWidth, PictureHeight, Width, Height, Scale):
+   # The picture in picture offsets of the meta data are relative to the thermal image centered on the picture
+   ScaledWidth = int(PictureWidth*Scale)
+   ScaledHeight = int(PictureHeight*Scale)
+   XShift = (ScaledWidth-Width)//2 + int(MetaData.get('OffsetX', 0))
+   YShift = (ScaledHeight-Height)//2 + int(MetaData.get('OffsetY', 0))
+   return (XShift, YShift)
+
+def GetEdges(ImageArray):
+   # Gradient magnitude, normalized to a mean of 0 and a standard deviation of 1
+   ImageArray = numpy.nan_to_num(numpy.asarray(ImageArray, dtype=numpy.float64))
+   GradientX = numpy.zeros_like(ImageArray)
+   GradientY = numpy.zeros_like(ImageArray)
+   GradientX[:, 1:-1] = ImageArray[:, 2:] - ImageArray[:, :-2]
+   GradientY[1:-1, :] = ImageArray[2:, :] - ImageArray[:-2, :]
+   Edges = numpy.hypot(GradientX, GradientY)
+   Edges -= Edges.mean()
+   return (Edges / (Edges.std() + 1e-12))
+
+def RegisterImages(ThermalImage, PictureData, Scale, Prior=None, SearchRadius=SEARCH_RADIUS):
+   # Returns the (XShift, YShift) of the thermal image (upscaled to the embedded image size) in the picture scaled
+   # by Scale, and the Score, the height of the correlation peak in standard deviations of the correlation.
+   # With a Prior (XShift, YShift) only offsets within SearchRadius pixels of it are considered.
+   Height, Width = ThermalImage.shape
+   Picture = Image.fromarray(numpy.asarray(PictureData)).convert('L')
+   ScaledWidth, ScaledHeight = GetScaledSize(Picture, Scale)
+   if ScaledWidth < Width or ScaledHeight < Height:
+      return (None, None, 0.0)
+   Down = REGISTRATION_DOWNSCALE
+   PictureEdges = GetEdges(numpy.asarray(Picture.resize((ScaledWidth//Down, ScaledHeight//Down), Image.BILINEAR)))
+   ThermalEdges = GetEdges(numpy.asarray(Image.fromarray(numpy.nan_to_num(ThermalImage).astype(numpy.float32)).resize((Width//Down, Height//Down), Image.BILINEAR)))
+   PaddedThermalEdges = numpy.zeros_like(PictureEdges)
+   PaddedThermalEdges[:ThermalEdges.shape[0], :ThermalEdges.shape[1]] = ThermalEdges
+   # Phase correlation: the normalized cross power spectrum has a peak at the offset
+   CrossPower = numpy.fft.rfft2(PictureEdges) * numpy.conj(numpy.fft.rfft2(PaddedThermalEdges))
+   CrossPower /= numpy.abs(CrossPower) + 1e-12
+   Correlation = numpy.fft.irfft2(CrossPower, PictureEdges.shape)
+   # Only the offsets where the thermal image is completely inside the picture
+   Valid = numpy.full(Correlation.shape, -numpy.inf)
+   Rows = slice(0, PictureEdges.shape[0]-ThermalEdges.shape[0]+1)
+   Columns = slice(0, PictureEdges.shape[1]-ThermalEdges.shape[1]+1)
+   if Prior is not None:
+      Rows = slice(max(Rows.start, (Prior[1]-SearchRadius)//Down), min(Rows.stop, (Prior[1]+SearchRadius)//Down+1))
+      Columns = slice(max(Columns.start, (Prior[0]-SearchRadius)//Down), min(Columns.stop, (Prior[0]+SearchRadius)//Down+1))
+   Valid[Rows, Columns] = Correlation[Rows, Columns]
+   if not numpy.isfinite(Valid).any():
+      return (None, None, 0.0)
+   PeakY, PeakX = numpy.unravel_index(numpy.argmax(Valid), Valid.shape)
+   Score = float(Correlation[PeakY, PeakX] / (Correlation.std() + 1e-12))
+   return (int(PeakX*Down), int(PeakY*Down), Score)
+
+def RegisterCamera(MetaData, ThermalImage, PictureData, ScaleFactors=(1.0,)):
+   # Makes the profile of the camera of an image, with the Real2IR of the camera times every scale factor tried
+   Model, SerialNumber = GetCameraKey(MetaData)
+   Height, Width = ThermalImage.shape
+   PictureHeight, PictureWidth = numpy.shape(PictureData)[:2]
+   Real2IR = float(MetaData.get('Real2IR', 1.0))
+   Best = None
+   for ScaleFactor in ScaleFactors:
+      Scale = Real2IR*ScaleFactor
+      Prior = GetPiPOffset(MetaData, PictureWidth, PictureHeight, Width, Height, Scale)
+      XShift, YShift, Score = RegisterImages(ThermalImage, PictureData, Scale, Prior)
+      if XShift is not None and (Best is None or Score > Best['Score']):
+         Best = dict(Model=Model, SerialNumber=SerialNumber, Scale=Scale, XShift=XShift, YShift=YShift, Source='Registration', Score=round(Score, 2))
+   if Best is None or Best['Score'] < MINIMUM_REGISTRATION_SCORE:
+      # No clear match (a picture without structure), the offsets of the meta data are the best there is
+      Best = dict(MakePiPProfile(MetaData, PictureData, Width, Height), Score=Best['Score'] if Best else None)
+   return (Best)
+
+def MakePiPProfile(MetaData, PictureData, Width, Height):
+   # The profile from the picture in picture offsets of the meta data only
+   Model, SerialNumber = GetCameraKey(MetaData)
+   PictureHeight, PictureWidth = numpy.shape(PictureData)[:2]
+   Real2IR = float(MetaData.get('Real2IR', 1.0))
+   XShift, YShift = GetPiPOffset(MetaData, PictureWidth, PictureHeight, Width, Height, Real2IR)
+   return (dict(Model=Model, SerialNumber=SerialNumber, Scale=Real2IR, XShift=XShift, YShift=YShift, Source='PiP', Score=None))
+
+def GetCameraProfile(MetaData, ProfileFileName=None, GetThermalImage=None, GetPictureData=None):
+   # GetThermalImage and GetPictureData return the images to register a camera without a profile with, they are
+   # only called when that is needed.
+   Model, SerialNumber = GetCameraKey(MetaData)
+   Profiles = GetProfiles(ProfileFileName)
+   Profile = Profiles.Get(Model+"/"+SerialNumber)
+   if Profile is not None and Profile.get('Source') == 'PiP':
+      # Saved by an older version after a failed registration, registered again
+      Profile = None
+   if Profile is None and Model in MODEL_PROFILES:
+      Profile = dict(MODEL_PROFILES[Model], Model=Model, SerialNumber=SerialNumber)
+   if Profile is None:
+      Profile = RegisterCamera(MetaData, GetThermalImage(), GetPictureData())
+      if Profile['Source'] != 'PiP':
+         Profiles.Save(Model+"/"+SerialNumber, Profile)
+   if Profile['Scale'] is None:
+      Profile = dict(Profile, Scale=float(MetaData.get('Real2IR', 1.0)))
+   return (Profile)
+
+def MakeVisualLayer(PictureData, Width, Height, Profile, Contrast=PICTURE_CONTRAST):
+   # The Width x Height part of the scaled picture at XShift, YShift, in grey with more contrast, as RGB array.
+   # Only that part is resized (in grey), parts outside the picture are black like PIL's crop() makes them.
+   Picture = Image.fromarray(numpy.asarray(PictureData)).convert('L')
+   ScaledWidth, ScaledHeight = GetScaledSize(Picture, Profile['Scale'])
+   XShift = int(Profile['XShift'])
+   YShift = int(Profile['YShift'])
+   Left = max(XShift, 0)
+   Top = max(YShift, 0)
+   Right = min(XShift+Width, ScaledWidth)
+   Bottom = min(YShift+Height, ScaledHeight)
+   Grey = numpy.zeros((Height, Width), dtype=numpy.uint8)
+   if Right > Left and Bottom > Top:
+      ScaleX = ScaledWidth/float(Picture.width)
+      ScaleY = ScaledHeight/float(Picture.height)
+      Part = Picture.resize((Right-Left, Bottom-Top), Image.LANCZOS, box=(Left/ScaleX, Top/ScaleY, Right/ScaleX, Bottom/ScaleY))
+      Grey[Top-YShift:Bottom-YShift, Left-XShift:Right-XShift] = numpy.asarray(Part)
+   # Like ImageEnhance.Contrast: away from the rounded mean grey value, clipped and truncated
+   Mean = int(Grey.mean()+0.5)
+   Grey = numpy.clip(Mean + Contrast*(Grey.astype(numpy.float32)-Mean), 0, 255).astype(numpy.uint8)
+   return (numpy.repeat(Grey[:, :, numpy.newaxis], 3, axis=2))
+
+def ParseArguments(Arguments=None):
+   Parser = argparse.ArgumentParser(description="Register the picture of FLIR cameras with their thermal image and keep the result per camera.")
+   Parser.add_argument('ImageNames', nargs='*', help="FLIR Jpeg files, the camera of every file is registered with that file.")
+   Parser.add_argument('--profiles', default=DEFAULT_PROFILE_FILE, metavar='FILE', help="The profile file (default: %s)." % DEFAULT_PROFILE_FILE)
+   Parser.add_argument('--scales', default="1.0", metavar='FACTORS', help="Comma separated factors of Real2IR to try (default: 1.0).")
+   Parser.add_argument('--list', action='store_true', help="Show the profiles in the profile file.")
+   return(Parser.parse_args(Arguments))
+
+def Main(Arguments=None):
+   Options = ParseArguments(Arguments)
+   from FlirImageProcessor import FLIRImage
+   Profiles = GetProfiles(Options.profiles)
+   ScaleFactors = [float(Value) for Value in Options.scales.split(',')]
+   for ImageName in Options.ImageNames:
+      MyFlirImage = FLIRImage(ImageName, CameraProfileFile=Options.profiles)
+      MetaData = MyFlirImage.FlirObject['MetaData']
+      Profile = RegisterCamera(MetaData, MyFlirImage.NewThermalImage, MyFlirImage.FlirObject['PictureData'], ScaleFactors)
+      Profile['File'] = ImageName
+      if Profile['Source'] == 'PiP':
+         print(ImageName+": no clear match, profile not saved: "+json.dumps(Profile))
+         continue
+      Profiles.Save(Profile['Model']+"/"+Profile['SerialNumber'], Profile)
+      print(ImageName+": "+json.dumps(Profile))
+   if Options.list:
+      for Key, Profile in sorted(Profiles.Load().items()):
+         print(Key+": "+json.dumps(Profile))
+   return(0)
+
+##############################################################################################################
+# Main Application
+##############################################################################################################
+if __name__ == "__main__":
+   sys.exit(Main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirCompositor.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This module composes images from layers, markers, boxes and texts directly in an array, without a matplotlib
+# figure, so processed images can be made fast and on servers without a display.
+#
+# Create a Compositor object by passing it the background image (height x width x 3 uint8, or height x width
+# greyscale), then draw on it, in the order the items should be stacked:
+# - BlendImage(Layer, X, Y, Alpha), an RGB layer with its top left corner at X, Y, Alpha is a single value or a
+#   value per pixel of the layer.
+# - FillRectangle() and DrawRectangle(), a filled rectangle and the outline of a rectangle.
+# - DrawMarker(X, Y, Marker, Size), the scatter markers used in the window: 'v', '^', 'o' and '+', Size is the
+#   marker area in points^2 like matplotlib's scatter().
+# - DrawText(X, Y, Text, FontSize), X, Y being the left end of the baseline (of the last line for multi line
+#   texts), like matplotlib draws texts, optionally on a semi transparent box.
+# - DrawColorBar(X1, Y1, X2, Y2, Palette), a vertical color bar with the highest color at the top.
+# GetImage() returns the result as height x width x 3 uint8 array, Save(FileName) saves it.
+# Coordinates are in pixels of the background image, sizes of texts and markers are in points, converted to pixels
+# with PixelsPerPoint. The default matches the image axes of the FLIRImage window (a 640x480 image shown at about
+# 1.09 times its size on a 100 dpi figure), so the texts and markers have the same size as in the window.
+# Shapes and texts are drawn anti aliased, by drawing them at 4 times the size and scaling them down.
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import math
+from functools import lru_cache
+import numpy
+from PIL import Image, ImageDraw, ImageFont
+
+##############################################################################################################
+# Constants
+##############################################################################################################
+DEFAULT_PIXELS_PER_POINT = 100.0 / 72.0 / 1.09
+SUPERSAMPLING = 4
+TEXT_BOX_PADDING = 4.0
+FONT_NAMES = ("DejaVuSans-Bold.ttf", "DejaVuSans.ttf", "Arial Bold.ttf", "arialbd.ttf")
+
+##############################################################################################################
+# Class Definitions
+##############################################################################################################
+class Compositor:
+   def __init__(self, Background, PixelsPerPoint=DEFAULT_PIXELS_PER_POINT):
+      Background = numpy.asarray(Background)
+      if Background.ndim == 2:
+         Background = numpy.stack([Background]*3, axis=2)
+      # The image is kept as floats, so blending many layers does not add up rounding errors
+      self.Buffer = numpy.array(Background[:, :, :3], dtype=numpy.float32)
+      self.Height, self.Width = self.Buffer.shape[:2]
+      self.PixelsPerPoint = PixelsPerPoint
+
+   def GetRegion(self, X, Y, Width, Height):
+      # Returns the slices of the image and of a Width x Height layer at X, Y for the part inside the image,
+      # or None when the layer is completely outside the image.
+      X = int(math.floor(X))
+      Y = int(math.floor(Y))
+      Left = max(X, 0)
+      Top = max(Y, 0)
+      Right = min(X + Width, self.Width)
+      Bottom = min(Y + Height, self.Height)
+      if Right <= Left or Bottom <= Top:
+         return (None)
+      return ((slice(Top, Bottom), slice(Left, Right)), (slice(Top-Y, Bottom-Y), slice(Left-X, Right-X)))
+
+   def BlendImage(self, Layer, X=0, Y=0, Alpha=1.0):
+      Layer = numpy.asarray(Layer)
+      if Layer.ndim == 2:
+         Layer = numpy.stack([Layer]*3, axis=2)
+      Region = self.GetRegion(X, Y, Layer.shape[1], Layer.shape[0])
+      if Region is None:
+         return
+      ImageSlices, LayerSlices = Region
+      Alpha = numpy.asarray(Alpha, dtype=numpy.float32)
+      if Alpha.ndim == 2:
+         Alpha = Alpha[LayerSlices][:, :, None]
+      Target = self.Buffer[ImageSlices]
+      Target += (Layer[LayerSlices][:, :, :3].astype(numpy.float32) - Target) * Alpha
+
+   def BlendMask(self, Mask, X, Y, Color, Alpha=1.0):
+      # Mask is a uint8 coverage array (0 to 255) with its top left corner at X, Y, drawn in Color
+      Region = self.GetRegion(X, Y, Mask.shape[1], Mask.shape[0])
+      if Region is None:
+         return
+      ImageSlices, MaskSlices = Region
+      Coverage = Mask[MaskSlices].astype(numpy.float32)[:, :, None] * (Alpha / 255.0)
+      Target = self.Buffer[ImageSlices]
+      Target += (numpy.asarray(Color[:3], dtype=numpy.float32) - Target) * Coverage
+
+   def DrawShape(self, X1, Y1, X2, Y2, DrawFunction, Color, Alpha=1.0):
+      # DrawFunction(Draw, Scale, OffsetX, OffsetY) draws the shape in white on a supersampled mask covering X1..X2,
+      # Y1..Y2 (plus a margin), with image coordinate P at (P-Offset)*Scale in the mask.
+      Left = int(math.floor(X1)) - 1
+      Top = int(math.floor(Y1)) - 1
+      Width = int(math.ceil(X2)) + 2 - Left
+      Height = int(math.ceil(Y2)) + 2 - Top
+      if Width <= 0 or Height <= 0:
+         return
+      Mask = Image.new('L', (Width*SUPERSAMPLING, Height*SUPERSAMPLING), 0)
+      DrawFunction(ImageDraw.Draw(Mask), SUPERSAMPLING, Left, Top)
+      Mask = Mask.resize((Width, Height), Image.BOX)
+      self.BlendMask(numpy.asarray(Mask), Left, Top, Color, Alpha)
+
+   def FillRectangle(self, X1, Y1, X2, Y2, Color, Alpha=1.0):
+      def Draw(Drawing, Scale, OffsetX, OffsetY):
+         Drawing.rectangle([(X1-OffsetX)*Scale, (Y1-OffsetY)*Scale, (X2-OffsetX)*Scale-1, (Y2-OffsetY)*Scale-1], fill=255)
+      self.DrawShape(X1, Y1, X2, Y2, Draw, Color, Alpha)
+
+   def DrawRectangle(self, X1, Y1, X2, Y2, Color, Alpha=1.0, LineWidth=1.0):
+      # The line is centered on the edges of the rectangle, LineWidth in points
+      HalfWidth = LineWidth * self.PixelsPerPoint / 2
+      def Draw(Drawing, Scale, OffsetX, OffsetY):
+         Outer = [(X1-HalfWidth-OffsetX)*Scale, (Y1-HalfWidth-OffsetY)*Scale, (X2+HalfWidth-OffsetX)*Scale, (Y2+HalfWidth-OffsetY)*Scale]
+         Drawing.rectangle(Outer, fill=255)
+         if X2-X1 > 2*HalfWidth and Y2-Y1 > 2*HalfWidth:
+            Drawing.rectangle([(X1+HalfWidth-OffsetX)*Scale, (Y1+HalfWidth-OffsetY)*Scale, (X2-HalfWidth-OffsetX)*Scale, (Y2-HalfWidth-OffsetY)*Scale], fill=0)
+      self.DrawShape(X1-HalfWidth, Y1-HalfWidth, X2+HalfWidth, Y2+HalfWidth, Draw, Color, Alpha)
+
+   def DrawMarker(self, X, Y, Marker, Size, Color, Alpha=1.0, LineWidth=1.5):
+      # Outline markers like matplotlib's scatter() with facecolors='none', Size is the area in points^2
+      HalfSize = math.sqrt(Size) * self.PixelsPerPoint / 2
+      Line = LineWidth * self.PixelsPerPoint
+      Extent = HalfSize + Line
+      def Draw(Drawing, Scale, OffsetX, OffsetY):
+         CenterX = (X-OffsetX)*Scale
+         CenterY = (Y-OffsetY)*Scale
+         Half = HalfSize*Scale
+         Width = max(int(round(Line*Scale)), 1)
+         if Marker == 'o':
+            Drawing.ellipse([CenterX-Half, CenterY-Half, CenterX+Half, CenterY+Half], outline=255, width=Width)
+         elif Marker == '+':
+            Drawing.line([CenterX-Half, CenterY, CenterX+Half, CenterY], fill=255, width=Width)
+            Drawing.line([CenterX, CenterY-Half, CenterX, CenterY+Half], fill=255, width=Width)
+         else:
+            # The image y axis points down, so the '^' triangle has its point at the smallest y
+            Direction = -1 if Marker == '^' else 1
+            Points = [(CenterX, CenterY+Direction*Half), (CenterX-Half, CenterY-Direction*Half), (CenterX+Half, CenterY-Direction*Half)]
+            Drawing.line(Points+[Points[0]], fill=255, width=Width, joint='curve')
+      self.DrawShape(X-Extent, Y-Extent, X+Extent, Y+Extent, Draw, Color, Alpha)
+
+   def DrawText(self, X, Y, Text, FontSize, Color=(255, 255, 255), BoxColor=None, BoxAlpha=1.0):
+      Font = GetFont(int(round(FontSize * self.PixelsPerPoint)))
+      Text = Text.__str__()
+      # Pillow only has a baseline anchor for single line texts, multi line texts are placed on their bottom
+      Anchor = 'ld' if "\n" in Text else 'ls'
+      Measure = ImageDraw.Draw(Image.new('L', (1, 1)))
+      Left, Top, Right, Bottom = Measure.multiline_textbbox((X, Y), Text, font=Font, anchor=Anchor)
+      if BoxColor is not None:
+         Padding = TEXT_BOX_PADDING * self.PixelsPerPoint
+         self.FillRectangle(Left-Padding, Top-Padding, Right+Padding, Bottom+Padding, BoxColor, BoxAlpha)
+      def Draw(Drawing, Scale, OffsetX, OffsetY):
+         Drawing.multiline_text(((X-OffsetX)*Scale, (Y-OffsetY)*Scale), Text, fill=255, font=GetFont(int(round(FontSize * self.PixelsPerPoint))*Scale), anchor=Anchor)
+      self.DrawShape(Left, Top, Right, Bottom, Draw, Color)
+
+   def DrawColorBar(self, X1, Y1, X2, Y2, Palette, Alpha=1.0, Background=(255, 255, 255), OutlineColor=(0, 0, 0)):
+      # Palette is a N x 3 uint8 color table, the colors are blended with Alpha on the Background color
+      Left = int(round(X1))
+      Top = int(round(Y1))
+      Width = max(int(round(X2)) - Left, 1)
+      Height = max(int(round(Y2)) - Top, 1)
+      Palette = numpy.asarray(Palette)[:, :3]
+      Indices = ((Height - 1 - numpy.arange(Height)) * len(Palette)) // Height
+      Bar = numpy.repeat(Palette[Indices][:, None, :], Width, axis=1)
+      self.FillRectangle(Left, Top, Left+Width, Top+Height, Background)
+      self.BlendImage(Bar, Left, Top, Alpha)
+      if OutlineColor is not None:
+         self.DrawRectangle(Left, Top, Left+Width, Top+Height, OutlineColor, LineWidth=0.8)
+
+   def GetImage(self):
+      return (numpy.clip(numpy.round(self.Buffer), 0, 255).astype(numpy.uint8))
+
+   def Save(self, FileName, Format=None):
+      Image.fromarray(self.GetImage()).save(FileName, Format)
+      return (FileName)
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+@lru_cache(maxsize=32)
+def GetFont(SizeInPixels):
+   # A bold sans font like matplotlib uses, Pillow's own font when none of them is installed
+   for FontName in FONT_NAMES:
+      try:
+         return (ImageFont.truetype(FontName, max(SizeInPixels, 1)))
+      except (OSError, IOError):
+         continue
+   try:
+      return (ImageFont.load_default(size=max(SizeInPixels, 1)))
+   except TypeError:
+      # Pillow before 10.1 only has a fixed size default font
+      return (ImageFont.load_default())
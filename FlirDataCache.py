@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirDataCache.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This module keeps the decoded data of FLIR Jpeg files on disk, so opening the same file again does not need
+# to extract, decode and convert the thermal data again.
+#
+# The cache is keyed by the content of the file (a sha256 hash), so renamed or copied files are found as well,
+# and a changed file is never mixed up with the old one. Every file gets a directory in the cache directory with:
+# - MetaData.json, the parsed meta data.
+# - RawThermalData.npy, the raw 16 bit thermal data.
+# - ThermalData-<calibration key>.npy, the temperatures, per set of calibration values used for the conversion.
+# The arrays are stored as .npy files and loaded memory mapped, so they are not copied into memory until used.
+#
+# Create a FlirDataCache object by passing it the cache directory and optionally the maximum size in bytes.
+# When the cache grows above the maximum size, the least recently used files are removed until it is RESCAN_FRACTION
+# below the maximum size. The size of the cache is kept up to date with the files written by this process, the whole
+# cache is only scanned again when that size is above the maximum or when RESCAN_FRACTION of the maximum size was
+# written since the last scan (for the files written by other processes), so filling a large cache does not scan all
+# entries for every file written.
+# GetCache(CacheDirectory) returns a cache object that is shared within the process.
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import numpy
+
+##############################################################################################################
+# Constants
+##############################################################################################################
+DEFAULT_MAXIMUM_SIZE = 1024*1024*1024
+HASH_BLOCK_SIZE = 1024*1024
+RESCAN_FRACTION = 0.1
+
+##############################################################################################################
+# Class Definitions
+##############################################################################################################
+class FlirDataCache:
+   def __init__(self, CacheDirectory, MaximumSize=DEFAULT_MAXIMUM_SIZE):
+      self.CacheDirectory = CacheDirectory
+      self.MaximumSize = MaximumSize
+      # The total size of the cache at the last scan plus the files written since, None until the first scan
+      self.Size = None
+      self.WrittenSinceScan = 0
+      self.Lock = threading.Lock()
+      os.makedirs(CacheDirectory, exist_ok=True)
+
+   def GetEntryDirectory(self, FileHash):
+      return (os.path.join(self.CacheDirectory, FileHash))
+
+   def Touch(self, FileHash):
+      # The modification time of an entry directory is used as its last use time for the LRU eviction
+      try:
+         os.utime(self.GetEntryDirectory(FileHash))
+      except OSError:
+         pass
+
+   def LoadMetaData(self, FileHash):
+      try:
+         with open(os.path.join(self.GetEntryDirectory(FileHash), "MetaData.json"), 'r') as MetaDataFile:
+            MetaData = json.load(MetaDataFile)
+      except (OSError, ValueError):
+         return (None)
+      self.Touch(FileHash)
+      return (MetaData)
+
+   def StoreMetaData(self, FileHash, MetaData):
+      self.WriteFile(FileHash, "MetaData.json", lambda FileHandle: FileHandle.write(json.dumps(MetaData).encode()))
+
+   def LoadArray(self, FileHash, Name):
+      # Returns a read only, memory mapped array, or None when it is not in the cache
+      try:
+         Array = numpy.load(os.path.join(self.GetEntryDirectory(FileHash), Name+".npy"), mmap_mode='r')
+      except (OSError, ValueError):
+         return (None)
+      self.Touch(FileHash)
+      return (Array)
+
+   def StoreArray(self, FileHash, Name, Array):
+      self.WriteFile(FileHash, Name+".npy", lambda FileHandle: numpy.save(FileHandle, numpy.asarray(Array)))
+
+   def WriteFile(self, FileHash, Name, WriteFunction):
+      # Written to a temporary file first and then renamed, so other processes never see a half written file
+      EntryDirectory = self.GetEntryDirectory(FileHash)
+      os.makedirs(EntryDirectory, exist_ok=True)
+      FileName = os.path.join(EntryDirectory, Name)
+      FileDescriptor, TemporaryName = tempfile.mkstemp(dir=EntryDirectory, suffix=".tmp")
+      try:
+         with os.fdopen(FileDescriptor, 'wb') as FileHandle:
+            WriteFunction(FileHandle)
+         # A file written again replaces the old one, only the difference is added to the size
+         OldSize = os.path.getsize(FileName) if os.path.exists(FileName) else 0
+         NewSize = os.path.getsize(TemporaryName)
+         os.replace(TemporaryName, FileName)
+      except BaseException:
+         if os.path.exists(TemporaryName):
+            os.remove(TemporaryName)
+         raise
+      self.AddSize(NewSize-OldSize, Keep=FileHash)
+
+   def AddSize(self, Size, Keep=None):
+      with self.Lock:
+         if self.Size is None or self.WrittenSinceScan > self.MaximumSize*RESCAN_FRACTION:
+            self.Size = sum(EntrySize for LastUse, EntrySize, FileHash in self.GetEntries())
+            self.WrittenSinceScan = 0
+         else:
+            self.Size += Size
+            self.WrittenSinceScan += max(Size, 0)
+         if self.Size > self.MaximumSize:
+            # Down to below the maximum, so a full cache is not scanned again for every next file
+            self.Evict(Keep, self.MaximumSize*(1-RESCAN_FRACTION))
+
+   def GetEntries(self):
+      # Returns a list of (last use time, size, hash) of all entries in the cache
+      Entries = []
+      for FileHash in os.listdir(self.CacheDirectory):
+         EntryDirectory = self.GetEntryDirectory(FileHash)
+         try:
+            LastUse = os.stat(EntryDirectory).st_mtime
+            Size = sum(os.path.getsize(os.path.join(EntryDirectory, Name)) for Name in os.listdir(EntryDirectory))
+         except OSError:
+            # Removed by another process in the mean time
+            continue
+         Entries.append((LastUse, Size, FileHash))
+      return (Entries)
+
+   def Evict(self, Keep=None, TargetSize=None):
+      TargetSize = self.MaximumSize if TargetSize is None else TargetSize
+      Entries = self.GetEntries()
+      TotalSize = sum(Size for LastUse, Size, FileHash in Entries)
+      for LastUse, Size, FileHash in sorted(Entries):
+         if TotalSize <= TargetSize:
+            break
+         if FileHash == Keep:
+            continue
+         shutil.rmtree(self.GetEntryDirectory(FileHash), ignore_errors=True)
+         TotalSize -= Size
+      self.Size = TotalSize
+      self.WrittenSinceScan = 0
+
+   def Clear(self):
+      for FileHash in os.listdir(self.CacheDirectory):
+         shutil.rmtree(self.GetEntryDirectory(FileHash), ignore_errors=True)
+      self.Size = None
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+def HashFile(FileName):
+   Hash = hashlib.sha256()
+   with open(FileName, 'rb') as FileHandle:
+      for Block in iter(lambda: FileHandle.read(HASH_BLOCK_SIZE), b''):
+         Hash.update(Block)
+   return (Hash.hexdigest())
+
+def GetCalibrationKey(CalibrationValues):
+   # Short key of the calibration values used to convert the raw data, part of the temperature array file name
+   return (hashlib.sha256(repr(tuple(CalibrationValues)).encode()).hexdigest()[:16])
+
+SharedCaches = dict()
+SharedCachesLock = threading.Lock()
+
+def GetCache(CacheDirectory, MaximumSize=DEFAULT_MAXIMUM_SIZE):
+   with SharedCachesLock:
+      if CacheDirectory not in SharedCaches:
+         SharedCaches[CacheDirectory] = FlirDataCache(CacheDirectory, MaximumSize)
+      return (SharedCaches[CacheDirectory])
@@ -0,0 +1,384 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirFileParser.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This module reads a FLIR radiometric Jpeg file in one go and extracts the information the FLIRImage class
+# needs, without starting exiftool. A FLIR Jpeg file stores its thermal information in one or more APP1
+# segments starting with "FLIR", together these segments form a FLIR File Format (FFF) container.
+# The FFF container holds a number of records, the ones used here are:
+# - RawData (type 0x01), the raw thermal sensor values, either as png or as plain 16 bit values.
+# - EmbeddedImage (type 0x0E), the normal picture taken by the visual camera, usually a jpeg.
+# - CameraInfo (type 0x20), the calibration constants (Planck values) and camera settings.
+# - PiP (type 0x2A), picture in picture information like the Real2IR scale factor.
+# The standard Exif APP1 segment is read as well for the Make, Model and ExifByteOrder.
+#
+# ParseFlirFile(FileName) returns a dictionary with:
+# - 'MetaData', a dictionary using the same tag names and value formats as "exiftool -j" does for the tags
+#   that are extracted, so it can be used as a drop-in replacement of the exiftool output.
+# - 'RawThermalImage', the bytes of the raw thermal image, as "exiftool -RawThermalImage -b" would return them.
+# - 'EmbeddedImage', the bytes of the embedded image, as "exiftool -EmbeddedImage -b" would return them.
+#
+# ParseFffData(FffData) does the same for a bare FFF container, like a frame of a FLIR sequence (.seq) file,
+# those have no embedded image so 'EmbeddedImage' is None. GetFffSize() returns the size of such a frame.
+#
+# When the file is not a FLIR radiometric Jpeg, or the camera uses a layout this parser does not know, a
+# FlirFileParserError is raised, the caller can then fall back to exiftool.
+# The offsets used here are the ones documented by exiftool for the FLIR tags (See https://exiftool.org/TagNames/FLIR.html)
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import struct
+import datetime
+
+##############################################################################################################
+# Constants
+##############################################################################################################
+FFF_RECORD_RAWDATA = 0x0001
+FFF_RECORD_EMBEDDEDIMAGE = 0x000E
+FFF_RECORD_CAMERAINFO = 0x0020
+FFF_RECORD_PIP = 0x002A
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+JPEG_SIGNATURE = b'\xff\xd8\xff'
+
+# Offset, struct format, tag name and print conversion of the CameraInfo record fields.
+# Temperatures are stored in Kelvin, exiftool prints them in degrees Celcius.
+CAMERAINFO_FIELDS = [
+   (0x020, 'f', 'Emissivity', lambda x: round(x, 2)),
+   (0x024, 'f', 'ObjectDistance', lambda x: "%.2f m" % x),
+   (0x028, 'f', 'ReflectedApparentTemperature', lambda x: "%.1f C" % (x-273.15)),
+   (0x02c, 'f', 'AtmosphericTemperature', lambda x: "%.1f C" % (x-273.15)),
+   (0x030, 'f', 'IRWindowTemperature', lambda x: "%.1f C" % (x-273.15)),
+   (0x034, 'f', 'IRWindowTransmission', lambda x: round(x, 2)),
+   (0x03c, 'f', 'RelativeHumidity', lambda x: "%.1f %%" % ((x/100 if x > 2 else x)*100)),
+   (0x058, 'f', 'PlanckR1', lambda x: FormatFloat(x)),
+   (0x05c, 'f', 'PlanckB', lambda x: FormatFloat(x)),
+   (0x060, 'f', 'PlanckF', lambda x: FormatFloat(x)),
+   (0x070, 'f', 'AtmosphericTransAlpha1', lambda x: FormatFloat(x)),
+   (0x074, 'f', 'AtmosphericTransAlpha2', lambda x: FormatFloat(x)),
+   (0x078, 'f', 'AtmosphericTransBeta1', lambda x: FormatFloat(x)),
+   (0x07c, 'f', 'AtmosphericTransBeta2', lambda x: FormatFloat(x)),
+   (0x080, 'f', 'AtmosphericTransX', lambda x: FormatFloat(x)),
+   (0x090, 'f', 'CameraTemperatureRangeMax', lambda x: "%.1f C" % (x-273.15)),
+   (0x094, 'f', 'CameraTemperatureRangeMin', lambda x: "%.1f C" % (x-273.15)),
+   (0x098, 'f', 'CameraTemperatureMaxClip', lambda x: "%.1f C" % (x-273.15)),
+   (0x09c, 'f', 'CameraTemperatureMinClip', lambda x: "%.1f C" % (x-273.15)),
+   (0x0a0, 'f', 'CameraTemperatureMaxWarn', lambda x: "%.1f C" % (x-273.15)),
+   (0x0a4, 'f', 'CameraTemperatureMinWarn', lambda x: "%.1f C" % (x-273.15)),
+   (0x0a8, 'f', 'CameraTemperatureMaxSaturated', lambda x: "%.1f C" % (x-273.15)),
+   (0x0ac, 'f', 'CameraTemperatureMinSaturated', lambda x: "%.1f C" % (x-273.15)),
+   (0x0d4, '32s', 'CameraModel', lambda x: DecodeString(x)),
+   (0x0f4, '16s', 'CameraPartNumber', lambda x: DecodeString(x)),
+   (0x104, '16s', 'CameraSerialNumber', lambda x: DecodeString(x)),
+   (0x114, '16s', 'CameraSoftware', lambda x: DecodeString(x)),
+   (0x170, '32s', 'LensModel', lambda x: DecodeString(x)),
+   (0x190, '16s', 'LensPartNumber', lambda x: DecodeString(x)),
+   (0x1a0, '16s', 'LensSerialNumber', lambda x: DecodeString(x)),
+   (0x1b4, 'f', 'FieldOfView', lambda x: "%.1f deg" % x),
+   (0x308, 'i', 'PlanckO', lambda x: x),
+   (0x30c, 'f', 'PlanckR2', lambda x: FormatFloat(x)),
+   (0x310, 'H', 'RawValueRangeMin', lambda x: x),
+   (0x312, 'H', 'RawValueRangeMax', lambda x: x),
+   (0x338, 'H', 'RawValueMedian', lambda x: x),
+   (0x33c, 'H', 'RawValueRange', lambda x: x),
+   (0x390, 'H', 'FocusStepCount', lambda x: x),
+   (0x45c, 'f', 'FocusDistance', lambda x: "%.1f m" % x),
+   (0x464, 'H', 'FrameRate', lambda x: x),
+]
+
+##############################################################################################################
+# Class Definitions
+##############################################################################################################
+class FlirFileParserError(ValueError):
+   pass
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+def FormatFloat(Value):
+   # exiftool prints the 4 byte floats with 8 significant digits, doing the same keeps the Planck conversion
+   # results identical to the exiftool based extraction.
+   return(float("%.8g" % Value))
+
+def DecodeString(Value):
+   return(Value.split(b'\x00')[0].decode('latin-1').strip())
+
+def GetRecordByteOrder(RecordData):
+   # The first 16 bit word of the RawData, EmbeddedImage and CameraInfo records is a small type number (2 or 3),
+   # which tells us the byte order of the record.
+   if len(RecordData) < 2:
+      raise FlirFileParserError("FFF record too short")
+   if struct.unpack('<H', RecordData[0:2])[0] < 0x100:
+      return('<')
+   return('>')
+
+def ReadJpegSegments(FileData):
+   # Walks the Jpeg markers up to the start of scan and returns the Exif segment and the FLIR FFF container
+   if FileData[0:2] != b'\xff\xd8':
+      raise FlirFileParserError("Not a Jpeg file")
+   ExifData = None
+   FlirChunks = dict()
+   Position = 2
+   while Position + 4 <= len(FileData):
+      if FileData[Position] != 0xFF:
+         raise FlirFileParserError("Corrupt Jpeg marker at offset "+Position.__str__())
+      Marker = FileData[Position+1]
+      if Marker == 0xFF:
+         # Fill byte
+         Position += 1
+         continue
+      if Marker in (0xD9, 0xDA):
+         # End of image or start of scan, all metadata segments have been passed
+         break
+      SegmentLength = struct.unpack('>H', FileData[Position+2:Position+4])[0]
+      Segment = FileData[Position+4:Position+2+SegmentLength]
+      if Marker == 0xE1:
+         if Segment[0:6] == b'Exif\x00\x00' and ExifData is None:
+            ExifData = Segment[6:]
+         elif Segment[0:5] == b'FLIR\x00' and len(Segment) >= 8:
+            # Byte 6 is the index of this chunk, byte 7 the index of the last chunk
+            FlirChunks[Segment[6]] = Segment[8:]
+      Position += 2 + SegmentLength
+   if not FlirChunks:
+      raise FlirFileParserError("No FLIR segments found, not a FLIR radiometric Jpeg file")
+   FffData = b''.join(FlirChunks[Index] for Index in sorted(FlirChunks))
+   return(ExifData, FffData)
+
+def ReadTiffDirectory(TiffData, Offset, ByteOrder):
+   # Returns a dictionary of tag number -> value for the ascii, short, long and rational entries of an IFD
+   Tags = dict()
+   NumberOfEntries = struct.unpack(ByteOrder+'H', TiffData[Offset:Offset+2])[0]
+   for Entry in range(NumberOfEntries):
+      EntryOffset = Offset + 2 + 12*Entry
+      Tag, Type, Count = struct.unpack(ByteOrder+'HHI', TiffData[EntryOffset:EntryOffset+8])
+      ValueOffset = EntryOffset + 8
+      if Type == 2:
+         if Count > 4:
+            ValueOffset = struct.unpack(ByteOrder+'I', TiffData[ValueOffset:ValueOffset+4])[0]
+         Tags[Tag] = DecodeString(TiffData[ValueOffset:ValueOffset+Count])
+      elif Type == 3 and Count == 1:
+         Tags[Tag] = struct.unpack(ByteOrder+'H', TiffData[ValueOffset:ValueOffset+2])[0]
+      elif Type == 4 and Count == 1:
+         Tags[Tag] = struct.unpack(ByteOrder+'I', TiffData[ValueOffset:ValueOffset+4])[0]
+      elif Type == 5 and Count == 1:
+         ValueOffset = struct.unpack(ByteOrder+'I', TiffData[ValueOffset:ValueOffset+4])[0]
+         Numerator, Denominator = struct.unpack(ByteOrder+'II', TiffData[ValueOffset:ValueOffset+8])
+         if Denominator != 0:
+            Tags[Tag] = Numerator / Denominator
+   return(Tags)
+
+def ParseExifData(ExifData):
+   MetaData = dict()
+   if ExifData is None or len(ExifData) < 8:
+      return(MetaData)
+   if ExifData[0:2] == b'II':
+      ByteOrder = '<'
+      MetaData['ExifByteOrder'] = "Little-endian (Intel, II)"
+   elif ExifData[0:2] == b'MM':
+      ByteOrder = '>'
+      MetaData['ExifByteOrder'] = "Big-endian (Motorola, MM)"
+   else:
+      return(MetaData)
+   try:
+      Ifd0Offset = struct.unpack(ByteOrder+'I', ExifData[4:8])[0]
+      Ifd0 = ReadTiffDirectory(ExifData, Ifd0Offset, ByteOrder)
+      for Tag, Name in ((0x010f, 'Make'), (0x0110, 'Model'), (0x0131, 'Software'), (0x0132, 'ModifyDate')):
+         if Tag in Ifd0:
+            MetaData[Name] = Ifd0[Tag]
+      if 0x8769 in Ifd0:
+         ExifIfd = ReadTiffDirectory(ExifData, Ifd0[0x8769], ByteOrder)
+         if 0x9003 in ExifIfd:
+            MetaData['DateTimeOriginal'] = ExifIfd[0x9003]
+         if 0x920a in ExifIfd:
+            MetaData['FocalLength'] = "%.1f mm" % ExifIfd[0x920a]
+   except struct.error:
+      # A damaged Exif block is not fatal, all the values needed for the temperatures are in the FFF records
+      pass
+   return(MetaData)
+
+def ReadFffHeader(FffData):
+   # Returns the byte order, the offset of the record index and the number of records of a FFF container
+   if FffData[0:4] != b'FFF\x00' or len(FffData) < 0x40:
+      raise FlirFileParserError("No FFF header found in FLIR segments")
+   ByteOrder = '>'
+   Version = struct.unpack(ByteOrder+'I', FffData[20:24])[0]
+   if Version < 100 or Version >= 200:
+      ByteOrder = '<'
+      Version = struct.unpack(ByteOrder+'I', FffData[20:24])[0]
+      if Version < 100 or Version >= 200:
+         raise FlirFileParserError("Unsupported FFF version")
+   IndexOffset, NumberOfRecords = struct.unpack(ByteOrder+'II', FffData[24:32])
+   return(ByteOrder, IndexOffset, NumberOfRecords)
+
+def ReadFffIndex(FffData):
+   # Returns a list of (record type, offset, length) of the records of a FFF container, FffData only needs to
+   # contain the header and the index.
+   ByteOrder, IndexOffset, NumberOfRecords = ReadFffHeader(FffData)
+   Index = []
+   for RecordNumber in range(NumberOfRecords):
+      EntryOffset = IndexOffset + 32*RecordNumber
+      if EntryOffset + 32 > len(FffData):
+         break
+      RecordType, SubType, RecordVersion, RecordID, RecordOffset, RecordLength = struct.unpack(ByteOrder+'HHIIII', FffData[EntryOffset:EntryOffset+20])
+      Index.append((RecordType, RecordOffset, RecordLength))
+   return(Index)
+
+def GetFffSize(FffData):
+   # The size of a complete FFF container, used to split the FFF frames of a sequence (.seq) file.
+   # FffData only needs to contain the header and the index.
+   ByteOrder, IndexOffset, NumberOfRecords = ReadFffHeader(FffData)
+   Size = IndexOffset + 32*NumberOfRecords
+   for RecordType, RecordOffset, RecordLength in ReadFffIndex(FffData):
+      if RecordType != 0:
+         Size = max(Size, RecordOffset + RecordLength)
+   return(Size)
+
+def ReadFffRecords(FffData):
+   # Returns a dictionary of record type -> record bytes of the FFF container
+   Records = dict()
+   for RecordType, RecordOffset, RecordLength in ReadFffIndex(FffData):
+      if RecordType == 0 or RecordType in Records:
+         continue
+      if RecordOffset + RecordLength > len(FffData):
+         raise FlirFileParserError("FFF record "+hex(RecordType)+" exceeds the FLIR data, file truncated?")
+      Records[RecordType] = FffData[RecordOffset:RecordOffset+RecordLength]
+   return(Records)
+
+def ParseCameraInfo(RecordData):
+   MetaData = dict()
+   ByteOrder = GetRecordByteOrder(RecordData)
+   for Offset, Format, Name, Conversion in CAMERAINFO_FIELDS:
+      Size = struct.calcsize(Format)
+      if Offset + Size > len(RecordData):
+         continue
+      MetaData[Name] = Conversion(struct.unpack(ByteOrder+Format, RecordData[Offset:Offset+Size])[0])
+   if 0x38e <= len(RecordData):
+      # Seconds since 1970, milliseconds and time zone offset in minutes
+      Seconds, SubSeconds, TimeZone = struct.unpack(ByteOrder+'IIh', RecordData[0x384:0x38e])
+      LocalTime = datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=Seconds - TimeZone*60)
+      TimeZoneString = ("-" if TimeZone > 0 else "+") + "%02d:%02d" % divmod(abs(TimeZone), 60)
+      MetaData['DateTimeOriginal'] = LocalTime.strftime('%Y:%m:%d %H:%M:%S') + ".%03d" % (SubSeconds & 0xffff) + TimeZoneString
+   for Name in ('PlanckR1', 'PlanckR2', 'PlanckB', 'PlanckF', 'PlanckO', 'Emissivity', 'ReflectedApparentTemperature'):
+      if Name not in MetaData:
+         raise FlirFileParserError("CameraInfo record does not contain "+Name)
+   return(MetaData)
+
+def ParseImageRecord(RecordData, Name):
+   # The RawData and EmbeddedImage records share the same layout, a 32 byte header with the image dimensions
+   # followed by the image data.
+   if len(RecordData) < 0x20:
+      raise FlirFileParserError(Name+" record too short")
+   MetaData = dict()
+   ByteOrder = GetRecordByteOrder(RecordData)
+   Width, Height = struct.unpack(ByteOrder+'HH', RecordData[2:6])
+   MetaData[Name+'Width'] = Width
+   MetaData[Name+'Height'] = Height
+   ImageData = RecordData[0x20:]
+   if ImageData[0:8] == PNG_SIGNATURE:
+      MetaData[Name+'Type'] = "PNG"
+   elif ImageData[0:3] == JPEG_SIGNATURE:
+      MetaData[Name+'Type'] = "JPG"
+   else:
+      if len(ImageData) < 2*Width*Height:
+         raise FlirFileParserError(Name+" record does not contain "+Width.__str__()+"x"+Height.__str__()+" 16 bit values")
+      MetaData[Name+'Type'] = "TIFF"
+      ImageData = MakeTiff(ImageData[:2*Width*Height], Width, Height, ByteOrder)
+   return(MetaData, ImageData)
+
+def MakeTiff(PixelData, Width, Height, ByteOrder):
+   # Wraps plain 16 bit sensor values in a minimal greyscale TIFF, like exiftool does, so it can be opened by PIL
+   Entries = [(256, 3, Width), (257, 3, Height), (258, 3, 16), (259, 3, 1), (262, 3, 1),
+              (273, 4, 0), (277, 3, 1), (278, 3, Height), (279, 4, len(PixelData))]
+   IfdSize = 2 + 12*len(Entries) + 4
+   PixelOffset = 8 + IfdSize
+   Header = (b'II' if ByteOrder == '<' else b'MM') + struct.pack(ByteOrder+'HI', 42, 8)
+   Ifd = struct.pack(ByteOrder+'H', len(Entries))
+   for Tag, Type, Value in Entries:
+      if Tag == 273:
+         Value = PixelOffset
+      if Type == 3:
+         Ifd += struct.pack(ByteOrder+'HHIHH', Tag, Type, 1, Value, 0)
+      else:
+         Ifd += struct.pack(ByteOrder+'HHII', Tag, Type, 1, Value)
+   Ifd += struct.pack(ByteOrder+'I', 0)
+   return(Header + Ifd + PixelData)
+
+def ParsePiP(RecordData):
+   MetaData = dict()
+   if len(RecordData) < 16:
+      return(MetaData)
+   # The PiP record has no type word to check the byte order with, a sane Real2IR value tells which one is used.
+   for ByteOrder in ('<', '>'):
+      Real2IR, OffsetX, OffsetY, PiPX1, PiPX2, PiPY1, PiPY2 = struct.unpack(ByteOrder+'fhhhhhh', RecordData[0:16])
+      if 0.0 < Real2IR < 100.0:
+         break
+   MetaData['Real2IR'] = FormatFloat(Real2IR)
+   MetaData['OffsetX'] = OffsetX
+   MetaData['OffsetY'] = OffsetY
+   MetaData['PiPX1'] = PiPX1
+   MetaData['PiPX2'] = PiPX2
+   MetaData['PiPY1'] = PiPY1
+   MetaData['PiPY2'] = PiPY2
+   return(MetaData)
+
+def ParseFlirData(FileData, FileName=""):
+   try:
+      ExifData, FffData = ReadJpegSegments(FileData)
+      return(ParseFffRecords(FffData, ExifData, FileName, True))
+   except (struct.error, IndexError) as Error:
+      raise FlirFileParserError("Unable to parse "+FileName.__str__()+": "+Error.__str__())
+
+def ParseFffData(FffData, FileName=""):
+   # Parses a bare FFF container, like the frames of a sequence (.seq) file, these have no embedded image.
+   try:
+      return(ParseFffRecords(FffData, None, FileName, False))
+   except (struct.error, IndexError) as Error:
+      raise FlirFileParserError("Unable to parse "+FileName.__str__()+": "+Error.__str__())
+
+def ParseFffRecords(FffData, ExifData, FileName, EmbeddedImageRequired):
+   Records = ReadFffRecords(FffData)
+   RequiredRecords = [(FFF_RECORD_CAMERAINFO, "CameraInfo"), (FFF_RECORD_RAWDATA, "RawData")]
+   if EmbeddedImageRequired:
+      RequiredRecords.append((FFF_RECORD_EMBEDDEDIMAGE, "EmbeddedImage"))
+   for RecordType, Name in RequiredRecords:
+      if RecordType not in Records:
+         raise FlirFileParserError("FLIR file does not contain a "+Name+" record")
+
+   FlirFileDict = dict()
+   MetaData = dict()
+   MetaData['SourceFile'] = FileName
+   MetaData.update(ParseExifData(ExifData))
+   CameraInfo = ParseCameraInfo(Records[FFF_RECORD_CAMERAINFO])
+   if 'DateTimeOriginal' in MetaData:
+      # The FLIR date includes milliseconds and the timezone, prefer that one over the Exif one.
+      del MetaData['DateTimeOriginal']
+   MetaData.update(CameraInfo)
+   if 'ExifByteOrder' not in MetaData:
+      if GetRecordByteOrder(Records[FFF_RECORD_CAMERAINFO]) == '<':
+         MetaData['ExifByteOrder'] = "Little-endian (Intel, II)"
+      else:
+         MetaData['ExifByteOrder'] = "Big-endian (Motorola, MM)"
+   RawMetaData, FlirFileDict['RawThermalImage'] = ParseImageRecord(Records[FFF_RECORD_RAWDATA], 'RawThermalImage')
+   MetaData.update(RawMetaData)
+   FlirFileDict['EmbeddedImage'] = None
+   if FFF_RECORD_EMBEDDEDIMAGE in Records:
+      EmbeddedMetaData, FlirFileDict['EmbeddedImage'] = ParseImageRecord(Records[FFF_RECORD_EMBEDDEDIMAGE], 'EmbeddedImage')
+      MetaData.update(EmbeddedMetaData)
+   if FFF_RECORD_PIP in Records:
+      MetaData.update(ParsePiP(Records[FFF_RECORD_PIP]))
+   else:
+      MetaData['Real2IR'] = 1.0
+   FlirFileDict['MetaData'] = MetaData
+   return(FlirFileDict)
+
+def ParseFlirFile(FileName):
+   with open(FileName, 'rb') as FileHandle:
+      FileData = FileHandle.read()
+   return(ParseFlirData(FileData, FileName))
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirFrameStream.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This module reads FLIR sequence files (.seq, a series of FFF frames) and series of FLIR Jpeg files one frame
+# at a time, so recordings of many gigabytes can be processed without loading them completely.
+#
+# A frame is a dictionary with:
+# - 'Index', the number of the frame in the stream.
+# - 'FileName', the file the frame was read from.
+# - 'MetaData', the meta data of the frame, in the same format as FlirFileParser returns it.
+# - 'RawThermalData', the raw 16 bit thermal data as stored in the file (so not byte swapped).
+# Pipeline stages add more entries to the frame dictionaries, like 'ThermalData' (the temperatures).
+#
+# The readers and stages are generators, so they can be chained into a pipeline:
+#   Frames = ReadFrames(["Recording.seq"])
+#   Frames = ReadAhead(Frames)                         # read the next frames on a worker thread
+#   Frames = ConvertFrames(Frames)                     # adds 'ThermalData'
+#   Frames = BoxStatisticsStage(Frames, [(10, 20, 30, 40)], ThresholdTemperature=30.0)
+#   Frames = HotspotStage(Frames, ThresholdTemperature=60.0, TopK=5)    # adds 'Hotspots', the hottest regions
+#   Frames = ExportStage(Frames, "Recording.jsonl")
+#   for Frame in Frames:
+#      pass
+# or the same with RunPipeline(Source, Stage, Stage, ...), where every stage is a function taking the frames.
+# Boxes are given in pixels of the thermal data, as (Row1, Row2, Column1, Column2) in python slice notation.
+#
+# .csq files store their frames compressed with JPEG-LS, which can not be decoded by PIL, so for those a
+# FlirFileParser.FlirFileParserError is raised when the thermal data of a frame is decoded.
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import os
+import sys
+import json
+import queue
+import threading
+from io import BytesIO
+import numpy
+from PIL import Image
+import FlirFileParser
+import FlirTemperatureConversion
+import FlirRegionStatistics
+import FlirHotspots
+
+##############################################################################################################
+# Constants
+##############################################################################################################
+FFF_MAGIC = b'FFF\x00'
+SEARCH_BLOCK_SIZE = 1024*1024
+SEQUENCE_EXTENSIONS = ('.seq', '.csq', '.fff')
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+def FindNextFrame(FileHandle, Position):
+   # Returns the file position of the next FFF frame header at or after Position, or None at the end of the file.
+   # The file is searched in blocks, so padding between the frames does not need to fit in memory.
+   FileHandle.seek(Position)
+   Overlap = b''
+   while True:
+      Block = FileHandle.read(SEARCH_BLOCK_SIZE)
+      if not Block:
+         return (None)
+      Data = Overlap + Block
+      Found = Data.find(FFF_MAGIC)
+      if Found >= 0:
+         return (Position - len(Overlap) + Found)
+      Overlap = Data[-(len(FFF_MAGIC)-1):]
+      Position += len(Block)
+
+def ReadSequenceFrames(FileName):
+   # Generator yielding the frames of a FLIR sequence file, only one frame is kept in memory at a time.
+   with open(FileName, 'rb') as FileHandle:
+      Position = 0
+      FrameIndex = 0
+      while True:
+         Position = FindNextFrame(FileHandle, Position)
+         if Position is None:
+            return
+         FileHandle.seek(Position)
+         Header = FileHandle.read(0x40)
+         try:
+            ByteOrder, IndexOffset, NumberOfRecords = FlirFileParser.ReadFffHeader(Header)
+            FileHandle.seek(Position)
+            FrameSize = FlirFileParser.GetFffSize(FileHandle.read(IndexOffset + 32*NumberOfRecords))
+         except FlirFileParser.FlirFileParserError:
+            # Not a frame header, just the same bytes inside the data of a frame, search on.
+            Position += 1
+            continue
+         FileHandle.seek(Position)
+         FffData = FileHandle.read(FrameSize)
+         if len(FffData) < FrameSize:
+            raise FlirFileParser.FlirFileParserError("Frame "+FrameIndex.__str__()+" of "+FileName.__str__()+" is truncated")
+         yield (MakeFrame(FlirFileParser.ParseFffData(FffData, FileName), FileName, FrameIndex))
+         FrameIndex += 1
+         Position += FrameSize
+
+def ReadStillFrames(FileNames):
+   # Generator yielding one frame per FLIR Jpeg file
+   for FrameIndex, FileName in enumerate(FileNames):
+      yield (MakeFrame(FlirFileParser.ParseFlirFile(FileName), FileName, FrameIndex))
+
+def ReadFrames(FileNames):
+   # Generator yielding the frames of a list of sequence files and / or FLIR Jpeg files, numbered in one series.
+   FrameIndex = 0
+   for FileName in FileNames:
+      if os.path.splitext(FileName)[1].lower() in SEQUENCE_EXTENSIONS:
+         Frames = ReadSequenceFrames(FileName)
+      else:
+         Frames = ReadStillFrames([FileName])
+      for Frame in Frames:
+         Frame['Index'] = FrameIndex
+         FrameIndex += 1
+         yield (Frame)
+
+def MakeFrame(FlirFileDict, FileName, FrameIndex):
+   Frame = dict()
+   Frame['Index'] = FrameIndex
+   Frame['FileName'] = FileName
+   Frame['MetaData'] = FlirFileDict['MetaData']
+   Frame['RawThermalData'] = DecodeRawThermalImage(FlirFileDict['RawThermalImage'], FlirFileDict['MetaData'])
+   return (Frame)
+
+def DecodeRawThermalImage(RawThermalImage, MetaData):
+   if MetaData.get('RawThermalImageType') not in ('PNG', 'TIFF'):
+      raise FlirFileParser.FlirFileParserError("Raw thermal data of type "+MetaData.get('RawThermalImageType').__str__()+" (JPEG-LS in .csq files) is not supported")
+   return (numpy.array(Image.open(BytesIO(RawThermalImage))))
+
+def ReadAhead(Frames, Depth=4):
+   # Runs the Frames generator on a worker thread and keeps up to Depth frames ready, so reading and decoding the
+   # next frames overlaps with processing the current one. Errors of the worker are raised in the caller.
+   FrameQueue = queue.Queue(maxsize=Depth)
+   Stop = threading.Event()
+   EndMarker = object()
+
+   def Put(Item):
+      # Waits for room in the queue, but gives up when the consumer stopped, returns False then
+      while not Stop.is_set():
+         try:
+            FrameQueue.put(Item, timeout=0.1)
+            return (True)
+         except queue.Full:
+            continue
+      return (False)
+
+   def Worker():
+      try:
+         for Frame in Frames:
+            if not Put((Frame, None)):
+               return
+         Put((EndMarker, None))
+      except BaseException:
+         Put((EndMarker, sys.exc_info()[1]))
+
+   WorkerThread = threading.Thread(target=Worker, daemon=True)
+   WorkerThread.start()
+   try:
+      while True:
+         Frame, Error = FrameQueue.get()
+         if Frame is EndMarker:
+            if Error is not None:
+               raise Error
+            return
+         yield (Frame)
+   finally:
+      # The consumer stopped early (or an error occured), let the worker finish
+      Stop.set()
+
+def ConvertFrames(Frames):
+   # Adds 'ThermalData' with the temperatures of the frame, using the cached lookup tables.
+   for Frame in Frames:
+      MetaData = Frame['MetaData']
+      RAT = float(MetaData['ReflectedApparentTemperature'].split(" ")[0])
+      # The same byte swap rule as FLIRImage
+      SwapBytes = FlirTemperatureConversion.IsRawDataByteSwapped(MetaData)
+      Frame['ThermalData'] = FlirTemperatureConversion.ConvertRawToTemperature(Frame['RawThermalData'], MetaData['PlanckR1'], MetaData['PlanckR2'], MetaData['PlanckB'], MetaData['PlanckF'], MetaData['PlanckO'], MetaData['Emissivity'], RAT, SwapBytes)
+      yield (Frame)
+
+def BoxStatisticsStage(Frames, Boxes, ThresholdTemperature=None):
+   # Adds 'BoxStatistics', a dictionary of 'Count', 'Sum', 'Mean' and 'Std' arrays with one value per box.
+   Boxes = numpy.asarray(Boxes, dtype=numpy.int64).reshape(-1, 4)
+   for Frame in Frames:
+      Statistics = FlirRegionStatistics.RegionStatistics(Frame['ThermalData'])
+      Frame['BoxStatistics'] = Statistics.GetBoxStatistics(Boxes[:, 0], Boxes[:, 1], Boxes[:, 2], Boxes[:, 3], ThresholdTemperature)
+      yield (Frame)
+
+def HotspotStage(Frames, ThresholdTemperature, MinimumArea=1, TopK=None, AboveAmbient=None):
+   # Adds 'MaxTemperature', 'MaxLocation' (X, Y in thermal pixels), 'HotPixels', the number of pixels above the
+   # threshold temperature, and 'Hotspots', the connected regions above it (See FlirHotspots.py), hottest first,
+   # at most TopK and of at least MinimumArea pixels. A region is a dictionary with the 'Area', 'Mean', 'Std',
+   # 'Max', 'MaxLocation' and 'Centroid' (X, Y) and the bounding 'Box' (Row1, Row2, Column1, Column2). With
+   # AboveAmbient the threshold is that many degrees above the AtmosphericTemperature of the frame.
+   for Frame in Frames:
+      ThermalData = Frame['ThermalData']
+      Threshold = FlirHotspots.GetThresholdTemperature(Frame['MetaData'], None, AboveAmbient, ThresholdTemperature)
+      MaxIndex = numpy.nanargmax(ThermalData)
+      MaxY, MaxX = numpy.unravel_index(MaxIndex, ThermalData.shape)
+      Frame['MaxTemperature'] = float(ThermalData[MaxY, MaxX])
+      Frame['MaxLocation'] = (int(MaxX), int(MaxY))
+      with numpy.errstate(invalid='ignore'):
+         Frame['HotPixels'] = int(numpy.count_nonzero(ThermalData > Threshold))
+      Regions = FlirHotspots.DetectHotspots(ThermalData, Threshold, MinimumArea, TopK)
+      Hotspots = []
+      for Index in range(len(Regions['Area'])):
+         Hotspot = dict()
+         Hotspot['Area'] = int(Regions['Area'][Index])
+         Hotspot['Mean'] = float(Regions['Mean'][Index])
+         Hotspot['Std'] = float(Regions['Std'][Index])
+         Hotspot['Max'] = float(Regions['Max'][Index])
+         Hotspot['MaxLocation'] = (int(Regions['MaxColumn'][Index]), int(Regions['MaxRow'][Index]))
+         Hotspot['Centroid'] = (float(Regions['CentroidColumn'][Index]), float(Regions['CentroidRow'][Index]))
+         Hotspot['Box'] = tuple(int(Regions[Name][Index]) for Name in ('Row1', 'Row2', 'Column1', 'Column2'))
+         Hotspots.append(Hotspot)
+      Frame['Hotspots'] = Hotspots
+      yield (Frame)
+
+def ExportStage(Frames, OutputFileName, ArrayDirectory=None):
+   # Writes one line of JSON per frame with all frame entries that are not arrays, when ArrayDirectory is passed
+   # the temperatures of every frame are saved there as .npy file as well.
+   if ArrayDirectory is not None:
+      os.makedirs(ArrayDirectory, exist_ok=True)
+   with open(OutputFileName, 'w') as OutputFile:
+      for Frame in Frames:
+         Record = dict()
+         for Key, Value in Frame.items():
+            if Key in ('RawThermalData', 'ThermalData'):
+               continue
+            Record[Key] = ToJson(Value)
+         if ArrayDirectory is not None and 'ThermalData' in Frame:
+            Record['ThermalDataFile'] = os.path.join(ArrayDirectory, "Frame%06d.npy" % Frame['Index'])
+            numpy.save(Record['ThermalDataFile'], Frame['ThermalData'])
+         OutputFile.write(json.dumps(Record)+"\n")
+         yield (Frame)
+
+def ToJson(Value):
+   if isinstance(Value, dict):
+      return (dict((Key, ToJson(Item)) for Key, Item in Value.items()))
+   if isinstance(Value, numpy.ndarray):
+      return ([ToJson(Item) for Item in Value.tolist()])
+   if isinstance(Value, (list, tuple)):
+      return ([ToJson(Item) for Item in Value])
+   if isinstance(Value, float) and Value != Value:
+      # JSON has no nan
+      return (None)
+   if isinstance(Value, numpy.generic):
+      return (ToJson(Value.item()))
+   return (Value)
+
+def RunPipeline(Frames, *Stages):
+   # Chains the stages and returns the resulting frame generator, nothing is read until it is iterated.
+   for Stage in Stages:
+      Frames = Stage(Frames)
+   return (Frames)
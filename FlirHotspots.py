@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirHotspots.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This module finds the hot regions in temperature arrays, like overheated connectors or the warm part of a
+# radiator, without drawing boxes by hand. The temperatures above a threshold temperature are grouped into
+# connected regions and per region the area, mean, standard deviation, maximum (and its location), centroid and
+# bounding box are determined, the hottest regions first.
+#
+# DetectHotspots(ThermalData, ThresholdTemperature, MinimumArea=1, TopK=None, Connectivity=8) takes a single
+# temperature array (height x width) or a stack of frames (frames x height x width), in which case the regions are
+# found per frame in one go and ThresholdTemperature can be one value per frame. It returns a dictionary of arrays
+# with one value per region: 'Frame', 'Label', 'Area', 'Mean', 'Std', 'Max', 'MaxRow', 'MaxColumn', 'CentroidRow',
+# 'CentroidColumn' and the bounding box 'Row1', 'Row2', 'Column1', 'Column2' in python slice notation. The
+# regions are sorted per frame from the highest to the lowest maximum, with TopK only the TopK hottest regions of
+# every frame are returned. Regions smaller than MinimumArea pixels are left out.
+# LabelRegions(Mask, Connectivity=8) returns the label array (0 outside the regions, 1..N inside) and N.
+# GetThresholdTemperature(MetaData, Temperature, AboveAmbient, Default) gives the threshold to use: an absolute
+# temperature, a number of degrees above the AtmosphericTemperature of the meta data, or the default.
+# Everything is done with numpy array operations, temperatures that are not a number are never part of a region.
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import numpy
+
+##############################################################################################################
+# Constants
+##############################################################################################################
+# The (row, column) offsets to the neighbours of a pixel that are not visited yet in row major order
+NEIGHBOUR_OFFSETS = {4: ((0, 1), (1, 0)), 8: ((0, 1), (1, 0), (1, 1), (1, -1))}
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+def GetNeighbourPairs(Mask, Connectivity):
+   # The flat indices (A, B) of all pairs of neighbouring pixels in the last two dimensions that are both in the mask
+   Indices = numpy.arange(Mask.size).reshape(Mask.shape)
+   Height, Width = Mask.shape[-2:]
+   PairsA = []
+   PairsB = []
+   for RowOffset, ColumnOffset in NEIGHBOUR_OFFSETS[Connectivity]:
+      RowsA = slice(0, Height-RowOffset)
+      RowsB = slice(RowOffset, Height)
+      ColumnsA = slice(max(0, -ColumnOffset), Width-max(0, ColumnOffset))
+      ColumnsB = slice(max(0, ColumnOffset), Width-max(0, -ColumnOffset))
+      Both = Mask[..., RowsA, ColumnsA] & Mask[..., RowsB, ColumnsB]
+      PairsA.append(Indices[..., RowsA, ColumnsA][Both])
+      PairsB.append(Indices[..., RowsB, ColumnsB][Both])
+   return (numpy.concatenate(PairsA), numpy.concatenate(PairsB))
+
+def LabelRegions(Mask, Connectivity=8):
+   # Connected components by repeatedly hooking every region root onto the lowest neighbouring root and then
+   # pointing every pixel directly at its root (pointer jumping), so only a few passes over the pixels are needed.
+   # For a stack of frames the regions are found per frame (pixels are only connected within their frame).
+   Mask = numpy.asarray(Mask, dtype=bool)
+   Pixels = numpy.flatnonzero(Mask)
+   # Compact numbers of the pixels in the mask, so the work only depends on the number of pixels in the mask
+   Numbers = numpy.zeros(Mask.size, dtype=numpy.int64)
+   Numbers[Pixels] = numpy.arange(len(Pixels))
+   PairsA, PairsB = GetNeighbourPairs(Mask, Connectivity)
+   PairsA = Numbers[PairsA]
+   PairsB = Numbers[PairsB]
+   Parents = numpy.arange(len(Pixels))
+   while True:
+      RootsA = Parents[PairsA]
+      RootsB = Parents[PairsB]
+      Different = RootsA != RootsB
+      if not Different.any():
+         break
+      Lowest = numpy.minimum(RootsA[Different], RootsB[Different])
+      numpy.minimum.at(Parents, RootsA[Different], Lowest)
+      numpy.minimum.at(Parents, RootsB[Different], Lowest)
+      while True:
+         GrandParents = Parents[Parents]
+         if numpy.array_equal(GrandParents, Parents):
+            break
+         Parents = GrandParents
+   # The roots are the first pixel of every region, so the labels are numbered in row major order
+   Roots, RegionNumbers = numpy.unique(Parents, return_inverse=True)
+   Labels = numpy.zeros(Mask.shape, dtype=numpy.int64)
+   Labels.reshape(-1)[Pixels] = RegionNumbers.reshape(-1)+1
+   return (Labels, len(Roots))
+
+def GetRegionProperties(ThermalData, Labels, NumberOfRegions):
+   # The properties of all labeled regions at once, sorted by label
+   ThermalData = numpy.asarray(ThermalData, dtype=numpy.float64)
+   Shape = ThermalData.shape if ThermalData.ndim == 3 else (1,)+ThermalData.shape
+   Pixels = numpy.flatnonzero(Labels)
+   RegionNumbers = Labels.reshape(-1)[Pixels]-1
+   Temperatures = ThermalData.reshape(-1)[Pixels]
+   Frames, Rows, Columns = numpy.unravel_index(Pixels, Shape)
+   Properties = dict()
+   Properties['Label'] = numpy.arange(1, NumberOfRegions+1)
+   Area = numpy.bincount(RegionNumbers, minlength=NumberOfRegions)
+   Properties['Area'] = Area
+   Properties['Mean'] = numpy.bincount(RegionNumbers, Temperatures, NumberOfRegions) / numpy.maximum(Area, 1)
+   SquaredMean = numpy.bincount(RegionNumbers, Temperatures*Temperatures, NumberOfRegions) / numpy.maximum(Area, 1)
+   Properties['Std'] = numpy.sqrt(numpy.maximum(SquaredMean - Properties['Mean']**2, 0.0))
+   Properties['CentroidRow'] = numpy.bincount(RegionNumbers, Rows, NumberOfRegions) / numpy.maximum(Area, 1)
+   Properties['CentroidColumn'] = numpy.bincount(RegionNumbers, Columns, NumberOfRegions) / numpy.maximum(Area, 1)
+   # Sorted by region and then temperature, the last pixel of every region is its maximum
+   Order = numpy.lexsort((Temperatures, RegionNumbers))
+   Ends = numpy.cumsum(Area)
+   Starts = Ends-Area
+   Properties['Frame'] = Frames[Order[Starts]]
+   Properties['Max'] = Temperatures[Order[Ends-1]]
+   Properties['MaxRow'] = Rows[Order[Ends-1]]
+   Properties['MaxColumn'] = Columns[Order[Ends-1]]
+   Properties['Row1'] = numpy.minimum.reduceat(Rows[Order], Starts) if NumberOfRegions else Rows[:0]
+   Properties['Row2'] = numpy.maximum.reduceat(Rows[Order], Starts)+1 if NumberOfRegions else Rows[:0]
+   Properties['Column1'] = numpy.minimum.reduceat(Columns[Order], Starts) if NumberOfRegions else Columns[:0]
+   Properties['Column2'] = numpy.maximum.reduceat(Columns[Order], Starts)+1 if NumberOfRegions else Columns[:0]
+   return (Properties)
+
+def DetectHotspots(ThermalData, ThresholdTemperature, MinimumArea=1, TopK=None, Connectivity=8):
+   ThermalData = numpy.asarray(ThermalData)
+   Threshold = numpy.asarray(ThresholdTemperature, dtype=numpy.float64)
+   if ThermalData.ndim == 3:
+      # One threshold for all frames or one per frame
+      Threshold = Threshold.reshape(-1, 1, 1)
+   with numpy.errstate(invalid='ignore'):
+      Mask = ThermalData > Threshold
+   Labels, NumberOfRegions = LabelRegions(Mask, Connectivity)
+   Properties = GetRegionProperties(ThermalData, Labels, NumberOfRegions)
+   Order = numpy.lexsort((-Properties['Max'], Properties['Frame']))
+   Order = Order[Properties['Area'][Order] >= MinimumArea]
+   if TopK is not None:
+      # The rank of every region within its frame, the regions of a frame are next to each other
+      Frames = Properties['Frame'][Order]
+      Ranks = numpy.arange(len(Order)) - numpy.searchsorted(Frames, Frames, side='left')
+      Order = Order[Ranks < TopK]
+   return (dict((Name, Values[Order]) for Name, Values in Properties.items()))
+
+def GetAmbientTemperature(MetaData):
+   # The AtmosphericTemperature is stored like "20.0 C"
+   return (float(MetaData['AtmosphericTemperature'].__str__().split(" ")[0]))
+
+def GetThresholdTemperature(MetaData, Temperature=None, AboveAmbient=None, Default=None):
+   if Temperature is not None:
+      return (Temperature)
+   if AboveAmbient is not None:
+      return (GetAmbientTemperature(MetaData)+AboveAmbient)
+   return (Default)
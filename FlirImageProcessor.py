@@ -1,9 +1,25 @@
 #!/usr/bin/env python
 ##############################################################################################################
 # FlirImageProcessor.py 
-# Last Update: January 9th 2021
+# Last Update: October 16th 2026
 # V0.1 : Initial Creation
 # V0.2 : Added Average Temperature Box Calculation with Thresholding (Easy way to get average radiator temperature)
+# V0.3 : Reading the FLIR data in-process with FlirFileParser, exiftool is only used as fallback
+# V0.4 : exiftool is kept running in -stay_open mode (ExifToolPool) i.s.o. starting it for every call
+# V0.5 : Added FlirBatchProcessor.py for headless batch processing, the GUI only starts when run as script
+# V0.6 : Raw to temperature conversion with cached lookup tables (FlirTemperatureConversion.py)
+# V0.7 : All data of a FLIRImage is determined on first use, the jpg files are saved when the figure is created
+# V0.8 : Box averages are taken from summed area tables (FlirRegionStatistics.py)
+# V0.9 : Slider moves only update the color limits and redraw the image axes with blitting
+# V0.10: Optional on disk cache of the decoded data (FlirDataCache.py)
+# V0.11: Optional timing and memory measurement of the processing stages (FlirInstrumentation.py)
+# V0.12: The Thermal jpg is made with a precomputed palette (FlirThermalRenderer.py)
+# V0.13: The processed image is composed without matplotlib (FlirCompositor.py), SaveProcessedImage() works headless
+# V0.14: The window is moved to FlirImageViewer.py, importing this module does not import matplotlib anymore
+# V0.15: CompactMode, only the raw thermal data is kept and converted to 32 bit temperatures when needed
+# V0.16: GetHotspots() finds the regions above a threshold temperature (FlirHotspots.py)
+# V0.17: The picture is lined up with the thermal image per camera (FlirCameraProfiles.py) in one resize
+# V0.18: Only png raw data is byte swapped, plain 16 bit raw data of little endian cameras gave nan temperatures
 ##############################################################################################################
 #
 # This Script contains a Class FlirImage, Create an object of this class by passing it the filename of the FLIR
@@ -14,43 +30,36 @@
 #   embedded in the FLIR Jpeg file's exif meta data.
 # - SaveThermalImage (True/False), When set to True, a jpg file be saved containing the thermal picture that is
 #   embedded in the FLIR Jpeg file's exif meta data.
+#   The jpg files are saved when the figure is created, or when SaveImageFiles() is called. The file names are
+#   available as ThermalImageFileName and NormalImageFileName, reading those saves the file when not done yet.
+# - CacheDirectory, When set, the meta data, raw thermal data and temperatures are kept in this directory
+#   (See FlirDataCache.py), opening the same file again reads them from there i.s.o. decoding the file again.
 # - PrintAllExifMetaData (True/False), When set to True, all extrated Exif meta data attributes are printed to
 #   the terminal the script is run from.
+# - CameraProfileFile, the file with the camera profiles (See FlirCameraProfiles.py), which tell per camera where
+#   the thermal image is on the picture. Default FlirCameraProfiles.DEFAULT_PROFILE_FILE, a camera that is not in
+#   it (and not a Flir C5) is registered with the first image of it and added to the file.
+# - CompactMode (True/False), When set to True, the object only keeps the raw 16 bit thermal data (and the file it
+#   was read from), the temperatures are converted with a 32 bit lookup table every time they are needed, and only
+#   for the boxes and points asked for. The upscaled and picture images are made again every time they are used
+#   i.s.o. being kept in the object. This takes about ten times less memory per open image, for scripts and batch
+#   workers that keep many images open, at the cost of converting again when the same data is used again.
 #
-# The ImageProcessor requires exiftool to be installed on the system, it uses it to extract all the relevant
-# information from the exif meta data of the FLIR Jpeg file. (See https://exiftool.org/ for more info.)
+# The ImageProcessor reads all the relevant information from the FLIR Jpeg file itself (See FlirFileParser.py),
+# the file is read only once. For files the parser does not support, exiftool is used as a fallback, so for those
+# exiftool needs to be installed on the system. (See https://exiftool.org/ for more info.)
 # If exiftools is not in the standard search path, you can add it's full path in the __init__() of the class:
 # self.ExifToolPath="exiftool"
+# Set self.UseNativeParser=False in the __init__() of the class to always use exiftool.
+# exiftool is started once and kept running (See ExifToolPool.py), all FLIRImage objects share that process.
+# The wall time, cpu time and peak memory of the processing stages (reading, converting, resizing, saving and
+# plotting) can be recorded by calling FlirInstrumentation.Enable() first (See FlirInstrumentation.py).
 # This script has been written and tested with Python version 3.5.2, it will not work with 2.x versions. 
 #
-# In the top of the window some information is shown about the camera and it's settings used to create the
-# foto, as well as some information about the foto.
-#
-# The camera image is shown with the colormap ranging from the minimum to the maximum temperature found in the
-# image thermal image data.
-#
-# Below the image there are 2 slider bars, they can be used to change the minimum temperature and the maximum
-# temperature of the colormap used to display the image.
-# They can be used to saturate in the lower and / or higher temperatures, so more colors are available for a 
-# smaller temperature range and details become visible.
-#
-# Below the Sliderbars are 3 buttons;
-# - The first one is Marker, once pressed, every mouse click in the image will draw a marker and the temperature 
-#   of that location. This will continue untill the Marker Button is pressed again.
-#   When the right mouse button is used i.s.o. the left one, no marker is drawn, but the temperature of the pixel
-#   clicked on will be set as the thresholding temperature for the select box option.
-# - The second button is Select Box, once pressed a selection box can be drawn with the mouse, once a box is drawn
-#   the box can be used for 2 functionalities:
-#   1) Draw Box and calculate and show the average temperature inside the box
-#   2) Create a new colormap of the temperature range inside the box and draw an image overlay of the box with
-#      the new colormap. This is usefull to show details in an image without saturating the rest of the image.
-#   These two functionalities can be selected by means of pressing the appropriate key once the box is selected:
-#   - a or A for average temperature box
-#   - t or T for a new Temperature Overlay in the box.
-#   - h or H for a new Thresholded Temperature overlay box with calculated average temperature. 
-#     (All temperatures below threshold are set to 0.0)
-#   Selecting boxes will continue untill the Select Box Button is pressed again.
-# - The Third button is to save a processed image of the layers shown in the image section of the window.
+# The interactive window (figure, sliders, buttons, markers and selection boxes) is in FlirImageViewer.py, this module
+# only imports numpy and PIL, so it loads fast in scripts and worker processes. Running this script, or using
+# FlirImageProcessor.FLIRImageViewer, imports the viewer when it is needed. Show an image in the window with:
+#   python FlirImageViewer.py FLIR0356.jpg
 #
 ##############################################################################################################
 
@@ -58,188 +67,406 @@
 ##############################################################################################################
 # Imports
 ##############################################################################################################
+import os
+import sys
 import numpy
-import subprocess
 from io import BytesIO
-import datetime
 import json
-import matplotlib.pyplot as plot
-import matplotlib.patches as patches
-from matplotlib import cm
-from mpl_toolkits.axes_grid1.inset_locator import inset_axes
-from matplotlib.widgets import RectangleSelector, Cursor, Slider, Button
-from PIL import Image, ImageEnhance
+from PIL import Image
+import FlirFileParser
+import ExifToolPool
+import FlirTemperatureConversion
+import FlirRegionStatistics
+import FlirHotspots
+import FlirCameraProfiles
+import FlirDataCache
+import FlirInstrumentation
+import FlirThermalRenderer
+import FlirCompositor
 
 ##############################################################################################################
 # Class Definitions
 ##############################################################################################################
+class LazyAttribute:
+   # Decorator for a method without arguments that turns it into an attribute, the method is called on first
+   # access and the result is stored in the object, so later accesses (and assignments) use the stored value.
+   def __init__(self, Function):
+      self.Function = Function
+      self.__doc__ = Function.__doc__
+
+   def __get__(self, Instance, Owner):
+      if Instance is None:
+         return (self)
+      Value = self.Function(Instance)
+      Instance.__dict__[self.Function.__name__] = Value
+      return (Value)
+
+class CompactLazyAttribute(LazyAttribute):
+   # Like LazyAttribute, but for the large images of a FLIRImage: in CompactMode the result is not stored, the
+   # method is called again on every access.
+   def __get__(self, Instance, Owner):
+      if Instance is None or not Instance.CompactMode:
+         return (LazyAttribute.__get__(self, Instance, Owner))
+      return (self.Function(Instance))
+
+class LazyFlirObject(dict):
+   # Dictionary of which the entries are only calculated the first time they are used, Loaders is a dictionary
+   # with per key the function returning the value of that key. The keys in Transient are not stored, their
+   # function is called on every use.
+   def __init__(self, Loaders, Transient=()):
+      dict.__init__(self)
+      self.Loaders = Loaders
+      self.Transient = Transient
+
+   def __missing__(self, Key):
+      if Key not in self.Loaders:
+         raise KeyError(Key)
+      Value = self.Loaders[Key]()
+      if Key not in self.Transient:
+         self[Key] = Value
+      return (Value)
+
 class FLIRImage:
-   def __init__(self, ImageName, ShowMinMaxTemperature=True, SaveNormalImage=True, SaveThermalImage=True, PrintAllExifMetaData=False):
+   def __init__(self, ImageName, ShowMinMaxTemperature=True, SaveNormalImage=True, SaveThermalImage=True, PrintAllExifMetaData=False, CacheDirectory=None, CompactMode=False, CameraProfileFile=None):
+      # Nothing is read or calculated here, every piece of data is determined the first time it is used.
+      # (See the LazyAttribute methods below) So opening an image to read the max temperature only costs parsing the
+      # file and converting the thermal data.
       self.ImageName = ImageName
       self.ShowMinMaxTemperature = ShowMinMaxTemperature
+      self.SaveNormalImageFile = SaveNormalImage
+      self.SaveThermalImageFile = SaveThermalImage
       self.PrintAllExifMetaData = PrintAllExifMetaData
+      self.CacheDirectory = CacheDirectory
+      self.CompactMode = CompactMode
+      self.CameraProfileFile = CameraProfileFile
       self.ExifToolPath = "exiftool"
-      self.FlirObject = self.GetFlirFileData()
-      self.MinTemp=numpy.amin(self.FlirObject['ThermalData'])
-      self.MaxTemp=numpy.amax(self.FlirObject['ThermalData'])
-      self.ThermalMin = self.MinTemp
-      self.ThermalMax = self.MaxTemp
+      self.UseNativeParser = True
       self.ThresholdTemperature = 20.0
       self.MeasurementPoints = []
       self.AverageMeasurementBoxes = []
       self.ThresholdedAverageMeasurementBoxes = []
       self.OverlayBoxes = []
+
+   @LazyAttribute
+   @FlirInstrumentation.InstrumentStage
+   def FlirFile(self):
+      FlirFile=None
+      if self.UseNativeParser:
+         #Read and parse the file once, this gives the meta data and both embedded images in one go.
+         try:
+            FlirFile = FlirFileParser.ParseFlirFile(self.ImageName)
+         except FlirFileParser.FlirFileParserError:
+            #Not a layout the native parser knows, let exiftool have a go at it.
+            FlirFile = None
+
+      if FlirFile is None:
+         #One batched request to the running exiftool process for the meta data and both binaries.
+         FlirFile = ExifToolPool.GetSharedPool(self.ExifToolPath).ExtractFile(self.ImageName)
+      return (FlirFile)
+
+   @LazyAttribute
+   def DataCache(self):
+      #The on disk cache of decoded data (See FlirDataCache.py), None when no CacheDirectory was passed.
+      if self.CacheDirectory is None:
+         return (None)
+      return (FlirDataCache.GetCache(self.CacheDirectory))
+
+   @LazyAttribute
+   def FileHash(self):
+      return (FlirDataCache.HashFile(self.ImageName))
+
+   @LazyAttribute
+   def FlirObject(self):
+      return (self.GetFlirFileData())
+
+   @LazyAttribute
+   def MinTemp(self):
+      return (self.TemperatureRange[0])
+
+   @LazyAttribute
+   def MaxTemp(self):
+      return (self.TemperatureRange[1])
+
+   @LazyAttribute
+   def TemperatureRange(self):
+      #Both from one pass over the thermal data, in CompactMode that is only converted once for the two
+      ThermalData = self.FlirObject['ThermalData']
+      return (numpy.amin(ThermalData), numpy.amax(ThermalData))
+
+   @LazyAttribute
+   def ThermalMin(self):
+      return (self.MinTemp)
+
+   @LazyAttribute
+   def ThermalMax(self):
+      return (self.MaxTemp)
+
+   @CompactLazyAttribute
+   @FlirInstrumentation.InstrumentStage
+   def NewThermalImage(self):
+      #The thermal data scaled up to the size of the embedded image
       NormalWidth=self.FlirObject['MetaData']['EmbeddedImageWidth']
       NormalHeight=self.FlirObject['MetaData']['EmbeddedImageHeight']
-      self.NewThermalImage = numpy.array(Image.fromarray(self.FlirObject['ThermalData']).resize((NormalWidth, NormalHeight), Image.ANTIALIAS))
-      if SaveThermalImage:
-         ThermalImageToSave = self.RescaleImageColorMap(self.NewThermalImage)
-         self.SaveThermalImage(ThermalImageToSave, self.ImageName.split('.')[0]+"Thermal.jpg")
-      ResizeWidth=int(NormalWidth*self.FlirObject['MetaData']['Real2IR'])
-      ResizeHeight=int(NormalHeight*self.FlirObject['MetaData']['Real2IR'])
-      self.NewRGBImage = numpy.array(Image.fromarray(self.FlirObject['PictureData']).resize((ResizeWidth, ResizeHeight), Image.ANTIALIAS))
-      if SaveNormalImage:
-         self.SaveImage(self.NewRGBImage, self.ImageName.split('.')[0]+"Normal.jpg")
-      # Now here we determine which part of the real image corresponds with the scaled up thermal image
-      # There is no science behind this, other than noticing some values that seem to work for my Flir C5 camera. Offsets found in
-      # the exif meta data do not seem to align the real image with the thermal image very nicely (X off by 10 pixels and Y off by 4 pixels)
-      # so I don't even bother to use them and hardcoded a value here that works for my camera, you probably need to update these...
-      CameraXshift = 178
-      CameraYshift = 101
-      AreaToCrop = (CameraXshift, CameraYshift, (NormalWidth+CameraXshift), (NormalHeight+CameraYshift)) 
-      #Cropping the scaled rgb image
-      self.NewRGBImage = numpy.array(Image.fromarray(self.NewRGBImage).crop(AreaToCrop))
-      #Converting it to greyscale
-      self.NewRGBImage = numpy.array(ImageEnhance.Color(Image.fromarray(self.NewRGBImage)).enhance(0.0))
-      #Improving the contrast a bit so it mixes better with the thermal image
-      self.NewRGBImage = numpy.array(ImageEnhance.Contrast(Image.fromarray(self.NewRGBImage)).enhance(3.0))
-      self.MeasurementPointActive=False
-      self.SelectionBoxHelpText="SelectionBox Active, actions for Selection Box  once drawn are:\nPress the T or t to Scale the colormap to the temperatures present in the selection Box.\nPress the A or a to Calculate the average temperature present in the selection Box.\nPress the H or h to Calculate the Average Temperature afther Thresholding the Selection Box with "
-      self.MarkerHelpText="Temperature Markers Active, Markers will appear where you click with the mouse in the foto.\nRight Click will not create a marker but will set that temperature as thresholding temperature."
-      
+      return (numpy.array(Image.fromarray(self.FlirObject['ThermalData']).resize((NormalWidth, NormalHeight), Image.LANCZOS)))
+
+   @CompactLazyAttribute
+   @FlirInstrumentation.InstrumentStage
+   def ScaledRGBImage(self):
+      #The embedded image scaled up with Real2IR, this is the image saved as Normal jpg.
+      ResizeWidth=int(self.FlirObject['MetaData']['EmbeddedImageWidth']*self.FlirObject['MetaData']['Real2IR'])
+      ResizeHeight=int(self.FlirObject['MetaData']['EmbeddedImageHeight']*self.FlirObject['MetaData']['Real2IR'])
+      return (numpy.array(Image.fromarray(self.FlirObject['PictureData']).resize((ResizeWidth, ResizeHeight), Image.LANCZOS)))
+
+   @LazyAttribute
+   def CameraProfile(self):
+      #Where the thermal image is on the scaled picture for the camera of this image (See FlirCameraProfiles.py), a
+      #camera without a profile is registered with this image.
+      return (FlirCameraProfiles.GetCameraProfile(self.FlirObject['MetaData'], self.CameraProfileFile, lambda: self.NewThermalImage, lambda: self.FlirObject['PictureData']))
+
+   @CompactLazyAttribute
+   @FlirInstrumentation.InstrumentStage
+   def NewRGBImage(self):
+      #The part of the picture that corresponds with the scaled up thermal image, in grey with more contrast so it
+      #mixes better with the thermal image. Cut, scaled and enhanced in one go (See FlirCameraProfiles.py).
+      NormalWidth=self.FlirObject['MetaData']['EmbeddedImageWidth']
+      NormalHeight=self.FlirObject['MetaData']['EmbeddedImageHeight']
+      return (FlirCameraProfiles.MakeVisualLayer(self.FlirObject['PictureData'], NormalWidth, NormalHeight, self.CameraProfile))
+
+   @LazyAttribute
+   def ThermalImageFileName(self):
+      #Saves the Thermal jpg the first time it is asked for and returns its name
+      ThermalImageFileName = os.path.splitext(self.ImageName)[0]+"Thermal.jpg"
+      self.SaveThermalImage(self.NewThermalImage, ThermalImageFileName)
+      return (ThermalImageFileName)
+
+   @LazyAttribute
+   def NormalImageFileName(self):
+      #Saves the Normal jpg the first time it is asked for and returns its name
+      NormalImageFileName = os.path.splitext(self.ImageName)[0]+"Normal.jpg"
+      self.SaveImage(self.ScaledRGBImage, NormalImageFileName)
+      return (NormalImageFileName)
+
+   def SaveImageFiles(self):
+      #Saves the Thermal and / or Normal jpg files as selected when creating the object, each is only saved once.
+      if self.SaveThermalImageFile:
+         self.ThermalImageFileName
+      if self.SaveNormalImageFile:
+         self.NormalImageFileName
 
    def GetFlirFileData(self):
-      FlirDataDict=dict()
+      #In CompactMode only the meta data and the raw thermal data are kept, the temperatures and the picture are
+      #made again every time they are used.
+      Transient = ('ThermalData', 'PictureData') if self.CompactMode else ()
+      FlirDataDict=LazyFlirObject({'MetaData':self.GetFlirFileMetaData, 'RawThermalData':self.GetFlirFileRawThermalData,
+                                   'ThermalData':self.GetFlirFileThermalData, 'PictureData':self.GetFlirFilePictureData}, Transient)
+      return (FlirDataDict)
 
+   @FlirInstrumentation.InstrumentStage
+   def GetFlirFileMetaData(self):
       #First Get all the Exif Meta Data from the image, binaries are not part of this.
-      FlirDataDict['MetaData'] = self.GetMetaData()
-
+      MetaData = None
+      if self.DataCache is not None:
+         MetaData = self.DataCache.LoadMetaData(self.FileHash)
+      if MetaData is None:
+         MetaData = self.FlirFile['MetaData']
+         if self.DataCache is not None:
+            self.DataCache.StoreMetaData(self.FileHash, MetaData)
       if self.PrintAllExifMetaData:
-         for key,value in FlirDataDict['MetaData'].items():
+         for key,value in MetaData.items():
             print(key.__str__()+" : "+value.__str__())
+      return (MetaData)
 
-      #Now get the raw thermal camera data and convert the raw data to temperatures using the camera's calibration values from the ExifData.
-      PlanckR1=FlirDataDict['MetaData']["PlanckR1"]
-      PlanckR2=FlirDataDict['MetaData']["PlanckR2"]
-      PlanckB=FlirDataDict['MetaData']["PlanckB"]
-      PlanckF=FlirDataDict['MetaData']["PlanckF"]
-      PlanckO=FlirDataDict['MetaData']["PlanckO"]
-      Emissivity=FlirDataDict['MetaData']['Emissivity']
-      RAT=float(FlirDataDict['MetaData']['ReflectedApparentTemperature'].split(" ")[0])
-      ExifByteOrder=FlirDataDict['MetaData']['ExifByteOrder']
-      FlirDataDict['ThermalData'] = self.GetThermalData(PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, ExifByteOrder)
+   def GetCalibrationValues(self):
+      #The camera's calibration values from the ExifData needed to convert the raw data to temperatures, and whether
+      #the raw data needs to be byte swapped (See FlirTemperatureConversion.IsRawDataByteSwapped()).
+      MetaData = self.FlirObject['MetaData']
+      PlanckR1=MetaData["PlanckR1"]
+      PlanckR2=MetaData["PlanckR2"]
+      PlanckB=MetaData["PlanckB"]
+      PlanckF=MetaData["PlanckF"]
+      PlanckO=MetaData["PlanckO"]
+      Emissivity=MetaData['Emissivity']
+      RAT=float(MetaData['ReflectedApparentTemperature'].split(" ")[0])
+      SwapBytes=FlirTemperatureConversion.IsRawDataByteSwapped(MetaData)
+      return (PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, SwapBytes)
 
-      #Finally get the Normal image data
-      FlirDataDict['PictureData'] = self.GetPictureData()
+   @FlirInstrumentation.InstrumentStage
+   def GetFlirFileRawThermalData(self):
+      #The raw thermal camera data as stored in the file, so not byte swapped.
+      if self.DataCache is None:
+         return (self.GetRawThermalData(self.FlirFile['RawThermalImage']))
+      RawThermalData = self.DataCache.LoadArray(self.FileHash, 'RawThermalData')
+      if RawThermalData is None:
+         RawThermalData = self.GetRawThermalData(self.FlirFile['RawThermalImage'])
+         self.DataCache.StoreArray(self.FileHash, 'RawThermalData', RawThermalData)
+      return (RawThermalData)
 
-      return (FlirDataDict)
-      
+   @FlirInstrumentation.InstrumentStage
+   def GetFlirFileThermalData(self):
+      #Convert the raw data to temperatures using the camera's calibration values from the ExifData.
+      PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, SwapBytes = self.GetCalibrationValues()
+      if self.CompactMode:
+         #32 bit temperatures of the whole frame for the one use they are made for, so not cached either.
+         return (self.GetThermalData(PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, SwapBytes, self.FlirObject['RawThermalData'], numpy.float32))
+      if self.DataCache is None:
+         return (self.GetThermalData(PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, SwapBytes, self.FlirObject['RawThermalData']))
+      #The temperatures are cached per set of calibration values
+      CacheName = "ThermalData-"+FlirDataCache.GetCalibrationKey(self.GetCalibrationValues())
+      ThermalData = self.DataCache.LoadArray(self.FileHash, CacheName)
+      if ThermalData is None:
+         ThermalData = self.GetThermalData(PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, SwapBytes, self.FlirObject['RawThermalData'])
+         self.DataCache.StoreArray(self.FileHash, CacheName, ThermalData)
+      return (ThermalData)
+
+   @FlirInstrumentation.InstrumentStage
+   def GetFlirFilePictureData(self):
+      #The Normal image data
+      return (self.GetPictureData(self.FlirFile['EmbeddedImage']))
+
+   @FlirInstrumentation.InstrumentStage
    def GetMetaData(self):
-      JsonMetaData = subprocess.check_output([self.ExifToolPath, self.ImageName, "-j"])
+      JsonMetaData = ExifToolPool.GetSharedPool(self.ExifToolPath).Execute([self.ImageName, "-j"])
       return (json.loads(JsonMetaData.decode())[0])
 
-   def GetThermalData(self, PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, ExifByteOrder="Little-endian (Intel, II)"):
-      RawData = subprocess.check_output([self.ExifToolPath, "-RawThermalImage", "-b", self.ImageName])
+   @FlirInstrumentation.InstrumentStage
+   def GetRawThermalData(self, RawData=None):
+      if RawData is None:
+         RawData = ExifToolPool.GetSharedPool(self.ExifToolPath).Execute(["-RawThermalImage", "-b", self.ImageName])
       ImageStream = BytesIO(RawData)
-      ImageData = numpy.array(Image.open(ImageStream))
+      return (numpy.array(Image.open(ImageStream)))
+
+   @FlirInstrumentation.InstrumentStage
+   def GetThermalData(self, PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, SwapBytes=True, RawData=None, DataType=numpy.float64):
+      #RawData can be the raw thermal image file data, or the already decoded raw thermal data array (or a part of it).
+      #DataType is the precision of the temperatures, numpy.float32 takes half the memory.
+      if isinstance(RawData, numpy.ndarray):
+         ImageData = RawData
+      else:
+         ImageData = self.GetRawThermalData(RawData)
       
       #For my C5 camera the Thermal Data is a png file in little endian format which needs to be fixed first by swapping
-      #the higher and the lower byte.
-      if ExifByteOrder.split("-")[0] == "Little":
-         ImageData = numpy.right_shift(ImageData, 8) + numpy.left_shift(numpy.bitwise_and(ImageData, 0x00FF), 8)
-      
-      # Convert to temperature from radiance with simplified formula, ignoring atmospheric influences
-      ReflectedRadiationFactor = PlanckR1 / (PlanckR2 * (numpy.exp(PlanckB / (RAT + 273.15)) - PlanckF)) - PlanckO
-      ObjectRadiation =  (ImageData - (1 - Emissivity) * ReflectedRadiationFactor) / Emissivity 
-      TemperatureData = PlanckB / numpy.log(PlanckR1 / (PlanckR2 * (ObjectRadiation + PlanckO)) + PlanckF) - 273.15
+      #the higher and the lower byte (SwapBytes). The swap is part of the lookup table, so the png data is used as it is.
+
+      # Convert to temperature from radiance with simplified formula, ignoring atmospheric influences. The formula is
+      # calculated once per possible raw value for these calibration values (See FlirTemperatureConversion.py).
+      TemperatureData = FlirTemperatureConversion.ConvertRawToTemperature(ImageData, PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, SwapBytes, DataType)
       return (TemperatureData)
    
-   def GetPictureData(self):
-      RawData = subprocess.check_output([self.ExifToolPath, "-EmbeddedImage", "-b", self.ImageName])
+   @FlirInstrumentation.InstrumentStage
+   def GetPictureData(self, RawData=None):
+      if RawData is None:
+         RawData = ExifToolPool.GetSharedPool(self.ExifToolPath).Execute(["-EmbeddedImage", "-b", self.ImageName])
       ImageStream = BytesIO(RawData)
       ImageData = numpy.array(Image.open(ImageStream))
       return (ImageData)
 
-   def SaveThermalImage(self, ImageData, Name):
-      MyImage = Image.fromarray(cm.plasma(ImageData, bytes=True))
-      # convert to jpeg and enhance
-      MyImage = MyImage.convert("RGB")
-      MyImage = ImageEnhance.Sharpness(MyImage).enhance(3)
-      MyImage.save(Name, "jpeg", quality=100)
+   @FlirInstrumentation.InstrumentStage
+   def SaveThermalImage(self, ImageData, Name, MinTemperature=None, MaxTemperature=None):
+      #The temperatures (or the output of RescaleImageColorMap()) are quantized once into the plasma palette, from
+      #the minimum to the maximum of the data unless given (See FlirThermalRenderer.py), then sharpened and saved.
+      FlirThermalRenderer.SaveThermalImage(ImageData, Name, MinTemperature, MaxTemperature, Palette='plasma', Sharpness=3, Quality=100)
 
+   @FlirInstrumentation.InstrumentStage
    def SaveImage(self, ImageData, Name):
       MyImage = Image.fromarray(ImageData)          
       MyImage.save(Name, "jpeg", quality=100)
    
+   @FlirInstrumentation.InstrumentStage
    def RescaleImageColorMap(self, ImageArray):
-      NormalizedImage = (ImageArray - numpy.amin(ImageArray)) / (numpy.amax(ImageArray) - numpy.amin(ImageArray))
+      Minimum = numpy.amin(ImageArray)
+      NormalizedImage = (ImageArray - Minimum) / (numpy.amax(ImageArray) - Minimum)
       return(NormalizedImage)
 
    def GetMinMaxTemperatureAndLocation(self):
-      MinLocationY,MinLocationX=numpy.where(self.FlirObject['ThermalData'] == numpy.amin(self.FlirObject['ThermalData']))
-      MaxLocationY,MaxLocationX=numpy.where(self.FlirObject['ThermalData'] == numpy.amax(self.FlirObject['ThermalData']))
-      MinTemperature=self.FlirObject['ThermalData'][MinLocationY,MinLocationX][0]
-      MaxTemperature=self.FlirObject['ThermalData'][MaxLocationY,MaxLocationX][0]
-      MinLocationX=4*MinLocationX[0]
-      MinLocationY=4*MinLocationY[0]
-      MaxLocationX=4*MaxLocationX[0]
-      MaxLocationY=4*MaxLocationY[0]
+      #argmin() and argmax() give the first location of the minimum and maximum in one pass each
+      ThermalData = self.FlirObject['ThermalData']
+      MinLocationY,MinLocationX=numpy.unravel_index(numpy.argmin(ThermalData), ThermalData.shape)
+      MaxLocationY,MaxLocationX=numpy.unravel_index(numpy.argmax(ThermalData), ThermalData.shape)
+      MinTemperature=ThermalData[MinLocationY,MinLocationX]
+      MaxTemperature=ThermalData[MaxLocationY,MaxLocationX]
+      MinLocationX=4*MinLocationX
+      MinLocationY=4*MinLocationY
+      MaxLocationX=4*MaxLocationX
+      MaxLocationY=4*MaxLocationY
       MinLocation=(MinLocationX,MinLocationY)
       MaxLocation=(MaxLocationX,MaxLocationY)
       return (MinTemperature, MaxTemperature, MinLocation, MaxLocation)
 
-   def SelectionBoxMouseClickCallback(self, eclick, erelease):
-      #'eclick and erelease are the press and release events'
-      if eclick.xdata < 640.0 and erelease.xdata<640.0 and eclick.ydata < 480.0 and erelease.ydata<480.0:
-         #print(eclick)
-         NewDict = dict()
-         NewDict['X1'] = eclick.xdata
-         NewDict['X2'] = erelease.xdata
-         NewDict['Y1'] = eclick.ydata
-         NewDict['Y2'] = erelease.ydata
-         self.CurrentSelectionBox = NewDict
-       
-   def ProcessKeyPresses(self, event):
-      if event.key in ['A', 'a'] and self.MyToggleSelectorRS.active:
-          self.CreateAverageTemperatureBox()
-      if event.key in ['T', 't'] and self.MyToggleSelectorRS.active:
-          self.AddOverlayBox()
-      if event.key in ['H', 'h'] and self.MyToggleSelectorRS.active:
-          self.AddAverageThresholdedBox()
-      
-   def AddMeasurementPointMouseClickCallback(self, event):
-      X1, Y1, Button = event.xdata, event.ydata, event.button
-      if X1 > 1.0 and Y1 > 1.0:
-         NewDict = dict()
-         NewDict['X'] = X1
-         NewDict['Y'] = Y1
-         NewDict['HostAxes'] = event.inaxes
-         AxesFound = False
-         #First checking the overlays if the mouseclick was in one of the overlays, if not it must be on the main image axes.
-         for overlay in self.OverlayBoxes:
-            if NewDict['HostAxes'] == overlay['OverlayAxes']:
-               NewTemperature=overlay['TemperatureArray'][int(Y1/4),int(X1/4)]
-               AxesFound = True
-         if not AxesFound:
-            NewTemperature=self.FlirObject['ThermalData'][int(Y1/4),int(X1/4)]
-         NewDict['Temperature'] = NewTemperature
-         if Button == 1:
-            self.MeasurementPoints.append(NewDict)
-            self.PlotMeasurementMarker(NewDict)
-         else:
-            #Middle Or Right Button was pressed, set this temperature as Thresholding Temperature
-            self.ThresholdTemperature = NewTemperature
-   
+   def GetRegionTemperatures(self, Rows, Columns, Writable=False):
+      #The temperatures of a part of the thermal data, Rows and Columns are slices of the original temperaturemap.
+      #Normally this is a view on the thermal data, a copy when the caller wants to change it (Writable). In
+      #CompactMode only this part of the raw data is converted, so the result is always a new (32 bit) array.
+      if self.CompactMode:
+         return (self.GetThermalData(*self.GetCalibrationValues(), RawData=self.FlirObject['RawThermalData'][Rows,Columns], DataType=numpy.float32))
+      TemperatureArray = self.FlirObject['ThermalData'][Rows,Columns]
+      if Writable:
+         return (TemperatureArray.copy())
+      return (TemperatureArray)
+
+   def GetHotspots(self, Temperature=None, AboveAmbient=None, MinimumArea=1, TopK=None):
+      #The connected regions above a threshold temperature, hottest first (See FlirHotspots.py). The threshold is
+      #Temperature, or AboveAmbient degrees above the AtmosphericTemperature, or else self.ThresholdTemperature.
+      #Returns a list of dictionaries with the 'Area' in thermal pixels, 'AverageTemperature', 'StandardDeviation',
+      #'MaxTemperature', 'MaxLocation' and 'Centroid' in pixels of the (upscaled) image, and the bounding 'Box',
+      #which gives the pixels of the region when passed to GetBoxTemperatureArray() or GetBoxesStatistics().
+      ThresholdTemperature = FlirHotspots.GetThresholdTemperature(self.FlirObject['MetaData'], Temperature, AboveAmbient, self.ThresholdTemperature)
+      Regions = FlirHotspots.DetectHotspots(self.FlirObject['ThermalData'], ThresholdTemperature, MinimumArea, TopK)
+      Hotspots = []
+      for Index in range(len(Regions['Area'])):
+         Hotspot = dict()
+         Hotspot['Area'] = Regions['Area'][Index]
+         Hotspot['AverageTemperature'] = Regions['Mean'][Index]
+         Hotspot['StandardDeviation'] = Regions['Std'][Index]
+         Hotspot['MaxTemperature'] = Regions['Max'][Index]
+         Hotspot['MaxLocation'] = (4*Regions['MaxColumn'][Index], 4*Regions['MaxRow'][Index])
+         Hotspot['Centroid'] = (4*Regions['CentroidColumn'][Index], 4*Regions['CentroidRow'][Index])
+         #Boxes are scaled down as int(X1/4)-1:int(X2/4), so the first row and column are 4 pixels further
+         Hotspot['Box'] = dict(X1=4*(Regions['Column1'][Index]+1), Y1=4*(Regions['Row1'][Index]+1), X2=4*Regions['Column2'][Index], Y2=4*Regions['Row2'][Index])
+         Hotspots.append(Hotspot)
+      return (Hotspots)
+
+   def GetPointTemperature(self, X, Y):
+      #The temperature at a pixel of the (upscaled) image, like a marker click in the window, None outside the image
+      Height, Width = self.FlirObject['RawThermalData'].shape
+      if not (0 <= Y < 4*Height and 0 <= X < 4*Width):
+         return (None)
+      return (self.GetRegionTemperatures(slice(int(Y/4), int(Y/4)+1), slice(int(X/4), int(X/4)+1))[0,0])
+
+   def GetBoxTemperatureArray(self, Box, Writable=False):
+      #Scale the box Down to the original temperaturemap size
+      NewX1 = int(Box['X1']/4)
+      NewY1 = int(Box['Y1']/4)
+      NewX2 = int(Box['X2']/4)
+      NewY2 = int(Box['Y2']/4)
+      return (self.GetRegionTemperatures(slice(NewY1-1,NewY2), slice(NewX1-1,NewX2), Writable))
+
+   @CompactLazyAttribute
+   @FlirInstrumentation.InstrumentStage
+   def RegionStatistics(self):
+      #Summed area tables of the thermal data, all box statistics are taken from these (See FlirRegionStatistics.py)
+      return (FlirRegionStatistics.RegionStatistics(self.FlirObject['ThermalData']))
+
+   def GetBoxesStatistics(self, Boxes, ThresholdTemperature=None):
+      #Returns the 'Count', 'Sum', 'Mean' and 'Std' arrays of the temperatures in a list of boxes, when a threshold
+      #temperature is passed only the temperatures above it are used.
+      #The boxes are scaled Down to the original temperaturemap size, the same way as GetBoxTemperatureArray() does.
+      NewX1 = numpy.array([Box['X1'] for Box in Boxes], dtype=numpy.float64) / 4
+      NewY1 = numpy.array([Box['Y1'] for Box in Boxes], dtype=numpy.float64) / 4
+      NewX2 = numpy.array([Box['X2'] for Box in Boxes], dtype=numpy.float64) / 4
+      NewY2 = numpy.array([Box['Y2'] for Box in Boxes], dtype=numpy.float64) / 4
+      return (self.RegionStatistics.GetBoxStatistics(NewY1.astype(numpy.int64)-1, NewY2.astype(numpy.int64), NewX1.astype(numpy.int64)-1, NewX2.astype(numpy.int64), ThresholdTemperature))
+
+   def GetAverageTemperature(self, Box):
+      Statistics = self.GetBoxesStatistics([Box])
+      return (Statistics['Mean'][0], Statistics['Count'][0])
+
+   def GetThresholdedAverageTemperature(self, Box, ThresholdTemperature):
+      #Only the temperatures above the threshold are taken into account, returns None when there are none.
+      Statistics = self.GetBoxesStatistics([Box], ThresholdTemperature)
+      if Statistics['Count'][0] == 0:
+         return (None, 0)
+      return (Statistics['Mean'][0], Statistics['Count'][0])
+
    def GetMarkerTextCoordinates(self, X,Y):
       if X > 600:
          TextX = X-43
@@ -251,276 +478,139 @@ class FLIRImage:
          TextY = Y+3
       return(TextX,TextY)
    
-   def PlotMeasurementMarker(self, Marker):
-      X1 = Marker['X']
-      Y1 = Marker['Y']
-      Temperature = Marker['Temperature']
-      AxesToUse = Marker['HostAxes']
-      AxesToUse.scatter([X1-1], [Y1-1], marker='+', s=40, facecolors='white', edgecolors='white')
-      AxesToUse.scatter([X1-1], [Y1-1], marker='o', s=50, facecolors='none', edgecolors='white')
-      TextX, TextY = self.GetMarkerTextCoordinates(X1, Y1)
-      AxesToUse.text(TextX, TextY, round(Temperature,1).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white')
-      self.Figure.canvas.draw_idle()
-           
-   def LowerSliderUpdate(self, val):
-      self.MinTemp = val
-      self.ThermalMin = val
-      self.PlotImages()
-
-   def UpperSliderUpdate(self, val):
-      self.MaxTemp = val
-      self.ThermalMax = val
-      self.PlotImages()
-
-   def CreateFigure(self):
-      widths = [1.0]
-      heights = [1.2, 8, 0.25, 0.25, 0.25, 0.9]
-      MySpec = dict(width_ratios=widths, height_ratios=heights)
-      MySpec.update(wspace=0.1, hspace=0.1) # set the spacing between axes.
-      self.Figure, self.PlotList = plot.subplots(nrows=6, ncols=1, gridspec_kw=MySpec, figsize=(10,10), frameon = False)
-      self.PlotList[0].get_xaxis().set_visible(False)
-      self.PlotList[0].get_yaxis().set_visible(False)
-      self.PlotList[0].axis('off')
-      self.colorbaraxes = inset_axes(self.PlotList[1], width="2%", height="80%", loc="center left") 
-      self.PlotList[1].set_title("FLIR Image Data")
-      self.PlotList[1].get_xaxis().set_visible(False)
-      self.PlotList[1].get_yaxis().set_visible(False)
-      self.PlotList[1].axis('off')
-      self.PlotList[2].get_xaxis().set_visible(False)
-      self.PlotList[2].get_yaxis().set_visible(False)
-      self.PlotList[2].axis('off')
-      self.PlotList[3].get_xaxis().set_visible(False)
-      self.PlotList[3].get_yaxis().set_visible(False)
-      self.PlotList[3].axis('off')
-      self.PlotList[4].get_xaxis().set_visible(False)
-      self.PlotList[4].get_yaxis().set_visible(False)
-      self.PlotList[4].axis('off')
-      self.PlotList[5].get_xaxis().set_visible(False)
-      self.PlotList[5].get_yaxis().set_visible(False)
-      self.PlotList[5].axis('off')
-      self.ShowImageInfo()
-      
-   def ShowImageInfo(self):
-      InfoString=self.FlirObject['MetaData']['Make'].__str__()+", "+self.FlirObject['MetaData']['CameraModel'].__str__()
-      InfoString=InfoString+", SN:"+self.FlirObject['MetaData']['CameraSerialNumber'].__str__()+", Camera SW Version="+self.FlirObject['MetaData']['CameraSoftware'].__str__()+"\n"
-      InfoString=InfoString+"Camera Temperature Range: Min="+self.FlirObject['MetaData']['CameraTemperatureRangeMin'].__str__()+", Max="+self.FlirObject['MetaData']['CameraTemperatureRangeMax'].__str__()+"\n"
-      DateInfoString=self.FlirObject['MetaData']['DateTimeOriginal'].__str__()
-      DateString=datetime.datetime.strptime(DateInfoString.split(" ")[0], '%Y:%m:%d').strftime('%A, %B %d in the year %Y')
-      FotoCreationString=DateString+" @ "+DateInfoString.split(" ")[1]+" UTC"
-      InfoString=InfoString+"Foto Creation: "+FotoCreationString+"\n\n"
-      InfoString=InfoString+"Emissivity="+self.FlirObject['MetaData']['Emissivity'].__str__()+", Reflected Apparent Temperature="+self.FlirObject['MetaData']['ReflectedApparentTemperature'].__str__()+"\n"
-      InfoString=InfoString+"Atmospheric Temperature="+self.FlirObject['MetaData']['AtmosphericTemperature'].__str__()+", Relative Humidity="+self.FlirObject['MetaData']['RelativeHumidity'].__str__()+"\n"
-      InfoString=InfoString+"Object Distance="+self.FlirObject['MetaData']['ObjectDistance'].__str__()+", Focus Distance="+self.FlirObject['MetaData']['FocusDistance'].__str__()+", Focal Length="+self.FlirObject['MetaData']['FocalLength'].__str__()+"\n"
-      self.PlotList[0].text(0.02,0.01,InfoString, fontsize=10, fontweight='bold', color='black')
-
-   def PlotMinMaxMarkers(self):
-      MinTemperature, MaxTemperature, MinLocation, MaxLocation = self.GetMinMaxTemperatureAndLocation()
-      X1, Y1 = MinLocation
-      X2, Y2 = MaxLocation
-      self.PlotList[1].scatter([X1], [Y1], marker='v', s=25, facecolors='none', edgecolors='b')
-      self.PlotList[1].scatter([X2], [Y2], marker='^', s=25, facecolors='none', edgecolors='r')
-      TextX, TextY = self.GetMarkerTextCoordinates(X1, Y1)
-      self.PlotList[1].text(TextX, TextY, round(MinTemperature,2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white')
-      TextX, TextY = self.GetMarkerTextCoordinates(X2, Y2)
-      self.PlotList[1].text(TextX, TextY, round(MaxTemperature,2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white')
-
-   def PlotImages(self):
-      self.PlotList[1].clear()
-      self.colorbaraxes.clear()
-      self.RGBRef=self.PlotList[1].imshow(self.NewRGBImage)
-      self.ThermalRef=self.PlotList[1].imshow(self.NewThermalImage, vmin=self.ThermalMin, vmax=self.ThermalMax, cmap=cm.plasma, interpolation='nearest', alpha=0.8)
-      self.ColorBarRef=self.Figure.colorbar(self.ThermalRef, cax=self.colorbaraxes, orientation='vertical')
-      self.ColorBarRef.set_ticks([])
-      self.PlotList[1].text(7, 38, round(self.MaxTemp,2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=10, fontweight='bold', color='white')
-      self.PlotList[1].text(7, 448, round(self.MinTemp,2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=10, fontweight='bold', color='white')
-      self.DrawTemperatureOverlays()
-      self.DrawThresholdedAverageMeasurementBoxes()
-      if self.ShowMinMaxTemperature:
-         self.PlotMinMaxMarkers()
-      for Marker in self.MeasurementPoints:
-         self.PlotMeasurementMarker(Marker)
-      self.PlotAverageMeasurementBoxes()
-      self.Figure.canvas.draw()
-   
-   def ClearHelpInfoText(self):   
-         self.PlotList[5].clear()
-         self.PlotList[5].get_xaxis().set_visible(False)
-         self.PlotList[5].get_yaxis().set_visible(False)
-         self.PlotList[5].axis('off')
-         self.Figure.canvas.draw()
-         
-   def PressMeasurementMarkerButton(self,bla):
-      if self.MeasurementPointActive:
-         self.MeasurementPointActive=False           
-         self.Figure.canvas.mpl_disconnect(self.MeasurementPointMouseEventCallbackID)
-         self.ClearHelpInfoText()
-      else:
-         #When box selection is active, we disabled it first so only one function can be active at the same time
-         if self.MyToggleSelectorRS.active:
-            self.PressSelectionBoxButton(bla)
-         self.MeasurementPointActive=True
-         self.MeasurementPointMouseEventCallbackID = self.Figure.canvas.mpl_connect('button_press_event', self.AddMeasurementPointMouseClickCallback)
-         self.PlotList[5].text(0.01,0.07,self.MarkerHelpText)
-         self.Figure.canvas.draw()
-
-   def PressSelectionBoxButton(self,bla):
-      if self.MyToggleSelectorRS.active:
-         self.MyToggleSelectorRS.set_active(False)
-         self.ClearHelpInfoText()
-      else:
-         #When marker is active, we disabled it first so only one function can be active at the same time
-         if self.MeasurementPointActive:
-            self.PressMeasurementMarkerButton(bla)
-         self.MyToggleSelectorRS.set_active(True)
-         self.PlotList[5].text(0.01,0.07,self.SelectionBoxHelpText+round(self.ThresholdTemperature,2).__str__()+" C")
-         self.Figure.canvas.draw()
-      
-   def AddWidgets(self):
-      self.MyToggleSelectorRS = RectangleSelector(self.PlotList[1], self.SelectionBoxMouseClickCallback, drawtype='box', useblit=True, rectprops=dict(facecolor="white", alpha=0.1, fill=True), button=[1, 3], minspanx=5, minspany=5, spancoords='pixels', interactive=True)
-      self.MyToggleSelectorRS.set_active(False)
-      plot.connect('key_press_event', self.ProcessKeyPresses)
-      axcolor = 'lightgoldenrodyellow'
-      TenPercentTemperatureRange=0.1*(self.MaxTemp-self.MinTemp)
-      self.LowerColorBarSliderContainer = inset_axes(self.PlotList[2], width="60%", height="100%", loc="upper center") 
-      self.LowerColarBarSlider = Slider(self.LowerColorBarSliderContainer, 'LowerBound', round(self.MinTemp-TenPercentTemperatureRange,1), round(self.MaxTemp,1), valinit=round(self.MinTemp,1), valstep=0.1)
-      self.LowerColarBarSlider.on_changed(self.LowerSliderUpdate)
-      self.UpperColorBarSliderContainer = inset_axes(self.PlotList[3], width="60%", height="100%", loc="upper center") 
-      self.UpperColarBarSlider = Slider(self.UpperColorBarSliderContainer, 'UpperBound', round(self.MinTemp,1), round(self.MaxTemp+TenPercentTemperatureRange,1), valinit=round(self.MaxTemp,1), valstep=0.1)
-      self.UpperColarBarSlider.on_changed(self.UpperSliderUpdate)
-      self.MSButtonContainer = inset_axes(self.PlotList[4], width="25%", height="100%", loc="center left") 
-      self.MeasurementMarkerButton = Button(self.MSButtonContainer, 'Marker', color='0.85', hovercolor='0.95')
-      self.MeasurementMarkerButton.on_clicked(self.PressMeasurementMarkerButton)
-      self.SelectionBoxButtonContainer = inset_axes(self.PlotList[4], width="25%", height="100%", loc="center") 
-      self.SelectBoxButton = Button(self.SelectionBoxButtonContainer, 'SelectBox', color='0.85', hovercolor='0.95')
-      self.SelectBoxButton.on_clicked(self.PressSelectionBoxButton)
-      self.SaveImageButtonContainer = inset_axes(self.PlotList[4], width="25%", height="100%", loc="center right") 
-      self.SaveImageButton = Button(self.SaveImageButtonContainer, 'Save Image', color='0.85', hovercolor='0.95')
-      self.SaveImageButton.on_clicked(self.SaveFlattenedImage)
-      
-   def AddOverlayBox(self):
+   def MakeOverlayBoxData(self, Box, ThresholdTemperature=None):
+      #The data of a temperature overlay of a box, without the axes to show it, so it can be drawn in the window as
+      #well as by RenderFlattenedImage(). With a ThresholdTemperature the temperatures below it are set to 0.0 and
+      #the thresholded average temperature is added.
       OverlayDict = dict()
-      InsertX=((int(self.CurrentSelectionBox['X1'])-6)/640.0)
-      InsertY=1.0-((int(self.CurrentSelectionBox['Y2'])+3)/480.0)
-      OverlayDict['PixelWidth']=int(self.CurrentSelectionBox['X2']-self.CurrentSelectionBox['X1'])
-      OverlayDict['PixelHeight']=int(self.CurrentSelectionBox['Y2']-self.CurrentSelectionBox['Y1'])
-      InsertWidth=(OverlayDict['PixelWidth'])/640.0
-      InsertHeight=(OverlayDict['PixelHeight'])/480.0
-      OverlayDict['OverlayAxes'] = inset_axes(self.PlotList[1], width="100%", height="100%", loc='lower left', bbox_to_anchor=(InsertX, InsertY, InsertWidth, InsertHeight), bbox_transform=self.PlotList[1].transAxes)
-      OverlayDict['OverlayAxes'].get_xaxis().set_visible(False)
-      OverlayDict['OverlayAxes'].get_yaxis().set_visible(False)
-      OverlayDict['OverlayAxes'].axis('off')
-      ColorBarHightString = int(100*(OverlayDict['PixelHeight']-38)/OverlayDict['PixelHeight']).__str__()+"%"
-      ColorBarWidthString = int(1000/OverlayDict['PixelWidth']).__str__()+"%"
-      OverlayDict['OverlayColorBarAxes'] = inset_axes(OverlayDict['OverlayAxes'], width=ColorBarWidthString, height=ColorBarHightString, loc="center left") 
-
-      #First Scale Down to the original temperaturemap size
-      NewX1 = int(self.CurrentSelectionBox['X1']/4)
-      NewY1 = int(self.CurrentSelectionBox['Y1']/4)
-      NewX2 = int(self.CurrentSelectionBox['X2']/4)
-      NewY2 = int(self.CurrentSelectionBox['Y2']/4)
-      OverlayDict['TemperatureArray'] = self.FlirObject['ThermalData'][NewY1-1:NewY2,NewX1-1:NewX2]
-      OverlayDict['ThermalImage'] = numpy.array(Image.fromarray(OverlayDict['TemperatureArray']).resize((OverlayDict['PixelWidth'], OverlayDict['PixelHeight']), Image.ANTIALIAS))
-      OverlayDict['RGBImage'] = self.NewRGBImage[int(self.CurrentSelectionBox['Y1']-1):int(self.CurrentSelectionBox['Y2']),int(self.CurrentSelectionBox['X1']-1):int(self.CurrentSelectionBox['X2'])]
+      OverlayDict['Box'] = dict(Box)
+      OverlayDict['PixelWidth']=int(Box['X2']-Box['X1'])
+      OverlayDict['PixelHeight']=int(Box['Y2']-Box['Y1'])
+      if ThresholdTemperature is None:
+         OverlayDict['TemperatureArray'] = self.GetBoxTemperatureArray(Box)
+      else:
+         #The temperatures at or below the threshold are set to 0.0 in an own copy (nan stays nan, like multiplying
+         #with the mask did) without making a mask sized copy as well
+         OverlayDict['TemperatureArray'] = self.GetBoxTemperatureArray(Box, Writable=True)
+         OverlayDict['TemperatureArray'][OverlayDict['TemperatureArray'] <= ThresholdTemperature] = 0.0
+         AverageTemperature, NumberOfMeasurements = self.GetThresholdedAverageTemperature(Box, ThresholdTemperature)
+         OverlayDict['NumberOfMeasurements']=NumberOfMeasurements
+         if NumberOfMeasurements == 0:
+            AverageTemperature=float('nan')
+         OverlayDict['AverageTemperature']=round(AverageTemperature,2)
+      OverlayDict['ThermalImage'] = numpy.array(Image.fromarray(OverlayDict['TemperatureArray']).resize((OverlayDict['PixelWidth'], OverlayDict['PixelHeight']), Image.LANCZOS))
+      OverlayDict['RGBImage'] = self.NewRGBImage[int(Box['Y1']-1):int(Box['Y2']),int(Box['X1']-1):int(Box['X2'])]
+      if self.CompactMode:
+         #A view would keep the whole picture in memory
+         OverlayDict['RGBImage'] = OverlayDict['RGBImage'].copy()
       OverlayDict['ThermalMin'] = numpy.amin(OverlayDict['TemperatureArray'])
       OverlayDict['ThermalMax'] = numpy.amax(OverlayDict['TemperatureArray'])
-      self.OverlayBoxes.append(OverlayDict)
-      self.PlotImages()
+      return (OverlayDict)
 
-   def AddAverageThresholdedBox(self):
-      OverlayDict = dict()
-      InsertX=((int(self.CurrentSelectionBox['X1'])-6)/640.0)
-      InsertY=1.0-((int(self.CurrentSelectionBox['Y2'])+3)/480.0)
-      OverlayDict['PixelWidth']=int(self.CurrentSelectionBox['X2']-self.CurrentSelectionBox['X1'])
-      OverlayDict['PixelHeight']=int(self.CurrentSelectionBox['Y2']-self.CurrentSelectionBox['Y1'])
-      InsertWidth=(OverlayDict['PixelWidth'])/640.0
-      InsertHeight=(OverlayDict['PixelHeight'])/480.0
-      OverlayDict['OverlayAxes'] = inset_axes(self.PlotList[1], width="100%", height="100%", loc='lower left', bbox_to_anchor=(InsertX, InsertY, InsertWidth, InsertHeight), bbox_transform=self.PlotList[1].transAxes)
-      OverlayDict['OverlayAxes'].get_xaxis().set_visible(False)
-      OverlayDict['OverlayAxes'].get_yaxis().set_visible(False)
-      OverlayDict['OverlayAxes'].axis('off')
-      ColorBarHightString = int(100*(OverlayDict['PixelHeight']-38)/OverlayDict['PixelHeight']).__str__()+"%"
-      ColorBarWidthString = int(1000/OverlayDict['PixelWidth']).__str__()+"%"
-      OverlayDict['OverlayColorBarAxes'] = inset_axes(OverlayDict['OverlayAxes'], width=ColorBarWidthString, height=ColorBarHightString, loc="center left") 
-
-      #First Scale Down to the original temperaturemap size
-      NewX1 = int(self.CurrentSelectionBox['X1']/4)
-      NewY1 = int(self.CurrentSelectionBox['Y1']/4)
-      NewX2 = int(self.CurrentSelectionBox['X2']/4)
-      NewY2 = int(self.CurrentSelectionBox['Y2']/4)
-      OverlayDict['TemperatureArray'] = self.FlirObject['ThermalData'][NewY1-1:NewY2,NewX1-1:NewX2]
-      Mask=OverlayDict['TemperatureArray'] > self.ThresholdTemperature
-      MeasurementsArray=[]
-      OverlayDict['TemperatureArray']=OverlayDict['TemperatureArray'] * Mask
-      for row in OverlayDict['TemperatureArray']:
-         for measurement in row:
-            if measurement > 0.0:
-               MeasurementsArray.append(measurement)
-      NumberOfMeasurements=len(MeasurementsArray)
-      OverlayDict['NumberOfMeasurements']=NumberOfMeasurements
-      AverageTemperature=round((sum(MeasurementsArray)/NumberOfMeasurements),2)
-      OverlayDict['AverageTemperature']=AverageTemperature
-      OverlayDict['ThermalImage'] = numpy.array(Image.fromarray(OverlayDict['TemperatureArray']).resize((OverlayDict['PixelWidth'], OverlayDict['PixelHeight']), Image.ANTIALIAS))
-      OverlayDict['RGBImage'] = self.NewRGBImage[int(self.CurrentSelectionBox['Y1']-1):int(self.CurrentSelectionBox['Y2']),int(self.CurrentSelectionBox['X1']-1):int(self.CurrentSelectionBox['X2'])]
-      OverlayDict['ThermalMin'] = numpy.amin(OverlayDict['TemperatureArray'])
-      OverlayDict['ThermalMax'] = numpy.amax(OverlayDict['TemperatureArray'])
-      self.ThresholdedAverageMeasurementBoxes.append(OverlayDict)
-      self.PlotImages()
-
-   def DrawTemperatureOverlays(self):
-      for overlayDict in self.OverlayBoxes:
-         overlayDict['OverlayAxes'].clear()
-         overlayDict['OverlayColorBarAxes'].clear()
-         overlayDict['RGBRef']=overlayDict['OverlayAxes'].imshow(overlayDict['RGBImage'])
-         overlayDict['ThermalRef']=overlayDict['OverlayAxes'].imshow(overlayDict['ThermalImage'], vmin=overlayDict['ThermalMin'], vmax=overlayDict['ThermalMax'], cmap=cm.YlOrRd, interpolation='nearest', alpha=0.75)
-         overlayDict['ColorBarRef']=self.Figure.colorbar(overlayDict['ThermalRef'], cax=overlayDict['OverlayColorBarAxes'], orientation='vertical')
-         overlayDict['ColorBarRef'].set_ticks([])
-         overlayDict['OverlayAxes'].text(5, 12, round(overlayDict['ThermalMax'],2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white')
-         overlayDict['OverlayAxes'].text(5, overlayDict['PixelHeight']-8, round(overlayDict['ThermalMin'],2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white')
-
-   def DrawThresholdedAverageMeasurementBoxes(self):
-      for overlayDict in self.ThresholdedAverageMeasurementBoxes:
-         overlayDict['OverlayAxes'].clear()
-         overlayDict['OverlayColorBarAxes'].clear()
-         overlayDict['RGBRef']=overlayDict['OverlayAxes'].imshow(overlayDict['RGBImage'])
-         overlayDict['ThermalRef']=overlayDict['OverlayAxes'].imshow(overlayDict['ThermalImage'], vmin=overlayDict['ThermalMin'], vmax=overlayDict['ThermalMax'], cmap=cm.YlOrRd, interpolation='nearest', alpha=0.75)
-         overlayDict['ColorBarRef']=self.Figure.colorbar(overlayDict['ThermalRef'], cax=overlayDict['OverlayColorBarAxes'], orientation='vertical')
-         overlayDict['ColorBarRef'].set_ticks([])
-         overlayDict['OverlayAxes'].text(5, 12, round(overlayDict['ThermalMax'],2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white')
-         overlayDict['OverlayAxes'].text(5, overlayDict['PixelHeight']-8, round(overlayDict['ThermalMin'],2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white')
-         overlayDict['OverlayAxes'].text((overlayDict['PixelWidth'])/2-100, (overlayDict['PixelHeight'])/2, "Average Temperature = "+round(overlayDict['AverageTemperature'],2).__str__()+" C\nBased on "+overlayDict['NumberOfMeasurements'].__str__()+" Measurements.", bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white')
-     
-   def CreateAverageTemperatureBox(self):
-      self.AverageMeasurementBoxes.append(self.CurrentSelectionBox)
-      self.PlotImages()
-      
-   def PlotAverageMeasurementBoxes(self):
-      for box in self.AverageMeasurementBoxes:
-         #First Scale Down to the original temperaturemap size
-         NewX1 = int(box['X1']/4)
-         NewY1 = int(box['Y1']/4)
-         NewX2 = int(box['X2']/4)
-         NewY2 = int(box['Y2']/4)
-         NewTemperatureArray=self.FlirObject['ThermalData'][NewY1-1:NewY2,NewX1-1:NewX2]
-         TemperatureSamples=NewTemperatureArray.size
-         AverageTemperature=sum(sum(NewTemperatureArray))/TemperatureSamples
-         self.PlotList[1].text(((NewX1+NewX2)*2)-20, ((NewY1+NewY2)*2)+5, round(AverageTemperature,1).__str__(), fontsize=10, fontweight='bold', color='white')
-         RectangleFrame=patches.Rectangle((NewX1*4,NewY1*4),(NewX2-NewX1)*4,(NewY2-NewY1)*4,linewidth=3,edgecolor='black',facecolor='white', alpha=0.15)
-         self.PlotList[1].add_patch(RectangleFrame)
-         self.Figure.canvas.draw_idle()
-
-   def SaveFlattenedImage(self, bla):
-      extent = self.PlotList[1].get_window_extent().transformed(self.Figure.dpi_scale_trans.inverted())
-      self.Figure.savefig(self.ImageName.split('.')[0]+"Processed.png", bbox_inches=extent)
-
-   def ShowFigure(self):
-      plot.show()
+   @FlirInstrumentation.InstrumentStage
+   def RenderFlattenedImage(self):
+      #The image part of the window (the thermal image on the greyscale picture, the temperature overlays, average
+      #boxes, markers and texts) composed directly in an array, no figure is needed (See FlirCompositor.py).
+      #The items are stacked in the same order as matplotlib draws them: images, boxes, markers, texts and then the
+      #colorbar and overlay axes on top.
+      Composition = FlirCompositor.Compositor(self.NewRGBImage)
+      NewThermalImage = self.NewThermalImage
+      Composition.BlendImage(FlirThermalRenderer.RenderThermalImage(NewThermalImage, self.ThermalMin, self.ThermalMax, 'plasma'), 0, 0, 0.8*numpy.isfinite(NewThermalImage))
+      Texts = []
+      if self.AverageMeasurementBoxes:
+         AverageTemperatures = self.GetBoxesStatistics(self.AverageMeasurementBoxes)['Mean']
+         for box, AverageTemperature in zip(self.AverageMeasurementBoxes, AverageTemperatures):
+            NewX1 = int(box['X1']/4)
+            NewY1 = int(box['Y1']/4)
+            NewX2 = int(box['X2']/4)
+            NewY2 = int(box['Y2']/4)
+            Composition.FillRectangle(NewX1*4, NewY1*4, NewX2*4, NewY2*4, (255, 255, 255), 0.15)
+            Composition.DrawRectangle(NewX1*4, NewY1*4, NewX2*4, NewY2*4, (0, 0, 0), 0.15, LineWidth=3)
+            Texts.append((((NewX1+NewX2)*2)-20, ((NewY1+NewY2)*2)+5, round(AverageTemperature,1).__str__(), 10, None))
+      if self.ShowMinMaxTemperature:
+         MinTemperature, MaxTemperature, MinLocation, MaxLocation = self.GetMinMaxTemperatureAndLocation()
+         Composition.DrawMarker(MinLocation[0], MinLocation[1], 'v', 25, (0, 0, 255))
+         Composition.DrawMarker(MaxLocation[0], MaxLocation[1], '^', 25, (255, 0, 0))
+         Texts.append(self.GetMarkerTextCoordinates(*MinLocation) + (round(MinTemperature,2).__str__(), 8, 'grey'))
+         Texts.append(self.GetMarkerTextCoordinates(*MaxLocation) + (round(MaxTemperature,2).__str__(), 8, 'grey'))
+      OverlayMarkers = []
+      ImageAxes = self.PlotList[1] if hasattr(self, 'PlotList') else None
+      for Marker in self.MeasurementPoints:
+         if Marker.get('HostAxes') is not None and Marker['HostAxes'] is not ImageAxes:
+            #Clicked in an overlay, drawn with that overlay
+            OverlayMarkers.append(Marker)
+            continue
+         self.DrawFlattenedMeasurementMarker(Composition, Marker, 0, 0, Texts)
+      Texts.insert(0, (7, 38, round(self.MaxTemp,2).__str__(), 10, 'grey'))
+      Texts.insert(1, (7, 448, round(self.MinTemp,2).__str__(), 10, 'grey'))
+      self.DrawFlattenedTexts(Composition, Texts, 0, 0)
+      #The colorbar axes is 2% x 80% of the image, at the center left with a border of half the font size
+      Border = 5*Composition.PixelsPerPoint
+      Composition.DrawColorBar(Border, 0.1*Composition.Height, Border+0.02*Composition.Width, 0.9*Composition.Height, FlirThermalRenderer.GetPalette('plasma')[:-1], 0.8)
+      for OverlayDict in self.OverlayBoxes + self.ThresholdedAverageMeasurementBoxes:
+         self.DrawFlattenedOverlay(Composition, OverlayDict, OverlayMarkers)
+      return (Composition.GetImage())
+
+   def DrawFlattenedOverlay(self, Composition, OverlayDict, OverlayMarkers):
+      #The overlay axes are anchored 6 pixels left of and 3 pixels below the box, inside that anchor inset_axes()
+      #keeps a border of half the font size, like in the window
+      Border = 5*Composition.PixelsPerPoint
+      Left = int(OverlayDict['Box']['X1'])-6+Border
+      Top = int(OverlayDict['Box']['Y2'])+3-OverlayDict['PixelHeight']-Border
+      Composition.BlendImage(OverlayDict['RGBImage'][:OverlayDict['PixelHeight'], :OverlayDict['PixelWidth']], Left, Top)
+      ThermalImage = FlirThermalRenderer.RenderThermalImage(OverlayDict['ThermalImage'], OverlayDict['ThermalMin'], OverlayDict['ThermalMax'], 'YlOrRd')
+      Composition.BlendImage(ThermalImage, Left, Top, 0.75*numpy.isfinite(OverlayDict['ThermalImage']))
+      Texts = [(5, 12, round(OverlayDict['ThermalMax'],2).__str__(), 8, 'grey'), (5, OverlayDict['PixelHeight']-8, round(OverlayDict['ThermalMin'],2).__str__(), 8, 'grey')]
+      if 'AverageTemperature' in OverlayDict:
+         Texts.append(((OverlayDict['PixelWidth'])/2-100, (OverlayDict['PixelHeight'])/2, "Average Temperature = "+round(OverlayDict['AverageTemperature'],2).__str__()+" C\nBased on "+OverlayDict['NumberOfMeasurements'].__str__()+" Measurements.", 8, 'grey'))
+      for Marker in OverlayMarkers:
+         if Marker['HostAxes'] is OverlayDict.get('OverlayAxes'):
+            self.DrawFlattenedMeasurementMarker(Composition, Marker, Left, Top, Texts)
+      self.DrawFlattenedTexts(Composition, Texts, Left, Top)
+      #The colorbar of the overlay is about 10 pixels wide and 38 pixels shorter than the overlay
+      BarWidth = int(1000/OverlayDict['PixelWidth'])/100.0*OverlayDict['PixelWidth']
+      BarHeight = int(100*(OverlayDict['PixelHeight']-38)/OverlayDict['PixelHeight'])/100.0*OverlayDict['PixelHeight']
+      BarTop = Top+(OverlayDict['PixelHeight']-BarHeight)/2
+      Composition.DrawColorBar(Left+Border, BarTop, Left+Border+BarWidth, BarTop+BarHeight, FlirThermalRenderer.GetPalette('YlOrRd')[:-1], 0.75)
+
+   def DrawFlattenedMeasurementMarker(self, Composition, Marker, Left, Top, Texts):
+      X1 = Marker['X']
+      Y1 = Marker['Y']
+      Composition.DrawMarker(Left+X1-1, Top+Y1-1, '+', 40, (255, 255, 255))
+      Composition.DrawMarker(Left+X1-1, Top+Y1-1, 'o', 50, (255, 255, 255))
+      Texts.append(self.GetMarkerTextCoordinates(X1, Y1) + (round(Marker['Temperature'],1).__str__(), 8, 'grey'))
+
+   def DrawFlattenedTexts(self, Composition, Texts, Left, Top):
+      #Texts are (X, Y, Text, FontSize, BoxColor) in coordinates of the axes they belong to
+      for X, Y, Text, FontSize, BoxColor in Texts:
+         if BoxColor is None:
+            Composition.DrawText(Left+X, Top+Y, Text, FontSize)
+         else:
+            Composition.DrawText(Left+X, Top+Y, Text, FontSize, BoxColor=(128, 128, 128), BoxAlpha=0.35)
+
+   @FlirInstrumentation.InstrumentStage
+   def SaveProcessedImage(self, FileName=None):
+      #Saves the image made by RenderFlattenedImage(), by default as <Image Name>Processed.png
+      #The image has the size of the upscaled thermal image (640x480), before V0.13 the 698x524 figure area was saved
+      if FileName is None:
+         FileName = os.path.splitext(self.ImageName)[0]+"Processed.png"
+      Image.fromarray(self.RenderFlattenedImage()).save(FileName)
+      return (FileName)
 
 ##############################################################################################################
-# Main Application
+# Function Definitions
 ##############################################################################################################
-MyFlirImage = FLIRImage("FLIR0356.jpg")
-MyFlirImage.CreateFigure()
-MyFlirImage.PlotImages()
-MyFlirImage.AddWidgets()
-MyFlirImage.ShowFigure()
+def __getattr__(Name):
+   #FlirImageProcessor.FLIRImageViewer imports the window module the first time it is used (python 3.7 and later)
+   if Name == "FLIRImageViewer":
+      import FlirImageViewer
+      return (FlirImageViewer.FLIRImageViewer)
+   raise AttributeError("module "+__name__.__repr__()+" has no attribute "+Name.__repr__())
 
+##############################################################################################################
+# Main Application
+##############################################################################################################
+if __name__ == "__main__":
+   #The window is in FlirImageViewer.py, it is only imported here
+   import FlirImageViewer
+   sys.exit(FlirImageViewer.Main())
@@ -0,0 +1,482 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirImageViewer.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation, the window of FlirImageProcessor.py moved to its own module
+# V0.2 : Markers, boxes and overlays are kept as one cached layer, slider moves only redraw what changes
+##############################################################################################################
+#
+# This Script contains the interactive window to analyse a FLIR Jpeg image. The class FLIRImageViewer is a
+# FLIRImage (See FlirImageProcessor.py) with the matplotlib figure, widgets and callbacks added, it takes the same
+# parameters. Only this module imports matplotlib, so scripts and worker processes that use FLIRImage do not pay
+# for importing it.
+#
+# Run it as script to open the window for an image:
+#   python FlirImageViewer.py FLIR0356.jpg
+# or use it from python:
+#   MyFlirImage = FLIRImageViewer("FLIR0356.jpg")
+#   MyFlirImage.CreateFigure()
+#   MyFlirImage.PlotImages()
+#   MyFlirImage.AddWidgets()
+#   MyFlirImage.ShowFigure()
+#
+# In the top of the window some information is shown about the camera and it's settings used to create the
+# foto, as well as some information about the foto.
+#
+# The camera image is shown with the colormap ranging from the minimum to the maximum temperature found in the
+# image thermal image data.
+#
+# Below the image there are 2 slider bars, they can be used to change the minimum temperature and the maximum
+# temperature of the colormap used to display the image.
+# They can be used to saturate in the lower and / or higher temperatures, so more colors are available for a 
+# smaller temperature range and details become visible.
+#
+# Below the Sliderbars are 3 buttons;
+# - The first one is Marker, once pressed, every mouse click in the image will draw a marker and the temperature 
+#   of that location. This will continue untill the Marker Button is pressed again.
+#   When the right mouse button is used i.s.o. the left one, no marker is drawn, but the temperature of the pixel
+#   clicked on will be set as the thresholding temperature for the select box option.
+# - The second button is Select Box, once pressed a selection box can be drawn with the mouse, once a box is drawn
+#   the box can be used for 2 functionalities:
+#   1) Draw Box and calculate and show the average temperature inside the box
+#   2) Create a new colormap of the temperature range inside the box and draw an image overlay of the box with
+#      the new colormap. This is usefull to show details in an image without saturating the rest of the image.
+#   These two functionalities can be selected by means of pressing the appropriate key once the box is selected:
+#   - a or A for average temperature box
+#   - t or T for a new Temperature Overlay in the box.
+#   - h or H for a new Thresholded Temperature overlay box with calculated average temperature. 
+#     (All temperatures below threshold are set to 0.0)
+#   Selecting boxes will continue untill the Select Box Button is pressed again.
+# - The Third button is to save a processed image of the layers shown in the image section of the window.
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import sys
+import argparse
+import datetime
+import numpy
+import matplotlib.pyplot as plot
+import matplotlib.patches as patches
+from matplotlib import cm
+from mpl_toolkits.axes_grid1.inset_locator import inset_axes
+from matplotlib.widgets import RectangleSelector, Cursor, Slider, Button
+from matplotlib.backend_bases import TimerBase
+import FlirInstrumentation
+from FlirImageProcessor import FLIRImage
+
+##############################################################################################################
+# Class Definitions
+##############################################################################################################
+class FLIRImageViewer(FLIRImage):
+   def __init__(self, ImageName, **Options):
+      FLIRImage.__init__(self, ImageName, **Options)
+      self.MeasurementPointActive=False
+      self.SelectionBoxHelpText="SelectionBox Active, actions for Selection Box  once drawn are:\nPress the T or t to Scale the colormap to the temperatures present in the selection Box.\nPress the A or a to Calculate the average temperature present in the selection Box.\nPress the H or h to Calculate the Average Temperature afther Thresholding the Selection Box with "
+      self.MarkerHelpText="Temperature Markers Active, Markers will appear where you click with the mouse in the foto.\nRight Click will not create a marker but will set that temperature as thresholding temperature."
+
+   def SelectionBoxMouseClickCallback(self, eclick, erelease):
+      #'eclick and erelease are the press and release events'
+      if eclick.xdata < 640.0 and erelease.xdata<640.0 and eclick.ydata < 480.0 and erelease.ydata<480.0:
+         #print(eclick)
+         NewDict = dict()
+         NewDict['X1'] = eclick.xdata
+         NewDict['X2'] = erelease.xdata
+         NewDict['Y1'] = eclick.ydata
+         NewDict['Y2'] = erelease.ydata
+         self.CurrentSelectionBox = NewDict
+       
+   def ProcessKeyPresses(self, event):
+      if event.key in ['A', 'a'] and self.MyToggleSelectorRS.active:
+          self.CreateAverageTemperatureBox()
+      if event.key in ['T', 't'] and self.MyToggleSelectorRS.active:
+          self.AddOverlayBox()
+      if event.key in ['H', 'h'] and self.MyToggleSelectorRS.active:
+          self.AddAverageThresholdedBox()
+      
+   def AddMeasurementPointMouseClickCallback(self, event):
+      X1, Y1, Button = event.xdata, event.ydata, event.button
+      if X1 > 1.0 and Y1 > 1.0:
+         NewDict = dict()
+         NewDict['X'] = X1
+         NewDict['Y'] = Y1
+         NewDict['HostAxes'] = event.inaxes
+         AxesFound = False
+         #First checking the overlays if the mouseclick was in one of the overlays, if not it must be on the main image axes.
+         for overlay in self.OverlayBoxes:
+            if NewDict['HostAxes'] == overlay['OverlayAxes']:
+               NewTemperature=overlay['TemperatureArray'][int(Y1/4),int(X1/4)]
+               AxesFound = True
+         if not AxesFound:
+            NewTemperature=self.FlirObject['ThermalData'][int(Y1/4),int(X1/4)]
+         NewDict['Temperature'] = NewTemperature
+         if Button == 1:
+            self.MeasurementPoints.append(NewDict)
+            self.PlotMeasurementMarker(NewDict)
+         else:
+            #Middle Or Right Button was pressed, set this temperature as Thresholding Temperature
+            self.ThresholdTemperature = NewTemperature
+   
+   def PlotMeasurementMarker(self, Marker):
+      X1 = Marker['X']
+      Y1 = Marker['Y']
+      Temperature = Marker['Temperature']
+      AxesToUse = Marker['HostAxes']
+      self.AddAnnotation(AxesToUse.scatter([X1-1], [Y1-1], marker='+', s=40, facecolors='white', edgecolors='white'))
+      self.AddAnnotation(AxesToUse.scatter([X1-1], [Y1-1], marker='o', s=50, facecolors='none', edgecolors='white'))
+      TextX, TextY = self.GetMarkerTextCoordinates(X1, Y1)
+      self.AddAnnotation(AxesToUse.text(TextX, TextY, round(Temperature,1).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white'))
+      self.Figure.canvas.draw_idle()
+           
+   def LowerSliderUpdate(self, val):
+      self.MinTemp = val
+      self.ThermalMin = val
+      self.ScheduleColorMapUpdate()
+
+   def UpperSliderUpdate(self, val):
+      self.MaxTemp = val
+      self.ThermalMax = val
+      self.ScheduleColorMapUpdate()
+
+   def ScheduleColorMapUpdate(self):
+      #Slider events come in bursts while dragging, they are collected and handled at most once per timer interval.
+      #Non interactive backends have no working timer, there the update is done right away.
+      if type(self.ColorMapUpdateTimer) is TimerBase:
+         self.UpdateColorMap()
+      elif not self.ColorMapUpdatePending:
+         self.ColorMapUpdatePending = True
+         self.ColorMapUpdateTimer.start()
+
+   def UpdateColorMap(self):
+      #Only the color limits and the min/max texts change, the artists made by PlotImages() are reused.
+      self.ColorMapUpdatePending = False
+      self.ThermalRef.set_clim(self.ThermalMin, self.ThermalMax)
+      self.MaxTempTextRef.set_text(round(self.MaxTemp,2).__str__())
+      self.MinTempTextRef.set_text(round(self.MinTemp,2).__str__())
+      if self.Background is None:
+         self.Figure.canvas.draw_idle()
+         return
+      #Restore everything that does not change and only draw the thermal image, the annotation layer, the min/max
+      #texts, the colorbar and the sliders on top.
+      self.Figure.canvas.restore_region(self.Background)
+      self.DrawAnimatedArtists()
+      self.Figure.canvas.blit(self.Figure.bbox)
+
+   def SetAnimated(self, Artist):
+      #Animated artists are left out of a normal draw of the figure, they are drawn on top of the stored background
+      #(blitting) so a slider move does not redraw the whole window. Only possible when the backend supports blitting.
+      if self.Figure.canvas.supports_blit:
+         Artist.set_animated(True)
+      return (Artist)
+
+   def AnimateAxes(self, Axes):
+      if self.Figure.canvas.supports_blit:
+         self.SetAnimated(Axes)
+         self.AnimatedAxes.append(Axes)
+
+   def AddAnnotation(self, Artist):
+      #Markers, texts and boxes on the image are drawn above the thermal image but do not change with the sliders.
+      #They are drawn once into the annotation layer (See CaptureBackground()), so a slider move costs the same no
+      #matter how many there are. Annotations in an overlay are drawn with the overlay axes.
+      if Artist.axes is self.PlotList[1]:
+         self.SetAnimated(Artist)
+         self.AnnotationArtists.append(Artist)
+      return (Artist)
+
+   def GetAnnotationArtists(self):
+      #In the order the axes would draw them, then the overlays on top
+      Artists = sorted(self.AnnotationArtists, key=lambda Artist: Artist.get_zorder())
+      for OverlayDict in self.OverlayBoxes + self.ThresholdedAverageMeasurementBoxes:
+         Artists.append(OverlayDict['OverlayAxes'])
+         Artists.append(OverlayDict['OverlayColorBarAxes'])
+      return (Artists)
+
+   def DrawAnimatedArtists(self):
+      for Artist in [self.ThermalRef, self.AnnotationLayer, self.MaxTempTextRef, self.MinTempTextRef] + self.AnimatedAxes:
+         self.Figure.draw_artist(Artist)
+
+   def CaptureBackground(self, event):
+      #Called after every full draw of the figure, stores the figure without the animated artists. The annotations are
+      #then drawn on the cleared (transparent) canvas and kept as one RGBA image, the annotation layer, after which the
+      #background is restored and the animated artists are drawn on top of it.
+      if not self.Figure.canvas.supports_blit:
+         return
+      Canvas = self.Figure.canvas
+      self.Background = Canvas.copy_from_bbox(self.Figure.bbox)
+      Canvas.get_renderer().clear()
+      for Artist in self.GetAnnotationArtists():
+         self.Figure.draw_artist(Artist)
+      self.AnnotationLayer.set_data(numpy.array(Canvas.buffer_rgba()))
+      Canvas.restore_region(self.Background)
+      self.DrawAnimatedArtists()
+
+   @FlirInstrumentation.InstrumentStage
+   def CreateFigure(self):
+      self.SaveImageFiles()
+      widths = [1.0]
+      heights = [1.2, 8, 0.25, 0.25, 0.25, 0.9]
+      MySpec = dict(width_ratios=widths, height_ratios=heights)
+      MySpec.update(wspace=0.1, hspace=0.1) # set the spacing between axes.
+      self.Figure, self.PlotList = plot.subplots(nrows=6, ncols=1, gridspec_kw=MySpec, figsize=(10,10), frameon = False)
+      self.PlotList[0].get_xaxis().set_visible(False)
+      self.PlotList[0].get_yaxis().set_visible(False)
+      self.PlotList[0].axis('off')
+      self.colorbaraxes = inset_axes(self.PlotList[1], width="2%", height="80%", loc="center left") 
+      self.PlotList[1].set_title("FLIR Image Data")
+      self.PlotList[1].get_xaxis().set_visible(False)
+      self.PlotList[1].get_yaxis().set_visible(False)
+      self.PlotList[1].axis('off')
+      self.PlotList[2].get_xaxis().set_visible(False)
+      self.PlotList[2].get_yaxis().set_visible(False)
+      self.PlotList[2].axis('off')
+      self.PlotList[3].get_xaxis().set_visible(False)
+      self.PlotList[3].get_yaxis().set_visible(False)
+      self.PlotList[3].axis('off')
+      self.PlotList[4].get_xaxis().set_visible(False)
+      self.PlotList[4].get_yaxis().set_visible(False)
+      self.PlotList[4].axis('off')
+      self.PlotList[5].get_xaxis().set_visible(False)
+      self.PlotList[5].get_yaxis().set_visible(False)
+      self.PlotList[5].axis('off')
+      self.AnimatedAxes = []
+      self.AnnotationArtists = []
+      self.Background = None
+      self.AnnotationLayer = self.SetAnimated(self.Figure.figimage(numpy.zeros((1, 1, 4), dtype=numpy.uint8), origin='upper'))
+      self.ColorMapUpdatePending = False
+      self.ColorMapUpdateTimer = self.Figure.canvas.new_timer(interval=30)
+      self.ColorMapUpdateTimer.single_shot = True
+      self.ColorMapUpdateTimer.add_callback(self.UpdateColorMap)
+      self.AnimateAxes(self.colorbaraxes)
+      self.Figure.canvas.mpl_connect('draw_event', self.CaptureBackground)
+      self.ShowImageInfo()
+      
+   def ShowImageInfo(self):
+      InfoString=self.FlirObject['MetaData']['Make'].__str__()+", "+self.FlirObject['MetaData']['CameraModel'].__str__()
+      InfoString=InfoString+", SN:"+self.FlirObject['MetaData']['CameraSerialNumber'].__str__()+", Camera SW Version="+self.FlirObject['MetaData']['CameraSoftware'].__str__()+"\n"
+      InfoString=InfoString+"Camera Temperature Range: Min="+self.FlirObject['MetaData']['CameraTemperatureRangeMin'].__str__()+", Max="+self.FlirObject['MetaData']['CameraTemperatureRangeMax'].__str__()+"\n"
+      DateInfoString=self.FlirObject['MetaData']['DateTimeOriginal'].__str__()
+      DateString=datetime.datetime.strptime(DateInfoString.split(" ")[0], '%Y:%m:%d').strftime('%A, %B %d in the year %Y')
+      FotoCreationString=DateString+" @ "+DateInfoString.split(" ")[1]+" UTC"
+      InfoString=InfoString+"Foto Creation: "+FotoCreationString+"\n\n"
+      InfoString=InfoString+"Emissivity="+self.FlirObject['MetaData']['Emissivity'].__str__()+", Reflected Apparent Temperature="+self.FlirObject['MetaData']['ReflectedApparentTemperature'].__str__()+"\n"
+      InfoString=InfoString+"Atmospheric Temperature="+self.FlirObject['MetaData']['AtmosphericTemperature'].__str__()+", Relative Humidity="+self.FlirObject['MetaData']['RelativeHumidity'].__str__()+"\n"
+      InfoString=InfoString+"Object Distance="+self.FlirObject['MetaData']['ObjectDistance'].__str__()+", Focus Distance="+self.FlirObject['MetaData']['FocusDistance'].__str__()+", Focal Length="+self.FlirObject['MetaData']['FocalLength'].__str__()+"\n"
+      self.PlotList[0].text(0.02,0.01,InfoString, fontsize=10, fontweight='bold', color='black')
+
+   def PlotMinMaxMarkers(self):
+      MinTemperature, MaxTemperature, MinLocation, MaxLocation = self.GetMinMaxTemperatureAndLocation()
+      X1, Y1 = MinLocation
+      X2, Y2 = MaxLocation
+      self.AddAnnotation(self.PlotList[1].scatter([X1], [Y1], marker='v', s=25, facecolors='none', edgecolors='b'))
+      self.AddAnnotation(self.PlotList[1].scatter([X2], [Y2], marker='^', s=25, facecolors='none', edgecolors='r'))
+      TextX, TextY = self.GetMarkerTextCoordinates(X1, Y1)
+      self.AddAnnotation(self.PlotList[1].text(TextX, TextY, round(MinTemperature,2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white'))
+      TextX, TextY = self.GetMarkerTextCoordinates(X2, Y2)
+      self.AddAnnotation(self.PlotList[1].text(TextX, TextY, round(MaxTemperature,2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white'))
+
+   @FlirInstrumentation.InstrumentStage
+   def PlotImages(self):
+      self.PlotList[1].clear()
+      self.colorbaraxes.clear()
+      self.AnnotationArtists = []
+      self.RGBRef=self.PlotList[1].imshow(self.NewRGBImage)
+      self.ThermalRef=self.SetAnimated(self.PlotList[1].imshow(self.NewThermalImage, vmin=self.ThermalMin, vmax=self.ThermalMax, cmap=cm.plasma, interpolation='nearest', alpha=0.8))
+      self.ColorBarRef=self.Figure.colorbar(self.ThermalRef, cax=self.colorbaraxes, orientation='vertical')
+      self.ColorBarRef.set_ticks([])
+      self.MaxTempTextRef=self.SetAnimated(self.PlotList[1].text(7, 38, round(self.MaxTemp,2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=10, fontweight='bold', color='white'))
+      self.MinTempTextRef=self.SetAnimated(self.PlotList[1].text(7, 448, round(self.MinTemp,2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=10, fontweight='bold', color='white'))
+      #The frame of the axes is drawn above the images as well
+      for Spine in self.PlotList[1].spines.values():
+         self.AddAnnotation(Spine)
+      self.DrawTemperatureOverlays()
+      self.DrawThresholdedAverageMeasurementBoxes()
+      if self.ShowMinMaxTemperature:
+         self.PlotMinMaxMarkers()
+      for Marker in self.MeasurementPoints:
+         self.PlotMeasurementMarker(Marker)
+      self.PlotAverageMeasurementBoxes()
+      self.Figure.canvas.draw()
+   
+   def ClearHelpInfoText(self):   
+         self.PlotList[5].clear()
+         self.PlotList[5].get_xaxis().set_visible(False)
+         self.PlotList[5].get_yaxis().set_visible(False)
+         self.PlotList[5].axis('off')
+         self.Figure.canvas.draw()
+         
+   def PressMeasurementMarkerButton(self,bla):
+      if self.MeasurementPointActive:
+         self.MeasurementPointActive=False           
+         self.Figure.canvas.mpl_disconnect(self.MeasurementPointMouseEventCallbackID)
+         self.ClearHelpInfoText()
+      else:
+         #When box selection is active, we disabled it first so only one function can be active at the same time
+         if self.MyToggleSelectorRS.active:
+            self.PressSelectionBoxButton(bla)
+         self.MeasurementPointActive=True
+         self.MeasurementPointMouseEventCallbackID = self.Figure.canvas.mpl_connect('button_press_event', self.AddMeasurementPointMouseClickCallback)
+         self.PlotList[5].text(0.01,0.07,self.MarkerHelpText)
+         self.Figure.canvas.draw()
+
+   def PressSelectionBoxButton(self,bla):
+      if self.MyToggleSelectorRS.active:
+         self.MyToggleSelectorRS.set_active(False)
+         self.ClearHelpInfoText()
+      else:
+         #When marker is active, we disabled it first so only one function can be active at the same time
+         if self.MeasurementPointActive:
+            self.PressMeasurementMarkerButton(bla)
+         self.MyToggleSelectorRS.set_active(True)
+         self.PlotList[5].text(0.01,0.07,self.SelectionBoxHelpText+round(self.ThresholdTemperature,2).__str__()+" C")
+         self.Figure.canvas.draw()
+      
+   def AddWidgets(self):
+      self.MyToggleSelectorRS = RectangleSelector(self.PlotList[1], self.SelectionBoxMouseClickCallback, drawtype='box', useblit=True, rectprops=dict(facecolor="white", alpha=0.1, fill=True), button=[1, 3], minspanx=5, minspany=5, spancoords='pixels', interactive=True)
+      self.MyToggleSelectorRS.set_active(False)
+      plot.connect('key_press_event', self.ProcessKeyPresses)
+      axcolor = 'lightgoldenrodyellow'
+      TenPercentTemperatureRange=0.1*(self.MaxTemp-self.MinTemp)
+      self.LowerColorBarSliderContainer = inset_axes(self.PlotList[2], width="60%", height="100%", loc="upper center") 
+      self.LowerColarBarSlider = Slider(self.LowerColorBarSliderContainer, 'LowerBound', round(self.MinTemp-TenPercentTemperatureRange,1), round(self.MaxTemp,1), valinit=round(self.MinTemp,1), valstep=0.1)
+      self.LowerColarBarSlider.on_changed(self.LowerSliderUpdate)
+      #The sliders are redrawn together with the image by UpdateColorMap(), not by a full draw of the figure.
+      self.LowerColarBarSlider.drawon = False
+      self.AnimateAxes(self.LowerColorBarSliderContainer)
+      self.UpperColorBarSliderContainer = inset_axes(self.PlotList[3], width="60%", height="100%", loc="upper center") 
+      self.UpperColarBarSlider = Slider(self.UpperColorBarSliderContainer, 'UpperBound', round(self.MinTemp,1), round(self.MaxTemp+TenPercentTemperatureRange,1), valinit=round(self.MaxTemp,1), valstep=0.1)
+      self.UpperColarBarSlider.on_changed(self.UpperSliderUpdate)
+      self.UpperColarBarSlider.drawon = False
+      self.AnimateAxes(self.UpperColorBarSliderContainer)
+      self.MSButtonContainer = inset_axes(self.PlotList[4], width="25%", height="100%", loc="center left") 
+      self.MeasurementMarkerButton = Button(self.MSButtonContainer, 'Marker', color='0.85', hovercolor='0.95')
+      self.MeasurementMarkerButton.on_clicked(self.PressMeasurementMarkerButton)
+      self.SelectionBoxButtonContainer = inset_axes(self.PlotList[4], width="25%", height="100%", loc="center") 
+      self.SelectBoxButton = Button(self.SelectionBoxButtonContainer, 'SelectBox', color='0.85', hovercolor='0.95')
+      self.SelectBoxButton.on_clicked(self.PressSelectionBoxButton)
+      self.SaveImageButtonContainer = inset_axes(self.PlotList[4], width="25%", height="100%", loc="center right") 
+      self.SaveImageButton = Button(self.SaveImageButtonContainer, 'Save Image', color='0.85', hovercolor='0.95')
+      self.SaveImageButton.on_clicked(self.SaveFlattenedImage)
+      
+   def AddOverlayBox(self):
+      OverlayDict = dict()
+      InsertX=((int(self.CurrentSelectionBox['X1'])-6)/640.0)
+      InsertY=1.0-((int(self.CurrentSelectionBox['Y2'])+3)/480.0)
+      OverlayDict['PixelWidth']=int(self.CurrentSelectionBox['X2']-self.CurrentSelectionBox['X1'])
+      OverlayDict['PixelHeight']=int(self.CurrentSelectionBox['Y2']-self.CurrentSelectionBox['Y1'])
+      InsertWidth=(OverlayDict['PixelWidth'])/640.0
+      InsertHeight=(OverlayDict['PixelHeight'])/480.0
+      OverlayDict['OverlayAxes'] = inset_axes(self.PlotList[1], width="100%", height="100%", loc='lower left', bbox_to_anchor=(InsertX, InsertY, InsertWidth, InsertHeight), bbox_transform=self.PlotList[1].transAxes)
+      OverlayDict['OverlayAxes'].get_xaxis().set_visible(False)
+      OverlayDict['OverlayAxes'].get_yaxis().set_visible(False)
+      OverlayDict['OverlayAxes'].axis('off')
+      ColorBarHightString = int(100*(OverlayDict['PixelHeight']-38)/OverlayDict['PixelHeight']).__str__()+"%"
+      ColorBarWidthString = int(1000/OverlayDict['PixelWidth']).__str__()+"%"
+      OverlayDict['OverlayColorBarAxes'] = inset_axes(OverlayDict['OverlayAxes'], width=ColorBarWidthString, height=ColorBarHightString, loc="center left") 
+      #The overlays do not change with the sliders, they are part of the annotation layer
+      self.SetAnimated(OverlayDict['OverlayAxes'])
+      self.SetAnimated(OverlayDict['OverlayColorBarAxes'])
+
+      OverlayDict.update(self.MakeOverlayBoxData(self.CurrentSelectionBox))
+      self.OverlayBoxes.append(OverlayDict)
+      self.PlotImages()
+
+   def AddAverageThresholdedBox(self):
+      OverlayDict = dict()
+      InsertX=((int(self.CurrentSelectionBox['X1'])-6)/640.0)
+      InsertY=1.0-((int(self.CurrentSelectionBox['Y2'])+3)/480.0)
+      OverlayDict['PixelWidth']=int(self.CurrentSelectionBox['X2']-self.CurrentSelectionBox['X1'])
+      OverlayDict['PixelHeight']=int(self.CurrentSelectionBox['Y2']-self.CurrentSelectionBox['Y1'])
+      InsertWidth=(OverlayDict['PixelWidth'])/640.0
+      InsertHeight=(OverlayDict['PixelHeight'])/480.0
+      OverlayDict['OverlayAxes'] = inset_axes(self.PlotList[1], width="100%", height="100%", loc='lower left', bbox_to_anchor=(InsertX, InsertY, InsertWidth, InsertHeight), bbox_transform=self.PlotList[1].transAxes)
+      OverlayDict['OverlayAxes'].get_xaxis().set_visible(False)
+      OverlayDict['OverlayAxes'].get_yaxis().set_visible(False)
+      OverlayDict['OverlayAxes'].axis('off')
+      ColorBarHightString = int(100*(OverlayDict['PixelHeight']-38)/OverlayDict['PixelHeight']).__str__()+"%"
+      ColorBarWidthString = int(1000/OverlayDict['PixelWidth']).__str__()+"%"
+      OverlayDict['OverlayColorBarAxes'] = inset_axes(OverlayDict['OverlayAxes'], width=ColorBarWidthString, height=ColorBarHightString, loc="center left") 
+      #The overlays do not change with the sliders, they are part of the annotation layer
+      self.SetAnimated(OverlayDict['OverlayAxes'])
+      self.SetAnimated(OverlayDict['OverlayColorBarAxes'])
+
+      OverlayDict.update(self.MakeOverlayBoxData(self.CurrentSelectionBox, self.ThresholdTemperature))
+      self.ThresholdedAverageMeasurementBoxes.append(OverlayDict)
+      self.PlotImages()
+
+   def DrawTemperatureOverlays(self):
+      for overlayDict in self.OverlayBoxes:
+         overlayDict['OverlayAxes'].clear()
+         overlayDict['OverlayColorBarAxes'].clear()
+         overlayDict['RGBRef']=overlayDict['OverlayAxes'].imshow(overlayDict['RGBImage'])
+         overlayDict['ThermalRef']=overlayDict['OverlayAxes'].imshow(overlayDict['ThermalImage'], vmin=overlayDict['ThermalMin'], vmax=overlayDict['ThermalMax'], cmap=cm.YlOrRd, interpolation='nearest', alpha=0.75)
+         overlayDict['ColorBarRef']=self.Figure.colorbar(overlayDict['ThermalRef'], cax=overlayDict['OverlayColorBarAxes'], orientation='vertical')
+         overlayDict['ColorBarRef'].set_ticks([])
+         overlayDict['OverlayAxes'].text(5, 12, round(overlayDict['ThermalMax'],2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white')
+         overlayDict['OverlayAxes'].text(5, overlayDict['PixelHeight']-8, round(overlayDict['ThermalMin'],2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white')
+
+   def DrawThresholdedAverageMeasurementBoxes(self):
+      for overlayDict in self.ThresholdedAverageMeasurementBoxes:
+         overlayDict['OverlayAxes'].clear()
+         overlayDict['OverlayColorBarAxes'].clear()
+         overlayDict['RGBRef']=overlayDict['OverlayAxes'].imshow(overlayDict['RGBImage'])
+         overlayDict['ThermalRef']=overlayDict['OverlayAxes'].imshow(overlayDict['ThermalImage'], vmin=overlayDict['ThermalMin'], vmax=overlayDict['ThermalMax'], cmap=cm.YlOrRd, interpolation='nearest', alpha=0.75)
+         overlayDict['ColorBarRef']=self.Figure.colorbar(overlayDict['ThermalRef'], cax=overlayDict['OverlayColorBarAxes'], orientation='vertical')
+         overlayDict['ColorBarRef'].set_ticks([])
+         overlayDict['OverlayAxes'].text(5, 12, round(overlayDict['ThermalMax'],2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white')
+         overlayDict['OverlayAxes'].text(5, overlayDict['PixelHeight']-8, round(overlayDict['ThermalMin'],2).__str__(), bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white')
+         overlayDict['OverlayAxes'].text((overlayDict['PixelWidth'])/2-100, (overlayDict['PixelHeight'])/2, "Average Temperature = "+round(overlayDict['AverageTemperature'],2).__str__()+" C\nBased on "+overlayDict['NumberOfMeasurements'].__str__()+" Measurements.", bbox=dict(facecolor='grey', alpha=0.35), fontsize=8, fontweight='bold', color='white')
+     
+   def CreateAverageTemperatureBox(self):
+      self.AverageMeasurementBoxes.append(self.CurrentSelectionBox)
+      self.PlotImages()
+      
+   def PlotAverageMeasurementBoxes(self):
+      if not self.AverageMeasurementBoxes:
+         return
+      #The averages of all boxes in one go from the summed area tables
+      AverageTemperatures = self.GetBoxesStatistics(self.AverageMeasurementBoxes)['Mean']
+      for box, AverageTemperature in zip(self.AverageMeasurementBoxes, AverageTemperatures):
+         #First Scale Down to the original temperaturemap size
+         NewX1 = int(box['X1']/4)
+         NewY1 = int(box['Y1']/4)
+         NewX2 = int(box['X2']/4)
+         NewY2 = int(box['Y2']/4)
+         self.AddAnnotation(self.PlotList[1].text(((NewX1+NewX2)*2)-20, ((NewY1+NewY2)*2)+5, round(AverageTemperature,1).__str__(), fontsize=10, fontweight='bold', color='white'))
+         RectangleFrame=patches.Rectangle((NewX1*4,NewY1*4),(NewX2-NewX1)*4,(NewY2-NewY1)*4,linewidth=3,edgecolor='black',facecolor='white', alpha=0.15)
+         self.AddAnnotation(self.PlotList[1].add_patch(RectangleFrame))
+         self.Figure.canvas.draw_idle()
+
+   def SaveFlattenedImage(self, bla):
+      self.SaveProcessedImage()
+
+   def ShowFigure(self):
+      plot.show()
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+def ParseArguments(Arguments=None):
+   Parser = argparse.ArgumentParser(description="Show a FLIR Jpeg file in the interactive window.")
+   Parser.add_argument('ImageName', nargs='?', default="FLIR0356.jpg", help="The FLIR Jpeg file to show (default: FLIR0356.jpg).")
+   Parser.add_argument('--cache', default=None, metavar='DIRECTORY', help="Keep the decoded thermal data in this directory, opening the file again skips the decoding.")
+   Parser.add_argument('--no-minmax', action='store_true', help="Do not show the min and max temperature markers.")
+   Parser.add_argument('--print-metadata', action='store_true', help="Print all meta data to the terminal.")
+   return(Parser.parse_args(Arguments))
+
+def Main(Arguments=None):
+   Options = ParseArguments(Arguments)
+   MyFlirImage = FLIRImageViewer(Options.ImageName, ShowMinMaxTemperature=not Options.no_minmax, PrintAllExifMetaData=Options.print_metadata, CacheDirectory=Options.cache)
+   MyFlirImage.CreateFigure()
+   MyFlirImage.PlotImages()
+   MyFlirImage.AddWidgets()
+   MyFlirImage.ShowFigure()
+   return(0)
+
+##############################################################################################################
+# Main Application
+##############################################################################################################
+if __name__ == "__main__":
+   sys.exit(Main())
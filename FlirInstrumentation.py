@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirInstrumentation.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This module measures how long the processing stages of a FLIR image take, to find out where the time of a slow
+# run goes (exiftool, decoding, resizing, ImageEnhance, jpg encoding, matplotlib).
+#
+# Instrumentation is off by default, a stage then costs one extra function call. Switch it on with Enable(),
+# after that every stage records:
+# - 'Stage', the name of the stage, like "FLIRImage.NewRGBImage".
+# - 'Image', the file name of the image the stage was run for (None when not known).
+# - 'Start', the start time in seconds (time.perf_counter()).
+# - 'WallTime' and 'CpuTime', the duration in seconds and the cpu time the thread used in that time.
+# - 'PeakAllocation', the peak of the memory allocated during the stage in bytes (tracemalloc), only when
+#   Enable(TraceMemory=True) is used, as tracemalloc slows down python code itself.
+# - 'Depth', the nesting level, stages called from other stages are nested (GetFlirFileThermalData calls
+#   GetThermalData).
+# - 'ProcessId' and 'ThreadId'.
+# Stages are functions decorated with @InstrumentStage, or blocks of code in a "with MeasureStage(Name, Image):".
+#
+# Every finished stage is passed to the hooks added with AddHook(Callback), and kept in memory (unless Enable() is
+# called with KeepRecords=False), GetRecords() returns the kept records.
+# DumpJson(FileName, ImageName=None) writes the records (of one image) with the total per stage as JSON,
+# DumpChromeTrace(FileName, ImageName=None) writes them in the Chrome trace format, which can be opened in
+# chrome://tracing or https://ui.perfetto.dev to see the stages on a time line.
+#
+# Example:
+#   FlirInstrumentation.Enable(TraceMemory=True)
+#   MyFlirImage = FLIRImage("FLIR0356.jpg")
+#   MyFlirImage.SaveImageFiles()
+#   FlirInstrumentation.DumpChromeTrace("FLIR0356.trace.json")
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import os
+import json
+import time
+import functools
+import threading
+import tracemalloc
+
+##############################################################################################################
+# Class Definitions
+##############################################################################################################
+class InstrumentationState:
+   # The settings and records of the process, there is one shared object
+   def __init__(self):
+      self.Enabled = False
+      self.TraceMemory = False
+      self.KeepRecords = True
+      self.StartedTraceMalloc = False
+      self.Hooks = []
+      self.Records = []
+      self.Lock = threading.Lock()
+      self.ThreadData = threading.local()
+
+class MeasuredStage:
+   # Context manager measuring one stage, only created when the instrumentation is enabled
+   def __init__(self, Stage, ImageName):
+      self.Stage = Stage
+      self.ImageName = ImageName
+
+   def __enter__(self):
+      Stack = GetStageStack()
+      self.Depth = len(Stack)
+      self.StartCurrent = None
+      if State.TraceMemory and tracemalloc.is_tracing():
+         Current, Peak = tracemalloc.get_traced_memory()
+         # Resetting the peak loses the peak of the enclosing stage, so that is kept in its stack entry
+         if Stack:
+            Stack[-1]['ChildPeak'] = max(Stack[-1]['ChildPeak'], Peak)
+         ResetPeak()
+         self.StartCurrent = Current
+      self.StackEntry = dict(ChildPeak=0)
+      Stack.append(self.StackEntry)
+      self.StartCpuTime = time.thread_time()
+      self.Start = time.perf_counter()
+      return (self)
+
+   def __exit__(self, ExceptionType, ExceptionValue, Traceback):
+      WallTime = time.perf_counter() - self.Start
+      CpuTime = time.thread_time() - self.StartCpuTime
+      Stack = GetStageStack()
+      Stack.pop()
+      PeakAllocation = None
+      if self.StartCurrent is not None and tracemalloc.is_tracing():
+         Peak = max(tracemalloc.get_traced_memory()[1], self.StackEntry['ChildPeak'])
+         PeakAllocation = max(Peak - self.StartCurrent, 0)
+         if Stack:
+            Stack[-1]['ChildPeak'] = max(Stack[-1]['ChildPeak'], Peak)
+      Record = dict(Stage=self.Stage, Image=self.ImageName, Start=self.Start, WallTime=WallTime, CpuTime=CpuTime,
+                    PeakAllocation=PeakAllocation, Depth=self.Depth, ProcessId=os.getpid(), ThreadId=threading.get_ident())
+      if ExceptionType is not None:
+         Record['Error'] = ExceptionType.__name__
+      AddRecord(Record)
+      return (False)
+
+class NoStage:
+   # Context manager doing nothing, used when the instrumentation is disabled
+   def __enter__(self):
+      return (self)
+
+   def __exit__(self, ExceptionType, ExceptionValue, Traceback):
+      return (False)
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+State = InstrumentationState()
+NO_STAGE = NoStage()
+
+def Enable(TraceMemory=False, KeepRecords=True):
+   State.TraceMemory = TraceMemory
+   State.KeepRecords = KeepRecords
+   if TraceMemory and not tracemalloc.is_tracing():
+      tracemalloc.start()
+      State.StartedTraceMalloc = True
+   State.Enabled = True
+
+def Disable():
+   State.Enabled = False
+   if State.StartedTraceMalloc:
+      tracemalloc.stop()
+      State.StartedTraceMalloc = False
+
+def IsEnabled():
+   return (State.Enabled)
+
+def AddHook(Callback):
+   # Callback(Record) is called for every finished stage, on the thread that ran the stage
+   with State.Lock:
+      State.Hooks.append(Callback)
+
+def RemoveHook(Callback):
+   with State.Lock:
+      State.Hooks.remove(Callback)
+
+def AddRecord(Record):
+   with State.Lock:
+      if State.KeepRecords:
+         State.Records.append(Record)
+      Hooks = list(State.Hooks)
+   for Hook in Hooks:
+      Hook(Record)
+
+def GetRecords(ImageName=None):
+   with State.Lock:
+      return ([Record for Record in State.Records if ImageName is None or Record['Image'] == ImageName])
+
+def ClearRecords(ImageName=None):
+   with State.Lock:
+      State.Records = [Record for Record in State.Records if ImageName is not None and Record['Image'] != ImageName]
+
+def GetStageStack():
+   if not hasattr(State.ThreadData, 'Stack'):
+      State.ThreadData.Stack = []
+   return (State.ThreadData.Stack)
+
+def ResetPeak():
+   # tracemalloc.reset_peak() is available from python 3.9, older versions report the peak since the start
+   if hasattr(tracemalloc, 'reset_peak'):
+      tracemalloc.reset_peak()
+
+def MeasureStage(Stage, ImageName=None):
+   if not State.Enabled:
+      return (NO_STAGE)
+   return (MeasuredStage(Stage, ImageName))
+
+def InstrumentStage(Function):
+   # Decorator for methods of objects with an ImageName (like FLIRImage), the stage is named Class.Method
+   Stage = Function.__qualname__
+
+   @functools.wraps(Function)
+   def Wrapper(*Arguments, **Keywords):
+      if not State.Enabled:
+         return (Function(*Arguments, **Keywords))
+      ImageName = getattr(Arguments[0], 'ImageName', None) if Arguments else None
+      with MeasuredStage(Stage, ImageName):
+         return (Function(*Arguments, **Keywords))
+   return (Wrapper)
+
+def GetStageTotals(Records):
+   # The number of calls and the summed times per stage
+   Totals = dict()
+   for Record in Records:
+      Total = Totals.setdefault(Record['Stage'], dict(Calls=0, WallTime=0.0, CpuTime=0.0, PeakAllocation=None))
+      Total['Calls'] += 1
+      Total['WallTime'] += Record['WallTime']
+      Total['CpuTime'] += Record['CpuTime']
+      if Record['PeakAllocation'] is not None:
+         Total['PeakAllocation'] = max(Total['PeakAllocation'] or 0, Record['PeakAllocation'])
+   return (Totals)
+
+def DumpJson(FileName, ImageName=None):
+   Records = GetRecords(ImageName)
+   with open(FileName, 'w') as OutputFile:
+      json.dump(dict(Image=ImageName, Stages=Records, Totals=GetStageTotals(Records)), OutputFile, indent=2)
+
+def DumpChromeTrace(FileName, ImageName=None):
+   # Complete ("X") events with the times in microseconds, the other values are shown as arguments of the event
+   Events = []
+   for Record in GetRecords(ImageName):
+      Arguments = dict(Image=Record['Image'], CpuTime=Record['CpuTime'], PeakAllocation=Record['PeakAllocation'])
+      if 'Error' in Record:
+         Arguments['Error'] = Record['Error']
+      Events.append(dict(name=Record['Stage'], cat="FLIRImage", ph="X", ts=Record['Start']*1e6, dur=Record['WallTime']*1e6,
+                         pid=Record['ProcessId'], tid=Record['ThreadId'], args=Arguments))
+   with open(FileName, 'w') as OutputFile:
+      json.dump(dict(traceEvents=Events, displayTimeUnit="ms"), OutputFile)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirRegionStatistics.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This module calculates the number of measurements, the average and the standard deviation of the temperatures
+# inside rectangular regions of a temperature array, optionally only taking the temperatures above a threshold
+# temperature into account.
+#
+# Create a RegionStatistics object by passing it the temperature array. It calculates summed area tables
+# (integral images) of the temperatures and the squared temperatures once, after which the statistics of any
+# rectangle take a constant amount of work, no matter how big the rectangle is. For every threshold temperature
+# used, summed area tables of the thresholded temperatures are calculated once and kept.
+#
+# GetBoxStatistics(Rows1, Rows2, Columns1, Columns2, ThresholdTemperature=None) takes the box boundaries in
+# python slice notation (Array[Rows1:Rows2, Columns1:Columns2]), either as single values or as arrays to query
+# thousands of boxes in one call, and returns a dictionary with 'Count', 'Sum', 'Mean' and 'Std'.
+# Temperatures that are not a number (raw values outside the calibrated range) are not counted.
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import numpy
+
+##############################################################################################################
+# Class Definitions
+##############################################################################################################
+class RegionStatistics:
+   def __init__(self, TemperatureArray):
+      TemperatureArray = numpy.asarray(TemperatureArray, dtype=numpy.float64)
+      self.Height, self.Width = TemperatureArray.shape
+      ValidMask = numpy.isfinite(TemperatureArray)
+      self.TemperatureArray = TemperatureArray
+      self.CountTable, self.SumTable, self.SquaredSumTable = self.MakeTables(ValidMask, TemperatureArray)
+      self.ThresholdTables = dict()
+
+   def MakeTables(self, Mask, TemperatureArray):
+      Values = numpy.where(Mask, TemperatureArray, 0.0)
+      return (MakeSummedAreaTable(Mask), MakeSummedAreaTable(Values), MakeSummedAreaTable(Values*Values))
+
+   def GetThresholdTables(self, ThresholdTemperature):
+      ThresholdTemperature = float(ThresholdTemperature)
+      if ThresholdTemperature not in self.ThresholdTables:
+         with numpy.errstate(invalid='ignore'):
+            Mask = self.TemperatureArray > ThresholdTemperature
+         self.ThresholdTables[ThresholdTemperature] = self.MakeTables(Mask, self.TemperatureArray)
+      return (self.ThresholdTables[ThresholdTemperature])
+
+   def GetBoxStatistics(self, Rows1, Rows2, Columns1, Columns2, ThresholdTemperature=None):
+      Rows1, Rows2 = NormalizeSlices(Rows1, Rows2, self.Height)
+      Columns1, Columns2 = NormalizeSlices(Columns1, Columns2, self.Width)
+      if ThresholdTemperature is None:
+         CountTable, SumTable, SquaredSumTable = self.CountTable, self.SumTable, self.SquaredSumTable
+      else:
+         CountTable, SumTable, SquaredSumTable = self.GetThresholdTables(ThresholdTemperature)
+      Statistics = dict()
+      Statistics['Count'] = GetBoxSums(CountTable, Rows1, Rows2, Columns1, Columns2).astype(numpy.int64)
+      Statistics['Sum'] = GetBoxSums(SumTable, Rows1, Rows2, Columns1, Columns2)
+      SquaredSum = GetBoxSums(SquaredSumTable, Rows1, Rows2, Columns1, Columns2)
+      with numpy.errstate(invalid='ignore', divide='ignore'):
+         Statistics['Mean'] = Statistics['Sum'] / Statistics['Count']
+         Variance = SquaredSum / Statistics['Count'] - Statistics['Mean']**2
+      # Rounding errors can give a tiny negative variance for boxes with (almost) equal temperatures
+      Statistics['Std'] = numpy.sqrt(numpy.maximum(Variance, 0.0))
+      return (Statistics)
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+def MakeSummedAreaTable(Values):
+   # The table has an extra row and column of zeros at the top and the left, so entry [Y, X] holds the sum of
+   # Values[:Y, :X]
+   Table = numpy.zeros((Values.shape[0]+1, Values.shape[1]+1), dtype=numpy.float64)
+   numpy.cumsum(Values, axis=0, out=Table[1:, 1:])
+   numpy.cumsum(Table[1:, 1:], axis=1, out=Table[1:, 1:])
+   return (Table)
+
+def NormalizeSlices(Starts, Stops, Length):
+   # Same rules as python slices with a step of 1, negative values count from the end and everything is clipped
+   # to the array, a stop before the start gives an empty box.
+   Starts = numpy.asarray(Starts, dtype=numpy.int64)
+   Stops = numpy.asarray(Stops, dtype=numpy.int64)
+   Starts = numpy.clip(numpy.where(Starts < 0, Starts + Length, Starts), 0, Length)
+   Stops = numpy.clip(numpy.where(Stops < 0, Stops + Length, Stops), 0, Length)
+   return (Starts, numpy.maximum(Stops, Starts))
+
+def GetBoxSums(Table, Rows1, Rows2, Columns1, Columns2):
+   return (Table[Rows2, Columns2] - Table[Rows1, Columns2] - Table[Rows2, Columns1] + Table[Rows1, Columns1])
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirSyntheticImage.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This module creates synthetic FLIR radiometric Jpeg files, with the same structure as the files of a real
+# camera (an Exif segment and FLIR APP1 segments holding a FFF container with CameraInfo, RawData, EmbeddedImage
+# and PiP records). They are used for benchmarking and for trying things out without a camera, with any
+# resolution, byte order and calibration values.
+#
+# MakeSyntheticFlirData() returns the bytes of the file, MakeSyntheticFlirFile() writes them to a file.
+# Optional parameters are:
+# - Width, Height, the size of the thermal data.
+# - EmbeddedWidth, EmbeddedHeight, the size of the embedded (visual) image.
+# - ByteOrder, '<' (little endian, like the FLIR C5) or '>' (big endian), used for the records and Exif data.
+# - RawFormat, 'PNG' for png compressed raw data (stored byte swapped, like FLIR does) or 'RAW' for plain 16 bit
+#   values.
+# - Calibration, a dictionary overruling any of the DEFAULT_CALIBRATION values.
+# - Real2IR, the scale factor between the embedded image and the thermal image (default the value of the C5).
+# - Seed, for the random noise and the position of the hot spots.
+# The temperatures of the scene are a gradient with a few hot spots, they are converted to raw values with the
+# inverse of the Planck formula used by FlirTemperatureConversion, so the decoded temperatures are realistic.
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import struct
+import datetime
+from io import BytesIO
+import numpy
+from PIL import Image
+import FlirFileParser
+
+##############################################################################################################
+# Constants
+##############################################################################################################
+# The calibration values of the FLIR C5 used for FLIR0356.jpg, temperatures in degrees Celcius
+DEFAULT_CALIBRATION = dict(PlanckR1=10480.393, PlanckR2=0.066373192, PlanckB=1293.8, PlanckF=1.65, PlanckO=-2278,
+                           Emissivity=0.95, ReflectedApparentTemperature=20.0, AtmosphericTemperature=20.0,
+                           RelativeHumidity=0.5, ObjectDistance=1.0)
+
+CAMERAINFO_SIZE = 0x470
+MAXIMUM_SEGMENT_DATA = 65533 - 8
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+def MakeSceneTemperatures(Width, Height, Seed=0):
+   # A gradient from 15 to 25 degrees with a few hot spots (radiators, connectors) and some noise
+   Random = numpy.random.RandomState(Seed)
+   Y, X = numpy.mgrid[0:Height, 0:Width]
+   Temperatures = 15.0 + 10.0 * (Y / max(Height-1, 1))
+   for Spot in range(4):
+      CenterX = Random.uniform(0, Width)
+      CenterY = Random.uniform(0, Height)
+      Radius = Random.uniform(0.03, 0.12) * max(Width, Height)
+      Temperatures += Random.uniform(10.0, 60.0) * numpy.exp(-((X-CenterX)**2 + (Y-CenterY)**2) / (2*Radius**2))
+   return (Temperatures + Random.normal(0.0, 0.1, Temperatures.shape))
+
+def TemperatureToRaw(Temperatures, Calibration):
+   # Inverse of FlirTemperatureConversion.RawToTemperature
+   PlanckR1 = Calibration['PlanckR1']
+   PlanckR2 = Calibration['PlanckR2']
+   PlanckB = Calibration['PlanckB']
+   PlanckF = Calibration['PlanckF']
+   PlanckO = Calibration['PlanckO']
+   Emissivity = Calibration['Emissivity']
+   RAT = Calibration['ReflectedApparentTemperature']
+   ReflectedRadiationFactor = PlanckR1 / (PlanckR2 * (numpy.exp(PlanckB / (RAT + 273.15)) - PlanckF)) - PlanckO
+   ObjectRadiation = PlanckR1 / (PlanckR2 * (numpy.exp(PlanckB / (Temperatures + 273.15)) - PlanckF)) - PlanckO
+   RawData = ObjectRadiation * Emissivity + (1 - Emissivity) * ReflectedRadiationFactor
+   return (numpy.clip(numpy.round(RawData), 0, 65535).astype(numpy.uint16))
+
+def MakeImageRecord(TypeNumber, Width, Height, ImageData, ByteOrder):
+   Header = struct.pack(ByteOrder+'HHH', TypeNumber, Width, Height).ljust(0x20, b'\x00')
+   return (Header + ImageData)
+
+def MakeRawDataRecord(RawData, ByteOrder, RawFormat):
+   Height, Width = RawData.shape
+   if RawFormat == 'PNG':
+      # FLIR stores the values little endian in the png, so reading the png gives byte swapped values
+      Stream = BytesIO()
+      Image.fromarray(RawData.byteswap()).save(Stream, "png")
+      ImageData = Stream.getvalue()
+   else:
+      ImageData = RawData.astype(ByteOrder+'u2').tobytes()
+   return (MakeImageRecord(2, Width, Height, ImageData, ByteOrder))
+
+def MakeEmbeddedImageRecord(EmbeddedWidth, EmbeddedHeight, ByteOrder, Seed):
+   # A grey scene with some structure, so the resize and enhance steps have something to work on
+   Random = numpy.random.RandomState(Seed)
+   Y, X = numpy.mgrid[0:EmbeddedHeight, 0:EmbeddedWidth]
+   Picture = numpy.zeros((EmbeddedHeight, EmbeddedWidth, 3), dtype=numpy.float64)
+   Picture[...] = (128 + 60*numpy.sin(X/17.0) * numpy.cos(Y/23.0))[..., None]
+   Picture += Random.normal(0, 8, Picture.shape)
+   Stream = BytesIO()
+   Image.fromarray(numpy.clip(Picture, 0, 255).astype(numpy.uint8)).save(Stream, "jpeg", quality=90)
+   return (MakeImageRecord(3, EmbeddedWidth, EmbeddedHeight, Stream.getvalue(), ByteOrder))
+
+def MakeCameraInfoRecord(Calibration, ByteOrder, DateTimeOriginal):
+   Record = bytearray(CAMERAINFO_SIZE)
+   struct.pack_into(ByteOrder+'H', Record, 0, 2)
+   Values = dict(Calibration)
+   # Temperatures are stored in Kelvin
+   for Name in ('ReflectedApparentTemperature', 'AtmosphericTemperature'):
+      Values[Name] = Values[Name] + 273.15
+   Values.update(IRWindowTemperature=Values['AtmosphericTemperature'], IRWindowTransmission=1.0,
+                 CameraTemperatureRangeMax=400.0+273.15, CameraTemperatureRangeMin=273.15,
+                 CameraModel=b"Synthetic FLIR", CameraSerialNumber=b"000000000", CameraSoftware=b"1.0",
+                 FieldOfView=54.0, FocusDistance=2.0)
+   for Offset, Format, Name, Conversion in FlirFileParser.CAMERAINFO_FIELDS:
+      if Name in Values:
+         struct.pack_into(ByteOrder+Format, Record, Offset, Values[Name])
+   Seconds = int((DateTimeOriginal - datetime.datetime(1970, 1, 1)).total_seconds())
+   struct.pack_into(ByteOrder+'IIh', Record, 0x384, Seconds, DateTimeOriginal.microsecond//1000, 0)
+   return (bytes(Record))
+
+def MakePiPRecord(Real2IR, ByteOrder):
+   return (struct.pack(ByteOrder+'fhhhhhh', Real2IR, 0, 0, 0, 0, 0, 0))
+
+def MakeFffContainer(Records):
+   # Records is a list of (record type, record bytes), the FFF header and index are big endian
+   IndexOffset = 0x40
+   Data = bytearray(b'FFF\x00' + b'Synthetic'.ljust(16, b'\x00') + struct.pack('>III', 100, IndexOffset, len(Records)))
+   Data = Data.ljust(IndexOffset, b'\x00')
+   RecordOffset = IndexOffset + 32*len(Records)
+   Index = b''
+   for RecordType, RecordData in Records:
+      Index += struct.pack('>HHIIII', RecordType, 1, 100, 1, RecordOffset, len(RecordData)).ljust(32, b'\x00')
+      RecordOffset += len(RecordData)
+   return (bytes(Data) + Index + b''.join(RecordData for RecordType, RecordData in Records))
+
+def MakeTiffDirectory(Entries, Offset, ByteOrder):
+   # Entries is a list of (tag, type, count, value bytes), values longer than 4 bytes are stored after the IFD.
+   # Returns the IFD followed by its values, for an IFD starting at Offset in the Tiff data.
+   DataOffset = Offset + 2 + 12*len(Entries) + 4
+   Directory = struct.pack(ByteOrder+'H', len(Entries))
+   Data = b''
+   for Tag, Type, Count, Value in Entries:
+      if len(Value) > 4:
+         Directory += struct.pack(ByteOrder+'HHII', Tag, Type, Count, DataOffset+len(Data))
+         Data += Value
+      else:
+         Directory += struct.pack(ByteOrder+'HHI', Tag, Type, Count) + Value.ljust(4, b'\x00')
+   return (Directory + struct.pack(ByteOrder+'I', 0) + Data)
+
+def MakeExifSegment(ByteOrder, DateTimeOriginal):
+   # A minimal Exif block with the Make, Model and an Exif IFD with the DateTimeOriginal and the FocalLength
+   Make = b"FLIR Systems AB\x00"
+   Model = b"Synthetic FLIR\x00"
+   DateTime = DateTimeOriginal.strftime('%Y:%m:%d %H:%M:%S').encode() + b'\x00'
+   Ifd0Offset = 8
+   Ifd0Size = len(MakeTiffDirectory([(0x010f, 2, len(Make), Make), (0x0110, 2, len(Model), Model), (0x8769, 4, 1, b'')], Ifd0Offset, ByteOrder))
+   ExifIfdOffset = Ifd0Offset + Ifd0Size
+   Ifd0 = MakeTiffDirectory([(0x010f, 2, len(Make), Make), (0x0110, 2, len(Model), Model),
+                             (0x8769, 4, 1, struct.pack(ByteOrder+'I', ExifIfdOffset))], Ifd0Offset, ByteOrder)
+   ExifIfd = MakeTiffDirectory([(0x9003, 2, len(DateTime), DateTime), (0x920a, 5, 1, struct.pack(ByteOrder+'II', 40, 10))], ExifIfdOffset, ByteOrder)
+   Tiff = (b'II' if ByteOrder == '<' else b'MM') + struct.pack(ByteOrder+'HI', 42, Ifd0Offset) + Ifd0 + ExifIfd
+   return (MakeSegment(0xE1, b'Exif\x00\x00' + Tiff))
+
+def MakeSegment(Marker, Payload):
+   return (struct.pack('>BBH', 0xFF, Marker, len(Payload)+2) + Payload)
+
+def MakeSyntheticFlirData(Width=160, Height=120, EmbeddedWidth=640, EmbeddedHeight=480, ByteOrder='<', RawFormat='PNG', Calibration=None, Real2IR=1.4828407, Seed=0):
+   FullCalibration = dict(DEFAULT_CALIBRATION)
+   FullCalibration.update(Calibration or dict())
+   RawData = TemperatureToRaw(MakeSceneTemperatures(Width, Height, Seed), FullCalibration)
+   DateTimeOriginal = datetime.datetime(2021, 1, 9, 12, 0, 0) + datetime.timedelta(minutes=Seed)
+   Records = [(FlirFileParser.FFF_RECORD_CAMERAINFO, MakeCameraInfoRecord(FullCalibration, ByteOrder, DateTimeOriginal)),
+              (FlirFileParser.FFF_RECORD_RAWDATA, MakeRawDataRecord(RawData, ByteOrder, RawFormat)),
+              (FlirFileParser.FFF_RECORD_PIP, MakePiPRecord(Real2IR, ByteOrder)),
+              (FlirFileParser.FFF_RECORD_EMBEDDEDIMAGE, MakeEmbeddedImageRecord(EmbeddedWidth, EmbeddedHeight, ByteOrder, Seed))]
+   FffData = MakeFffContainer(Records)
+   Chunks = [FffData[Start:Start+MAXIMUM_SEGMENT_DATA] for Start in range(0, len(FffData), MAXIMUM_SEGMENT_DATA)]
+   FlirSegments = b''
+   for ChunkIndex, Chunk in enumerate(Chunks):
+      FlirSegments += MakeSegment(0xE1, b'FLIR\x00\x01' + bytes([ChunkIndex, len(Chunks)-1]) + Chunk)
+   # The main image of a FLIR file is a rendering of the thermal image, a greyscale version is good enough here
+   Stream = BytesIO()
+   Scaled = (RawData.astype(numpy.float64) - RawData.min()) / max(float(RawData.max()) - float(RawData.min()), 1.0)
+   Image.fromarray((Scaled*255).astype(numpy.uint8)).save(Stream, "jpeg", quality=90)
+   MainImage = Stream.getvalue()
+   return (MainImage[0:2] + MakeExifSegment(ByteOrder, DateTimeOriginal) + FlirSegments + MainImage[2:])
+
+def MakeSyntheticFlirFile(FileName, **Options):
+   with open(FileName, 'wb') as FlirFile:
+      FlirFile.write(MakeSyntheticFlirData(**Options))
+   return (FileName)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirTemperatureConversion.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+# V0.2 : Lookup tables and conversion in other precisions (DataType), for the compact mode of FLIRImage
+# V0.3 : IsRawDataByteSwapped(), the one place that decides whether the raw data needs the byte swap
+##############################################################################################################
+#
+# This module converts the raw 16 bit thermal sensor values of a FLIR camera to temperatures in degrees Celcius.
+# The conversion uses the camera's calibration values found in the meta data (PlanckR1, PlanckR2, PlanckB,
+# PlanckF, PlanckO), the Emissivity and the Reflected Apparent Temperature.
+#
+# As the raw values are only 16 bit, there are only 65536 possible results. Instead of calculating the Planck
+# formula (an exp, a division and a log) for every pixel, a lookup table with the temperature of every possible
+# raw value is calculated once and a whole frame is converted with a single indexed lookup.
+# The lookup tables are kept in a LRU cache keyed by the calibration values, so consecutive images of the same
+# camera with the same settings reuse the table. The byte swap needed for the little endian png data of some
+# cameras is folded into the table as well, so the raw png data can be used as index directly.
+# IsRawDataByteSwapped(MetaData) tells whether the decoded raw data of a file needs that byte swap.
+# The tables are 64 bit floats, pass DataType=numpy.float32 for temperatures in half the memory.
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import numpy
+from functools import lru_cache
+
+##############################################################################################################
+# Constants
+##############################################################################################################
+LOOKUP_TABLE_CACHE_SIZE = 32
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+def RawToTemperature(RawData, PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT):
+   # Convert to temperature from radiance with simplified formula, ignoring atmospheric influences
+   ReflectedRadiationFactor = PlanckR1 / (PlanckR2 * (numpy.exp(PlanckB / (RAT + 273.15)) - PlanckF)) - PlanckO
+   ObjectRadiation =  (RawData - (1 - Emissivity) * ReflectedRadiationFactor) / Emissivity
+   TemperatureData = PlanckB / numpy.log(PlanckR1 / (PlanckR2 * (ObjectRadiation + PlanckO)) + PlanckF) - 273.15
+   return (TemperatureData)
+
+@lru_cache(maxsize=LOOKUP_TABLE_CACHE_SIZE)
+def GetTemperatureLookupTable(PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, SwapBytes=False, DataType=numpy.float64):
+   if DataType is not numpy.float64:
+      # Other precisions (float32 for the compact mode of FLIRImage) are made from the 64 bit table
+      LookupTable = GetTemperatureLookupTable(PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, SwapBytes).astype(DataType)
+      LookupTable.setflags(write=False)
+      return (LookupTable)
+   RawValues = numpy.arange(65536, dtype=numpy.uint16)
+   if SwapBytes:
+      # Entry N of the table holds the temperature of the byte swapped value of N
+      RawValues = RawValues.byteswap()
+   # Raw values outside the calibrated range give a log of a negative number, those entries become nan just
+   # like they would with the per pixel calculation.
+   with numpy.errstate(invalid='ignore', divide='ignore', over='ignore'):
+      LookupTable = RawToTemperature(RawValues, PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT)
+   # The table is shared by all images using the same calibration values, so it must not be changed.
+   LookupTable.setflags(write=False)
+   return (LookupTable)
+
+def IsRawDataByteSwapped(MetaData):
+   # FLIR stores png compressed raw data little endian, while png is big endian, so the decoded values are byte
+   # swapped. Plain 16 bit raw data is wrapped in a TIFF of its own byte order (by FlirFileParser.py or exiftool),
+   # which PIL already decodes to the right values, whatever the ExifByteOrder of the file is.
+   return (MetaData.get('RawThermalImageType') == 'PNG')
+
+def ConvertRawToTemperature(RawData, PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, SwapBytes=False, DataType=numpy.float64):
+   LookupTable = GetTemperatureLookupTable(PlanckR1, PlanckR2, PlanckB, PlanckF, PlanckO, Emissivity, RAT, SwapBytes, DataType)
+   # take() is a lot faster than indexing the table with the raw data array
+   return (LookupTable.take(numpy.asarray(RawData, dtype=numpy.uint16)))
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirThermalRenderer.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+# V0.2 : The plasma and YlOrRd palettes are built in, matplotlib is not needed for the default palettes
+##############################################################################################################
+#
+# This module turns temperature arrays into color images (the Thermal jpg files, thumbnails), without going
+# through matplotlib's float RGBA conversion for every image.
+#
+# A palette is a table of N colors (N x 3 uint8), made once per colormap and number of colors and then kept:
+# - The 256 color 'plasma' and 'YlOrRd' palettes used by FLIRImage are part of this module (BUILTIN_PALETTES).
+# - Palettes of other matplotlib colormaps (or other numbers of colors) are taken from matplotlib the first time
+#   they are used, matplotlib is only imported then.
+# - Other palettes can be added with RegisterPalette(Name, Colors), Colors being N x 3 (or N x 4, the alpha is
+#   dropped) values, either uint8 or floats from 0.0 to 1.0.
+# The temperatures are quantized once to an index in the palette, the palette lookup gives the RGB image directly.
+# Temperatures are clamped to MinTemperature and MaxTemperature, by default the minimum and maximum temperature
+# of the array. Temperatures that are not a number are drawn black, when the minimum and maximum are the same all
+# temperatures get the middle color. With 256 colors the images are the same as the ones matplotlib makes with the
+# colormap.
+#
+# - RenderThermalImage(ThermalData, ...) returns the RGB array, optionally resized to Size (Width, Height) first.
+# - MakeThermalPicture(ThermalData, ..., Sharpness=None) returns a PIL image, optionally sharpened.
+# - SaveThermalImage(ThermalData, FileName, ..., Quality=95) and EncodeThermalImage(ThermalData, ...) write the
+#   image to a file or return the bytes of it, in jpeg or any other format PIL supports.
+# - SaveThermalImages(Jobs, ...) saves a list of (ThermalData, FileName) on a number of threads, the numpy and
+#   PIL work releases the GIL, so the images are really made in parallel.
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+import numpy
+from PIL import Image, ImageEnhance
+
+##############################################################################################################
+# Constants
+##############################################################################################################
+DEFAULT_NUMBER_OF_COLORS = 256
+BAD_TEMPERATURE_COLOR = (0, 0, 0)
+# The colors of the default palettes (256 colors) as hex RGB triplets, these are the colors of matplotlib's colormaps,
+# kept here so the Thermal jpg files and processed images can be made without importing matplotlib.
+BUILTIN_PALETTES = {
+   'plasma': (
+      "0c078610078713068915068a18068b1b068c1d068d1f058e21058f2305902505912705922905932b05942d04942f0495310496"
+      "3304973404983604983804993a049a3b039a3d039b3f039c40039c42039d44039e45039e47029f49029f4a02a04c02a14e02a1"
+      "4f02a25101a25201a35401a35601a35701a45901a45a00a55c00a55e00a55f00a66100a66200a66400a76500a76700a76800a7"
+      "6a00a76c00a86d00a86f00a87000a87200a87300a87500a87601a87801a87901a87b02a87c02a77e03a77f03a78104a78204a7"
+      "8405a68506a68607a68807a58908a58b09a48c0aa48e0ca48f0da3900ea3920fa29310a19511a19612a09713a099149f9a159e"
+      "9b179e9d189d9e199c9f1a9ba01b9ba21c9aa31d99a41e98a51f97a72197a82296a92395aa2494ac2593ad2692ae2791af2890"
+      "b02a8fb12b8fb22c8eb42d8db52e8cb62f8bb7308ab83289b93388ba3487bb3586bc3685bd3784be3883bf3982c03b81c13c80"
+      "c23d80c33e7fc43f7ec5407dc6417cc7427bc8447ac94579ca4678cb4777cc4876cd4975ce4a75cf4b74d04d73d14e72d14f71"
+      "d25070d3516fd4526ed5536dd6556dd7566cd7576bd8586ad95969da5a68db5b67dc5d66dc5e66dd5f65de6064df6163df6262"
+      "e06461e16560e26660e3675fe3685ee46a5de56b5ce56c5be66d5ae76e5ae87059e87158e97257ea7356ea7455eb7654ec7754"
+      "ec7853ed7952ed7b51ee7c50ef7d4fef7e4ef0804df0814df1824cf2844bf2854af38649f38748f48947f48a47f58b46f58d45"
+      "f68e44f68f43f69142f79241f79341f89540f8963ff8983ef9993df99a3cfa9c3bfa9d3afa9f3afaa039fba238fba337fba436"
+      "fca635fca735fca934fcaa33fcac32fcad31fdaf31fdb030fdb22ffdb32efdb52dfdb62dfdb82cfdb92bfdbb2bfdbc2afdbe29"
+      "fdc029fdc128fdc328fdc427fdc626fcc726fcc926fccb25fccc25fcce25fbd024fbd124fbd324fad524fad624fad824f9d924"
+      "f9db24f8dd24f8df24f7e024f7e225f6e425f6e525f5e726f5e926f4ea26f3ec26f3ee26f2f026f2f126f1f326f0f525f0f623"
+      "eff821"),
+   'YlOrRd': (
+      "ffffccfffecafffdc9fffdc7fffcc6fffcc5fffbc3fffbc2fffac0fff9bffff9befff8bcfff8bbfff7bafff7b8fff6b7fff5b5"
+      "fff5b4fff4b3fff4b1fff3b0fff3affff2adfff2acfff1aafff0a9fff0a8ffefa6ffefa5ffeea3ffeea2ffeda1feec9ffeec9e"
+      "feeb9dfeeb9bfeea9afee999fee997fee896fee795fee793fee692fee691fee590fee48efee48dfee38cfee28afee289fee188"
+      "fee186fee085fedf84fedf82fede81fedd80fedd7efedc7dfedb7cfedb7afeda79feda78fed976fed875fed774fed673fed571"
+      "fed370fed26ffed16dfed06cfece6bfecd69fecc68fecb67feca65fec864fec763fec661fec560fec35ffec25dfec15cfec05b"
+      "febf5afebd58febc57febb56feba54feb853feb752feb650feb54ffeb34efeb24cfdb14bfdb04bfdaf4afdae4afdac49fdab49"
+      "fdaa48fda948fda847fda747fda546fda446fda345fda245fda144fda044fd9e43fd9d43fd9c42fd9b42fd9a41fd9941fd9840"
+      "fd9640fd953ffd943ffd933efd923efd913dfd8f3dfd8e3cfd8d3cfc8c3bfc8a3bfc883afc863afc8439fc8238fc8038fc7e37"
+      "fc7c37fc7a36fc7836fc7635fc7434fc7234fc7033fc6e33fc6c32fc6a32fc6831fc6630fc6430fc622ffc602ffc5e2efc5c2e"
+      "fc5a2dfc582dfc562cfc542bfc522bfc502afc4e2afb4c29fa4b29f94928f94828f84627f74427f64327f64126f53f26f43e25"
+      "f33c25f23b24f23924f13724f03623ef3423ee3222ee3122ed2f21ec2d21eb2c20eb2a20ea2920e9271fe8251fe7241ee7221e"
+      "e6201de51f1de41d1ce31c1ce31a1ce2191ce0181cdf171cde161ddd161ddc151dda141ed9131ed8121ed7121fd6111fd4101f"
+      "d30f20d20e20d10d20d00d20cf0c21cd0b21cc0a21cb0922ca0922c90822c70723c60623c50523c40424c30424c10324c00225"
+      "bf0125be0025bd0025bb0026b90026b70026b50026b30026b10026af0026ad0026ac0026aa0026a80026a60026a40026a20026"
+      "a000269e00269c00269a00269800269600269500269300269100268f00268d00268b0026890026870026850026830026810026"
+      "800026")}
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+Palettes = dict()
+PalettesLock = threading.Lock()
+
+def RegisterPalette(Name, Colors):
+   Colors = numpy.asarray(Colors)
+   if Colors.ndim != 2 or Colors.shape[1] not in (3, 4):
+      raise ValueError("A palette needs N x 3 or N x 4 colors, not "+Colors.shape.__str__())
+   if Colors.dtype != numpy.uint8:
+      Colors = numpy.clip(numpy.round(Colors*255), 0, 255).astype(numpy.uint8)
+   Table = MakePaletteTable(Colors[:, :3])
+   with PalettesLock:
+      # Tables made from an earlier palette with this name are dropped
+      for Key in [Key for Key in Palettes if Key[0] == Name]:
+         del Palettes[Key]
+      Palettes[(Name, None)] = Table
+      Palettes[(Name, len(Colors))] = Table
+
+def MakePaletteTable(Colors):
+   # The table has one extra entry at the end for temperatures that are not a number
+   Table = numpy.empty((len(Colors)+1, 3), dtype=numpy.uint8)
+   Table[:-1] = Colors
+   Table[-1] = BAD_TEMPERATURE_COLOR
+   Table.flags.writeable = False
+   return (Table)
+
+def GetBuiltinColors(Name):
+   return (numpy.frombuffer(bytes.fromhex("".join(BUILTIN_PALETTES[Name])), dtype=numpy.uint8).reshape(-1, 3))
+
+def GetMatplotlibColors(Name, NumberOfColors):
+   import matplotlib
+   if hasattr(matplotlib, 'colormaps'):
+      ColorMap = matplotlib.colormaps[Name].resampled(NumberOfColors)
+   else:
+      from matplotlib import cm
+      ColorMap = cm.get_cmap(Name, NumberOfColors)
+   # Integers index the colormap table directly
+   return (ColorMap(numpy.arange(NumberOfColors), bytes=True)[:, :3])
+
+def GetPalette(Name='plasma', NumberOfColors=None):
+   # Returns the palette table, NumberOfColors None gives the registered palette, or the built in palette or
+   # matplotlib colormap with DEFAULT_NUMBER_OF_COLORS colors.
+   with PalettesLock:
+      if (Name, NumberOfColors) in Palettes:
+         return (Palettes[(Name, NumberOfColors)])
+      if NumberOfColors is not None and (Name, None) in Palettes:
+         # A registered palette with another number of colors, resampled
+         Colors = Palettes[(Name, None)][:-1]
+         Positions = numpy.linspace(0, len(Colors)-1, NumberOfColors).round().astype(numpy.intp)
+         Palettes[(Name, NumberOfColors)] = MakePaletteTable(Colors[Positions])
+         return (Palettes[(Name, NumberOfColors)])
+   if Name in BUILTIN_PALETTES and NumberOfColors in (None, DEFAULT_NUMBER_OF_COLORS):
+      Table = MakePaletteTable(GetBuiltinColors(Name))
+   else:
+      Table = MakePaletteTable(GetMatplotlibColors(Name, NumberOfColors or DEFAULT_NUMBER_OF_COLORS))
+   with PalettesLock:
+      return (Palettes.setdefault((Name, NumberOfColors), Table))
+
+def GetColorIndices(ThermalData, NumberOfColors, MinTemperature=None, MaxTemperature=None):
+   # Quantizes the temperatures to palette indices, the same way matplotlib maps normalized values to colors.
+   # Temperatures that are not a number get index NumberOfColors (the last entry of the palette table).
+   ThermalData = numpy.asarray(ThermalData)
+   if ThermalData.dtype.kind != 'f':
+      ThermalData = ThermalData.astype(numpy.float64)
+   if MinTemperature is None:
+      MinTemperature = numpy.nanmin(ThermalData)
+   if MaxTemperature is None:
+      MaxTemperature = numpy.nanmax(ThermalData)
+   with numpy.errstate(invalid='ignore', divide='ignore'):
+      # One new array, the rest is done in place
+      Scaled = numpy.subtract(ThermalData, MinTemperature)
+      if MaxTemperature == MinTemperature:
+         # No temperature range (an overlay with only 0.0 temperatures), drawn in the middle color like imshow does
+         Scaled *= 0.0
+         Scaled += 0.5
+      else:
+         Scaled /= (MaxTemperature - MinTemperature)
+      Scaled *= NumberOfColors
+      Bad = numpy.isnan(Scaled)
+      numpy.clip(Scaled, 0, NumberOfColors-1, out=Scaled)
+      Indices = Scaled.astype(numpy.intp)
+   if Bad.any():
+      Indices[Bad] = NumberOfColors
+   return (Indices)
+
+def ResizeThermalData(ThermalData, Size):
+   # Resized as 32 bit float image, before the colors are determined
+   ThermalData = numpy.asarray(ThermalData, dtype=numpy.float32)
+   if Size is None or tuple(Size) == (ThermalData.shape[1], ThermalData.shape[0]):
+      return (ThermalData)
+   return (numpy.array(Image.fromarray(ThermalData).resize(tuple(Size), Image.LANCZOS)))
+
+def RenderThermalImage(ThermalData, MinTemperature=None, MaxTemperature=None, Palette='plasma', NumberOfColors=None, Size=None):
+   # Returns the RGB (height x width x 3 uint8) image of the temperatures, Size is (Width, Height)
+   if Size is not None:
+      ThermalData = ResizeThermalData(ThermalData, Size)
+   Table = GetPalette(Palette, NumberOfColors)
+   # take() is a lot faster than indexing the table with the index array
+   return (Table.take(GetColorIndices(ThermalData, len(Table)-1, MinTemperature, MaxTemperature), axis=0))
+
+def MakeThermalPicture(ThermalData, MinTemperature=None, MaxTemperature=None, Palette='plasma', NumberOfColors=None, Size=None, Sharpness=None):
+   Picture = Image.fromarray(RenderThermalImage(ThermalData, MinTemperature, MaxTemperature, Palette, NumberOfColors, Size))
+   if Sharpness is not None:
+      Picture = ImageEnhance.Sharpness(Picture).enhance(Sharpness)
+   return (Picture)
+
+def SaveThermalImage(ThermalData, FileName, MinTemperature=None, MaxTemperature=None, Palette='plasma', NumberOfColors=None, Size=None, Sharpness=None, Quality=95, Format="jpeg"):
+   Picture = MakeThermalPicture(ThermalData, MinTemperature, MaxTemperature, Palette, NumberOfColors, Size, Sharpness)
+   Picture.save(FileName, Format, quality=Quality)
+   return (FileName)
+
+def EncodeThermalImage(ThermalData, MinTemperature=None, MaxTemperature=None, Palette='plasma', NumberOfColors=None, Size=None, Sharpness=None, Quality=95, Format="jpeg"):
+   Stream = BytesIO()
+   SaveThermalImage(ThermalData, Stream, MinTemperature, MaxTemperature, Palette, NumberOfColors, Size, Sharpness, Quality, Format)
+   return (Stream.getvalue())
+
+def SaveThermalImages(Jobs, NumberOfWorkers=None, **Options):
+   # Jobs is a list of (ThermalData, FileName), Options are the SaveThermalImage() options used for all images.
+   # Returns the file names in the order of the jobs.
+   with ThreadPoolExecutor(max_workers=NumberOfWorkers) as Executor:
+      Futures = [Executor.submit(SaveThermalImage, ThermalData, FileName, **Options) for ThermalData, FileName in Jobs]
+      return ([Future.result() for Future in Futures])
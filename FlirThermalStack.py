@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirThermalStack.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This module keeps a series of thermal images of the same scene (an installation photographed repeatedly over
+# weeks) in one memory mapped 3 dimensional array (time x height x width), so thousands of frames can be analysed
+# without loading them into memory.
+#
+# Create a ThermalStack object by passing it a directory, the directory holds:
+# - Frames.dat, the temperatures of all frames as float32, frame after frame.
+# - Index.json, the frame size and per frame the timestamp (from DateTimeOriginal) and the source file name.
+# Frames are appended with Append(ThermalData, Timestamp) or AppendFlirFile(FileName), or many at a time (with one
+# index write per ChunkSize frames) with AppendMany(Frames) or AppendFlirFiles(FileNames), all frames must have
+# the same size, the images are expected to be taken from the same position (aligned). A frame is written to
+# Frames.dat before the index, and is written right after the frames of the index, so a frame of which the index
+# was not written (the process stopped in between) is overwritten by the next one.
+#
+# The analysis functions work through the stack in chunks of frames, so only a chunk is in memory at a time:
+# - GetPixelStatistics(Start, End) returns per pixel the 'Min', 'Max', 'Mean', 'Std', the 'Count' of valid
+#   temperatures and the 'Trend' in degrees per day (least squares slope), of the frames between the Start and
+#   End timestamps.
+# - GetFramesWhereRegionExceeds(Box, Temperature) returns the frames of which the maximum (or the average) of
+#   a region exceeds a temperature, as list of (frame number, timestamp, value).
+# - GetHotspots(ThresholdTemperature) returns the connected regions above a temperature in every frame, with
+#   their area, mean, maximum, centroid and bounding box (See FlirHotspots.py), found chunk by chunk.
+# Boxes are given in pixels of the thermal data, as (Row1, Row2, Column1, Column2) in python slice notation.
+# Timestamps are seconds since 1970 (UTC).
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import os
+import json
+import datetime
+import numpy
+import FlirFrameStream
+import FlirHotspots
+
+##############################################################################################################
+# Constants
+##############################################################################################################
+DEFAULT_CHUNK_SIZE = 64
+SECONDS_PER_DAY = 86400.0
+
+##############################################################################################################
+# Class Definitions
+##############################################################################################################
+class ThermalStack:
+   def __init__(self, Directory, ChunkSize=DEFAULT_CHUNK_SIZE):
+      self.Directory = Directory
+      self.ChunkSize = ChunkSize
+      self.FramesFileName = os.path.join(Directory, "Frames.dat")
+      self.IndexFileName = os.path.join(Directory, "Index.json")
+      os.makedirs(Directory, exist_ok=True)
+      self.Height = None
+      self.Width = None
+      self.Timestamps = []
+      self.Sources = []
+      if os.path.exists(self.IndexFileName):
+         with open(self.IndexFileName, 'r') as IndexFile:
+            Index = json.load(IndexFile)
+         self.Height = Index['Height']
+         self.Width = Index['Width']
+         self.Timestamps = Index['Timestamps']
+         self.Sources = Index['Sources']
+      self.FramesMap = None
+
+   def __len__(self):
+      return (len(self.Timestamps))
+
+   def SaveIndex(self):
+      Index = dict(Height=self.Height, Width=self.Width, Timestamps=self.Timestamps, Sources=self.Sources)
+      TemporaryName = self.IndexFileName+".tmp"
+      with open(TemporaryName, 'w') as IndexFile:
+         json.dump(Index, IndexFile)
+      os.replace(TemporaryName, self.IndexFileName)
+
+   def Append(self, ThermalData, Timestamp, Source=None):
+      self.AppendMany([(ThermalData, Timestamp, Source)])
+
+   def AppendMany(self, Frames):
+      # Frames is an iterable of (ThermalData, Timestamp, Source). They are written ChunkSize frames at a time with
+      # one index write per chunk, the index is rewritten completely, so appending frames one by one with Append()
+      # gets slow for large stacks.
+      Batch = []
+      for ThermalData, Timestamp, Source in Frames:
+         ThermalData = numpy.asarray(ThermalData, dtype=numpy.float32)
+         if self.Height is None:
+            self.Height, self.Width = ThermalData.shape
+         if ThermalData.shape != (self.Height, self.Width):
+            raise ValueError("Frame size "+ThermalData.shape.__str__()+" does not match the stack frame size "+(self.Height, self.Width).__str__())
+         Batch.append((ThermalData, float(Timestamp), Source))
+         if len(Batch) >= self.ChunkSize:
+            self.AppendBatch(Batch)
+            Batch = []
+      if Batch:
+         self.AppendBatch(Batch)
+
+   def AppendBatch(self, Batch):
+      # The frames first, the index makes them part of the stack
+      self.WriteFrames(numpy.stack([ThermalData for ThermalData, Timestamp, Source in Batch]), len(self.Timestamps))
+      self.Timestamps.extend(Timestamp for ThermalData, Timestamp, Source in Batch)
+      self.Sources.extend(Source for ThermalData, Timestamp, Source in Batch)
+      self.SaveIndex()
+      # The memory map has to be made again to include the new frames
+      self.FramesMap = None
+
+   def WriteFrames(self, FramesData, FrameNumber):
+      # Writes the frames at the position of frame FrameNumber and cuts off anything after them, like frames that
+      # were written without being added to the index
+      FrameBytes = 4*self.Height*self.Width
+      with open(self.FramesFileName, 'r+b' if os.path.exists(self.FramesFileName) else 'w+b') as FramesFile:
+         FramesFile.seek(FrameNumber*FrameBytes)
+         FramesFile.write(numpy.ascontiguousarray(FramesData, dtype=numpy.float32).tobytes())
+         FramesFile.truncate()
+
+   def AppendFlirFile(self, FileName):
+      self.AppendFlirFiles([FileName])
+
+   def AppendFlirFiles(self, FileNames):
+      Frames = FlirFrameStream.ConvertFrames(FlirFrameStream.ReadStillFrames(FileNames))
+      self.AppendMany((Frame['ThermalData'], GetTimestamp(Frame['MetaData']), Frame['FileName']) for Frame in Frames)
+
+   def GetFrames(self):
+      # The memory mapped (frames x height x width) array, read only
+      if len(self.Timestamps) == 0:
+         return (numpy.zeros((0, self.Height or 0, self.Width or 0), dtype=numpy.float32))
+      if self.FramesMap is None:
+         self.FramesMap = numpy.memmap(self.FramesFileName, dtype=numpy.float32, mode='r', shape=(len(self.Timestamps), self.Height, self.Width))
+      return (self.FramesMap)
+
+   def GetFrameNumbers(self, Start=None, End=None):
+      # The numbers of the frames with a timestamp between Start and End (both included)
+      Timestamps = numpy.asarray(self.Timestamps, dtype=numpy.float64)
+      Selection = numpy.ones(len(Timestamps), dtype=bool)
+      if Start is not None:
+         Selection &= Timestamps >= Start
+      if End is not None:
+         Selection &= Timestamps <= End
+      return (numpy.nonzero(Selection)[0])
+
+   def GetChunks(self, FrameNumbers):
+      # Yields (frame numbers, frames) per chunk, the frames of a chunk are copied into memory as float64
+      Frames = self.GetFrames()
+      for ChunkStart in range(0, len(FrameNumbers), self.ChunkSize):
+         ChunkNumbers = FrameNumbers[ChunkStart:ChunkStart+self.ChunkSize]
+         yield (ChunkNumbers, numpy.asarray(Frames[ChunkNumbers], dtype=numpy.float64))
+
+   def GetPixelStatistics(self, Start=None, End=None):
+      FrameNumbers = self.GetFrameNumbers(Start, End)
+      Shape = (self.Height, self.Width)
+      Count = numpy.zeros(Shape)
+      Sum = numpy.zeros(Shape)
+      SquaredSum = numpy.zeros(Shape)
+      TimeSum = numpy.zeros(Shape)
+      TimeSquaredSum = numpy.zeros(Shape)
+      TimeProductSum = numpy.zeros(Shape)
+      Minimum = numpy.full(Shape, numpy.inf)
+      Maximum = numpy.full(Shape, -numpy.inf)
+      Timestamps = numpy.asarray(self.Timestamps, dtype=numpy.float64)
+      # Days since the first selected frame, keeps the sums for the trend small
+      TimeOffset = Timestamps[FrameNumbers].min() if len(FrameNumbers) else 0.0
+      for ChunkNumbers, Chunk in self.GetChunks(FrameNumbers):
+         Valid = numpy.isfinite(Chunk)
+         Values = numpy.where(Valid, Chunk, 0.0)
+         Days = ((Timestamps[ChunkNumbers] - TimeOffset) / SECONDS_PER_DAY)[:, None, None] * Valid
+         Count += Valid.sum(axis=0)
+         Sum += Values.sum(axis=0)
+         SquaredSum += (Values*Values).sum(axis=0)
+         TimeSum += Days.sum(axis=0)
+         TimeSquaredSum += (Days*Days).sum(axis=0)
+         TimeProductSum += (Days*Values).sum(axis=0)
+         Minimum = numpy.minimum(Minimum, numpy.where(Valid, Chunk, numpy.inf).min(axis=0))
+         Maximum = numpy.maximum(Maximum, numpy.where(Valid, Chunk, -numpy.inf).max(axis=0))
+      Statistics = dict()
+      with numpy.errstate(invalid='ignore', divide='ignore'):
+         Statistics['Count'] = Count.astype(numpy.int64)
+         Statistics['Mean'] = Sum / Count
+         Statistics['Std'] = numpy.sqrt(numpy.maximum(SquaredSum / Count - Statistics['Mean']**2, 0.0))
+         Statistics['Min'] = numpy.where(Count > 0, Minimum, numpy.nan)
+         Statistics['Max'] = numpy.where(Count > 0, Maximum, numpy.nan)
+         # Least squares slope of temperature against time, nan when there is no spread in time
+         Denominator = Count*TimeSquaredSum - TimeSum*TimeSum
+         Statistics['Trend'] = numpy.where(Denominator > 0, (Count*TimeProductSum - TimeSum*Sum) / Denominator, numpy.nan)
+      return (Statistics)
+
+   def GetRegionValues(self, Box, Statistic='Max', Start=None, End=None):
+      # Returns the frame numbers and per frame the maximum ('Max') or average ('Mean') temperature of a region
+      Row1, Row2, Column1, Column2 = Box
+      FrameNumbers = self.GetFrameNumbers(Start, End)
+      Frames = self.GetFrames()
+      Values = []
+      for ChunkStart in range(0, len(FrameNumbers), self.ChunkSize):
+         ChunkNumbers = FrameNumbers[ChunkStart:ChunkStart+self.ChunkSize]
+         # Only the region is read from the memory map
+         Region = numpy.asarray(Frames[ChunkNumbers, Row1:Row2, Column1:Column2], dtype=numpy.float64).reshape(len(ChunkNumbers), -1)
+         if Region.shape[1] == 0:
+            Values.append(numpy.full(len(ChunkNumbers), numpy.nan))
+         elif Statistic == 'Mean':
+            Values.append(NanReduce(numpy.nanmean, Region))
+         else:
+            Values.append(NanReduce(numpy.nanmax, Region))
+      Values = numpy.concatenate(Values) if Values else numpy.zeros(0)
+      return (FrameNumbers, Values)
+
+   def GetFramesWhereRegionExceeds(self, Box, Temperature, Statistic='Max', Start=None, End=None):
+      FrameNumbers, Values = self.GetRegionValues(Box, Statistic, Start, End)
+      with numpy.errstate(invalid='ignore'):
+         Exceeding = Values > Temperature
+      return ([(int(FrameNumber), self.Timestamps[FrameNumber], float(Value)) for FrameNumber, Value in zip(FrameNumbers[Exceeding], Values[Exceeding])])
+
+   def GetHotspots(self, ThresholdTemperature, MinimumArea=1, TopK=None, Start=None, End=None):
+      # The regions of all selected frames, per frame the hottest first, 'Frame' is the frame number in the stack
+      Chunks = []
+      for ChunkNumbers, Chunk in self.GetChunks(self.GetFrameNumbers(Start, End)):
+         Regions = FlirHotspots.DetectHotspots(Chunk, ThresholdTemperature, MinimumArea, TopK)
+         Regions['Frame'] = ChunkNumbers[Regions['Frame']]
+         # The labels are only meaningful within a chunk
+         del Regions['Label']
+         Chunks.append(Regions)
+      if not Chunks:
+         Regions = FlirHotspots.DetectHotspots(numpy.zeros((0, self.Height or 0, self.Width or 0)), ThresholdTemperature)
+         del Regions['Label']
+         return (Regions)
+      return (dict((Name, numpy.concatenate([Regions[Name] for Regions in Chunks])) for Name in Chunks[0]))
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+def NanReduce(Function, Region):
+   # nanmax / nanmean per frame without the warning for frames with only nan values
+   Result = numpy.full(Region.shape[0], numpy.nan)
+   HasValues = numpy.isfinite(Region).any(axis=1)
+   if HasValues.any():
+      Result[HasValues] = Function(Region[HasValues], axis=1)
+   return (Result)
+
+def GetTimestamp(MetaData):
+   # Converts DateTimeOriginal ("2020:12:13 17:46:18.928+01:00", the fraction and timezone are optional) to
+   # seconds since 1970 (UTC), without timezone the time is taken as UTC.
+   DateTimeString = MetaData['DateTimeOriginal'].__str__().strip()
+   TimeZone = datetime.timezone.utc
+   for Sign in ('+', '-'):
+      Position = DateTimeString.rfind(Sign)
+      if Position > 10:
+         Hours, Minutes = DateTimeString[Position+1:].split(':')
+         Offset = datetime.timedelta(hours=int(Hours), minutes=int(Minutes))
+         TimeZone = datetime.timezone(Offset if Sign == '+' else -Offset)
+         DateTimeString = DateTimeString[:Position]
+         break
+   if DateTimeString.endswith('Z'):
+      DateTimeString = DateTimeString[:-1]
+   Format = '%Y:%m:%d %H:%M:%S.%f' if '.' in DateTimeString else '%Y:%m:%d %H:%M:%S'
+   return (datetime.datetime.strptime(DateTimeString, Format).replace(tzinfo=TimeZone).timestamp())
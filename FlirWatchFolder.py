@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+##############################################################################################################
+# FlirWatchFolder.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation
+##############################################################################################################
+#
+# This Script keeps running and processes the FLIR Jpeg files that appear in one or more directories (for example
+# the folder the cameras sync to), every file is processed like FlirBatchProcessor.py does and its results are
+# appended as one line of JSON to the output file.
+#
+# - The directories are scanned every --interval seconds (recursively, like FlirBatchProcessor.py does). A new or
+#   changed file is only processed when its size and modification time did not change for --debounce seconds,
+#   so files that are still being written or synced are left alone until they are complete.
+# - Files are identified by the hash of their content (like FlirDataCache.py does). A file with the same content
+#   as a file that was already processed (a copy) is not processed again, it gets a result line with DuplicateOf
+#   set to the name of the processed file. A file that was only touched is skipped.
+# - The files are processed on --workers worker processes. At most --queue files are given to the workers at the
+#   same time, the other files wait in the directory until there is room (back-pressure), so a sync of thousands of
+#   files does not fill the memory.
+# - Every handled file is written to the state file (--state, a JSON lines journal), so after a restart only files
+#   that are new or changed since then are processed. Files that failed are not retried until they change.
+#   The journal is compacted when the script starts.
+# - The status (files waiting, queue depth, processed, failed, duplicates, throughput and the last error) is
+#   written as JSON to --status-file every scan, and served on http://<--status-host>:<--status-port>/status as
+#   JSON and /metrics in the Prometheus text format, on localhost only unless another --status-host is given.
+# Stop it with Ctrl-C or SIGTERM, the files being processed are finished first.
+#
+# Example:
+#   python FlirWatchFolder.py /data/CameraSync --workers 4 --output /data/FlirResults.jsonl --status-port 8321
+#   python FlirWatchFolder.py /data/CameraSync /data/Inspections --box 100,100,200,200 --no-normal --debounce 10
+#
+##############################################################################################################
+
+
+##############################################################################################################
+# Imports
+##############################################################################################################
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import tempfile
+import threading
+import collections
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+import FlirDataCache
+import FlirBatchProcessor
+
+##############################################################################################################
+# Constants
+##############################################################################################################
+DEFAULT_DEBOUNCE_TIME = 5.0
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_STATUS_HOST = "127.0.0.1"
+THROUGHPUT_WINDOW = 60.0
+MAXIMUM_ATTEMPTS = 3
+
+##############################################################################################################
+# Class Definitions
+##############################################################################################################
+class FlirWatchFolder:
+   def __init__(self, Directories, Settings, OutputFile, StateFileName, NumberOfWorkers=None, MaximumQueueSize=None,
+                DebounceTime=DEFAULT_DEBOUNCE_TIME, PollInterval=DEFAULT_POLL_INTERVAL, StatusFileName=None):
+      self.Directories = Directories
+      self.Settings = Settings
+      self.OutputFile = OutputFile
+      self.StateFileName = StateFileName
+      self.NumberOfWorkers = NumberOfWorkers or os.cpu_count()
+      self.MaximumQueueSize = MaximumQueueSize or 2*self.NumberOfWorkers
+      self.DebounceTime = DebounceTime
+      self.PollInterval = PollInterval
+      self.StatusFileName = StatusFileName
+      # State is the last entry of the journal per file, Hashes the file that was processed per content hash
+      self.State = dict()
+      self.Hashes = dict()
+      # Candidates are new or changed files waiting until they are stable (and until there is room in the queue)
+      self.Candidates = dict()
+      self.LastScanTime = None
+      # InFlight is the entry of the file per future of the worker pool
+      self.InFlight = dict()
+      self.Counters = collections.Counter()
+      self.FinishTimes = collections.deque()
+      self.LastError = None
+      self.StartTime = time.time()
+      self.StopEvent = threading.Event()
+      self.StatusLock = threading.Lock()
+      self.Status = dict()
+      self.LoadState()
+      self.StateFile = open(self.StateFileName, 'a')
+      self.Executor = self.StartWorkers()
+
+   def StartWorkers(self):
+      return (ProcessPoolExecutor(max_workers=self.NumberOfWorkers, initializer=IgnoreInterrupts))
+
+   def RestartBrokenWorkers(self):
+      # A worker process that died (killed, out of memory) breaks the whole pool, a new one is started
+      try:
+         self.Executor.submit(int)
+      except BrokenProcessPool:
+         self.Executor.shutdown(wait=False)
+         self.Executor = self.StartWorkers()
+         self.Counters['WorkerRestarts'] += 1
+
+   def LoadState(self):
+      # Replays the journal, a line that was only partly written when the script stopped is skipped
+      if os.path.exists(self.StateFileName):
+         with open(self.StateFileName, 'r') as StateFile:
+            for Line in StateFile:
+               try:
+                  Entry = json.loads(Line)
+               except ValueError:
+                  continue
+               self.State[Entry['File']] = Entry
+      for Entry in self.State.values():
+         if Entry['Status'] == 'Done':
+            self.Hashes.setdefault(Entry['Hash'], Entry['File'])
+      self.CompactState()
+
+   def CompactState(self):
+      # Only the last entry per file is kept, written to a temporary file first and then renamed
+      StateDirectory = os.path.dirname(os.path.abspath(self.StateFileName))
+      FileDescriptor, TemporaryName = tempfile.mkstemp(dir=StateDirectory, suffix=".tmp")
+      with os.fdopen(FileDescriptor, 'w') as TemporaryFile:
+         for Entry in self.State.values():
+            TemporaryFile.write(json.dumps(Entry)+"\n")
+      os.replace(TemporaryName, self.StateFileName)
+
+   def RecordState(self, Entry):
+      OldEntry = self.State.get(Entry['File'])
+      if OldEntry is not None and OldEntry['Hash'] != Entry['Hash'] and self.Hashes.get(OldEntry['Hash']) == Entry['File']:
+         # The file got another content, copies of the old content are not duplicates of it anymore
+         del self.Hashes[OldEntry['Hash']]
+      self.State[Entry['File']] = Entry
+      self.StateFile.write(json.dumps(Entry)+"\n")
+      self.StateFile.flush()
+
+   def WriteResult(self, Result):
+      self.OutputFile.write(json.dumps(Result)+"\n")
+      self.OutputFile.flush()
+
+   def Scan(self):
+      # Finds the new and changed files, a file is a candidate again every time its size or modification time changes
+      Now = time.time()
+      InFlightFiles = set(Entry['File'] for Entry in self.InFlight.values())
+      FoundFiles = set()
+      for FileName in FlirBatchProcessor.FindFlirFiles(self.Directories):
+         try:
+            FileStat = os.stat(FileName)
+         except OSError:
+            # Removed (or renamed) between the scan and the stat
+            continue
+         Signature = [FileStat.st_size, FileStat.st_mtime_ns]
+         FoundFiles.add(FileName)
+         if FileName in InFlightFiles or (FileName in self.State and self.State[FileName]['Signature'] == Signature):
+            continue
+         Candidate = self.Candidates.get(FileName)
+         if Candidate is None or Candidate['Signature'] != Signature:
+            self.Candidates[FileName] = dict(Signature=Signature, LastChange=Now, Attempts=0)
+      for FileName in [FileName for FileName in self.Candidates if FileName not in FoundFiles]:
+         del self.Candidates[FileName]
+
+   def IsStable(self, Candidate, Now):
+      return (Candidate['Signature'][0] > 0 and Now-Candidate['LastChange'] >= self.DebounceTime)
+
+   def SubmitStableFiles(self):
+      # The files that did not change for DebounceTime seconds, oldest first, as long as the queue has room
+      Now = time.time()
+      for FileName, Candidate in sorted(self.Candidates.items(), key=lambda Item: Item[1]['LastChange']):
+         if len(self.InFlight) >= self.MaximumQueueSize:
+            self.Counters['BackPressure'] += 1
+            break
+         if not self.IsStable(Candidate, Now):
+            continue
+         del self.Candidates[FileName]
+         try:
+            FileHash = FlirDataCache.HashFile(FileName)
+         except OSError:
+            continue
+         Entry = dict(File=FileName, Signature=Candidate['Signature'], Hash=FileHash)
+         InFlightHashes = dict((InFlightEntry['Hash'], InFlightEntry['File']) for InFlightEntry in self.InFlight.values())
+         ProcessedFile = self.Hashes.get(FileHash, InFlightHashes.get(FileHash))
+         if ProcessedFile == FileName:
+            # Touched, but the content did not change
+            Entry.update(Status='Done', Time=self.State[FileName].get('Time'))
+            self.RecordState(Entry)
+            self.Counters['Unchanged'] += 1
+         elif ProcessedFile is not None:
+            Entry.update(Status='Duplicate', DuplicateOf=ProcessedFile, Time=time.time())
+            self.RecordState(Entry)
+            self.WriteResult(dict(File=FileName, DuplicateOf=ProcessedFile))
+            self.Counters['Duplicates'] += 1
+         else:
+            Entry['Attempts'] = Candidate['Attempts']+1
+            try:
+               self.InFlight[self.Executor.submit(FlirBatchProcessor.SafeProcessFlirFile, FileName, self.Settings)] = Entry
+            except BrokenProcessPool:
+               self.Candidates[FileName] = Candidate
+               self.RestartBrokenWorkers()
+               break
+
+   def CollectResults(self, Timeout):
+      # Waits at most Timeout seconds for a worker to finish, or until a stop is requested when nothing is running
+      if not self.InFlight:
+         self.StopEvent.wait(Timeout)
+         return
+      Done, NotDone = wait(list(self.InFlight), timeout=Timeout, return_when=FIRST_COMPLETED)
+      BrokenWorkers = False
+      for Future in Done:
+         Entry = self.InFlight.pop(Future)
+         Attempts = Entry.pop('Attempts')
+         try:
+            Result = Future.result()
+         except BrokenProcessPool as Error:
+            # The file may not be the cause, it is tried again a few times before it is reported as failed
+            BrokenWorkers = True
+            Result = dict(File=Entry['File'], Error=type(Error).__name__+": "+Error.__str__())
+            if Attempts < MAXIMUM_ATTEMPTS:
+               self.Candidates[Entry['File']] = dict(Signature=Entry['Signature'], LastChange=0.0, Attempts=Attempts)
+               continue
+         Entry['Time'] = time.time()
+         if 'Error' in Result:
+            Entry.update(Status='Failed', Error=Result['Error'])
+            self.Counters['Failed'] += 1
+            self.LastError = Result
+         else:
+            Entry['Status'] = 'Done'
+            self.Hashes.setdefault(Entry['Hash'], Entry['File'])
+            self.Counters['Processed'] += 1
+            self.Counters['ProcessingTime'] += Result['ProcessingTime']
+         self.RecordState(Entry)
+         self.WriteResult(Result)
+         self.FinishTimes.append(Entry['Time'])
+      if BrokenWorkers:
+         self.RestartBrokenWorkers()
+
+   def UpdateStatus(self):
+      Now = time.time()
+      while self.FinishTimes and self.FinishTimes[0] < Now-THROUGHPUT_WINDOW:
+         self.FinishTimes.popleft()
+      Window = min(THROUGHPUT_WINDOW, max(Now-self.StartTime, 1e-9))
+      Status = dict(Directories=self.Directories, Uptime=round(Now-self.StartTime, 1), Workers=self.NumberOfWorkers,
+                    Waiting=len(self.Candidates), QueueDepth=len(self.InFlight), MaximumQueueSize=self.MaximumQueueSize,
+                    Known=len(self.State), Processed=self.Counters['Processed'], Failed=self.Counters['Failed'],
+                    Duplicates=self.Counters['Duplicates'], Unchanged=self.Counters['Unchanged'], BackPressure=self.Counters['BackPressure'],
+                    WorkerRestarts=self.Counters['WorkerRestarts'],
+                    FilesPerSecond=round(len(self.FinishTimes)/Window, 3), LastError=self.LastError)
+      if self.Counters['Processed']:
+         Status['AverageProcessingTime'] = round(self.Counters['ProcessingTime']/self.Counters['Processed'], 3)
+      with self.StatusLock:
+         self.Status = Status
+      if self.StatusFileName is not None:
+         StatusDirectory = os.path.dirname(os.path.abspath(self.StatusFileName))
+         FileDescriptor, TemporaryName = tempfile.mkstemp(dir=StatusDirectory, suffix=".tmp")
+         with os.fdopen(FileDescriptor, 'w') as TemporaryFile:
+            json.dump(Status, TemporaryFile, indent=2)
+         os.replace(TemporaryName, self.StatusFileName)
+
+   def GetStatus(self):
+      # Can be called from any thread, returns the status of the last scan
+      with self.StatusLock:
+         return (dict(self.Status))
+
+   def RunOnce(self, Timeout=None):
+      # The directories are only scanned every PollInterval seconds, in between finished files are collected and
+      # new ones submitted, so a large backlog does not scan all files again for every file that is finished.
+      Now = time.time()
+      if self.LastScanTime is None or Now-self.LastScanTime >= self.PollInterval:
+         self.Scan()
+         self.LastScanTime = Now
+      self.SubmitStableFiles()
+      if Timeout is None:
+         Timeout = max(self.LastScanTime+self.PollInterval-time.time(), 0.0)
+      self.CollectResults(Timeout)
+      self.UpdateStatus()
+
+   def Run(self):
+      self.UpdateStatus()
+      try:
+         while not self.StopEvent.is_set():
+            self.RunOnce()
+      finally:
+         self.Close()
+
+   def Stop(self):
+      # Can be called from any thread (or a signal handler), Run() returns once the running files are finished
+      self.StopEvent.set()
+
+   def Close(self):
+      while self.InFlight:
+         self.CollectResults(None)
+      self.UpdateStatus()
+      self.Executor.shutdown()
+      self.StateFile.close()
+
+class StatusRequestHandler(BaseHTTPRequestHandler):
+   # /status returns the status as JSON, /metrics in the Prometheus text format
+   def do_GET(self):
+      Status = self.server.Watcher.GetStatus()
+      if self.path == "/status":
+         self.SendResponse(json.dumps(Status, indent=2), "application/json")
+      elif self.path == "/metrics":
+         self.SendResponse(GetPrometheusMetrics(Status), "text/plain; version=0.0.4")
+      else:
+         self.send_error(404)
+
+   def SendResponse(self, Text, ContentType):
+      Body = Text.encode()
+      self.send_response(200)
+      self.send_header("Content-Type", ContentType)
+      self.send_header("Content-Length", len(Body).__str__())
+      self.end_headers()
+      self.wfile.write(Body)
+
+   def log_message(self, Format, *Arguments):
+      # No line on stderr for every request
+      pass
+
+##############################################################################################################
+# Function Definitions
+##############################################################################################################
+def IgnoreInterrupts():
+   # Runs in every worker process, Ctrl-C stops the watcher which lets the workers finish their files
+   signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def GetPrometheusMetrics(Status):
+   Lines = []
+   for Name in ('Uptime', 'Workers', 'Waiting', 'QueueDepth', 'MaximumQueueSize', 'Known', 'Processed', 'Failed',
+                'Duplicates', 'Unchanged', 'BackPressure', 'WorkerRestarts', 'FilesPerSecond', 'AverageProcessingTime'):
+      if Name in Status:
+         Lines.append("flir_watchfolder_"+Name.lower()+" "+Status[Name].__str__())
+   return ("\n".join(Lines)+"\n")
+
+def StartStatusServer(Watcher, Port, Host=DEFAULT_STATUS_HOST):
+   # The status is served on a daemon thread, it only reads the status made by the scan loop
+   Server = HTTPServer((Host, Port), StatusRequestHandler)
+   Server.Watcher = Watcher
+   threading.Thread(target=Server.serve_forever, daemon=True).start()
+   return (Server)
+
+def ParseArguments(Arguments=None):
+   Parser = argparse.ArgumentParser(description="Watch directories and process the FLIR Jpeg files that appear in them.")
+   Parser.add_argument('Directories', nargs='+', help="Directories to watch (searched recursively).")
+   Parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of worker processes (default: number of cpu's).")
+   Parser.add_argument('--queue', type=int, default=None, help="Maximum number of files given to the workers at the same time (default: 2 per worker).")
+   Parser.add_argument('--output', default="FlirResults.jsonl", help="JSON lines file the results are appended to.")
+   Parser.add_argument('--state', default="FlirWatchFolderState.jsonl", help="Journal of the handled files, used to resume after a restart.")
+   Parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE_TIME, help="Seconds a file must be unchanged before it is processed (default: %.0f)." % DEFAULT_DEBOUNCE_TIME)
+   Parser.add_argument('--interval', type=float, default=DEFAULT_POLL_INTERVAL, help="Seconds between the scans of the directories (default: %.0f)." % DEFAULT_POLL_INTERVAL)
+   Parser.add_argument('--status-file', default=None, metavar='FILE', help="Write the status as JSON to this file after every scan.")
+   Parser.add_argument('--status-port', type=int, default=None, metavar='PORT', help="Serve the status on http://<host>:PORT/status and /metrics.")
+   Parser.add_argument('--status-host', default=DEFAULT_STATUS_HOST, metavar='HOST', help="Address to serve the status on (default: %s, 0.0.0.0 for all)." % DEFAULT_STATUS_HOST)
+   FlirBatchProcessor.AddProcessingArguments(Parser)
+   return(Parser.parse_args(Arguments))
+
+def Main(Arguments=None):
+   Options = ParseArguments(Arguments)
+   Settings = FlirBatchProcessor.GetSettings(Options)
+   with open(Options.output, 'a') as OutputFile:
+      Watcher = FlirWatchFolder(Options.Directories, Settings, OutputFile, Options.state, Options.workers, Options.queue,
+                                Options.debounce, Options.interval, Options.status_file)
+      if Options.status_port is not None:
+         StartStatusServer(Watcher, Options.status_port, Options.status_host)
+      signal.signal(signal.SIGTERM, lambda SignalNumber, Frame: Watcher.Stop())
+      sys.stderr.write("Watching "+", ".join(Options.Directories)+", "+len(Watcher.State).__str__()+" files known\n")
+      try:
+         Watcher.Run()
+      except KeyboardInterrupt:
+         # Run() has finished the running files already
+         pass
+      Status = Watcher.GetStatus()
+      sys.stderr.write("Stopped, %d processed, %d failed, %d duplicates\n" % (Status['Processed'], Status['Failed'], Status['Duplicates']))
+   return(0)
+
+##############################################################################################################
+# Main Application
+##############################################################################################################
+if __name__ == "__main__":
+   sys.exit(Main())